@@ -0,0 +1,43 @@
+"""add_file_metadata_listing_indexes
+
+Revision ID: 226de24f4d60
+Revises: 2760619f394a
+Create Date: 2026-10-18 15:02:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '226de24f4d60'
+down_revision: Union[str, None] = '2760619f394a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LISTING_INDEXES = [
+    ('ix_file_metadata_owner_id_uploaded_at_id', ['owner_id', 'uploaded_at', 'id']),
+    ('ix_file_metadata_uploaded_at_id', ['uploaded_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        # PostgreSQL 以 CONCURRENTLY 建立索引，建立期間不會鎖住 file_metadata 的寫入
+        # (CONCURRENTLY 不能在 transaction 中執行)
+        with op.get_context().autocommit_block():
+            for index_name, columns in LISTING_INDEXES:
+                op.create_index(index_name, 'file_metadata', columns, unique=False, postgresql_concurrently=True)
+        return
+
+    for index_name, columns in LISTING_INDEXES:
+        op.create_index(index_name, 'file_metadata', columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for index_name, _ in reversed(LISTING_INDEXES):
+        op.drop_index(index_name, table_name='file_metadata')
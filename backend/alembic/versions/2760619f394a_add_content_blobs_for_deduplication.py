@@ -0,0 +1,56 @@
+"""add_content_blobs_for_deduplication
+
+Revision ID: 2760619f394a
+Revises: 5db4141ff585
+Create Date: 2026-10-18 13:45:19.661027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2760619f394a'
+down_revision: Union[str, None] = '5db4141ff585'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('content_blobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('storage_path', sa.String(length=255), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('storage_path')
+    )
+    op.create_index(op.f('ix_content_blobs_id'), 'content_blobs', ['id'], unique=False)
+    op.create_index(op.f('ix_content_blobs_sha256'), 'content_blobs', ['sha256'], unique=True)
+
+    # 去重後多個檔案會指向同一個 blob，storage_path 不再唯一
+    # 使用 batch 模式讓 SQLite 也能新增外鍵 (其他資料庫會直接 ALTER TABLE)
+    with op.batch_alter_table('file_metadata') as batch_op:
+        batch_op.drop_index('ix_file_metadata_storage_path')
+        batch_op.create_index('ix_file_metadata_storage_path', ['storage_path'], unique=False)
+        batch_op.add_column(sa.Column('blob_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_file_metadata_blob_id', ['blob_id'], unique=False)
+        batch_op.create_foreign_key('fk_file_metadata_blob_id_content_blobs', 'content_blobs', ['blob_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('file_metadata') as batch_op:
+        batch_op.drop_constraint('fk_file_metadata_blob_id_content_blobs', type_='foreignkey')
+        batch_op.drop_index('ix_file_metadata_blob_id')
+        batch_op.drop_column('blob_id')
+        batch_op.drop_index('ix_file_metadata_storage_path')
+        batch_op.create_index('ix_file_metadata_storage_path', ['storage_path'], unique=True)
+    op.drop_index(op.f('ix_content_blobs_sha256'), table_name='content_blobs')
+    op.drop_index(op.f('ix_content_blobs_id'), table_name='content_blobs')
+    op.drop_table('content_blobs')
@@ -0,0 +1,30 @@
+"""add_upload_session_claims
+
+Revision ID: 4b8e1f0c7a93
+Revises: 9c41e7b2d05a
+Create Date: 2026-10-18 21:05:37.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8e1f0c7a93'
+down_revision: Union[str, None] = '9c41e7b2d05a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('upload_sessions', sa.Column('claim_token', sa.String(length=36), nullable=True))
+    op.add_column('upload_sessions', sa.Column('claimed_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_sessions', 'claimed_until')
+    op.drop_column('upload_sessions', 'claim_token')
@@ -0,0 +1,41 @@
+"""add_rate_limit_bucket_version
+
+Revision ID: 7d3c9a2e5f18
+Revises: 4b8e1f0c7a93
+Create Date: 2026-10-18 22:14:09.631507
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3c9a2e5f18'
+down_revision: Union[str, None] = '4b8e1f0c7a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rate_limit_buckets', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    # MySQL 的 DATETIME 預設只到秒，補充 token 時需要微秒精度
+    if op.get_context().dialect.name == 'mysql':
+        op.alter_column(
+            'rate_limit_buckets', 'updated_at',
+            existing_type=mysql.DATETIME(), type_=mysql.DATETIME(fsp=6), existing_nullable=False,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name == 'mysql':
+        op.alter_column(
+            'rate_limit_buckets', 'updated_at',
+            existing_type=mysql.DATETIME(fsp=6), type_=mysql.DATETIME(), existing_nullable=False,
+        )
+    with op.batch_alter_table('rate_limit_buckets') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,44 @@
+"""add_pending_uploads_table
+
+Revision ID: 87a130157c29
+Revises: d6e75cde62e1
+Create Date: 2026-10-18 10:03:52.917344
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '87a130157c29'
+down_revision: Union[str, None] = 'd6e75cde62e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('pending_uploads',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('storage_path', sa.String(length=255), nullable=False),
+        sa.Column('upload_id', sa.String(length=1024), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['file_id'], ['file_metadata.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_pending_uploads_id'), 'pending_uploads', ['id'], unique=False)
+    op.create_index(op.f('ix_pending_uploads_file_id'), 'pending_uploads', ['file_id'], unique=False)
+    op.create_index(op.f('ix_pending_uploads_created_at'), 'pending_uploads', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_pending_uploads_created_at'), table_name='pending_uploads')
+    op.drop_index(op.f('ix_pending_uploads_file_id'), table_name='pending_uploads')
+    op.drop_index(op.f('ix_pending_uploads_id'), table_name='pending_uploads')
+    op.drop_table('pending_uploads')
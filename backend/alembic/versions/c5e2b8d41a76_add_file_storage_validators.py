@@ -0,0 +1,31 @@
+"""add_file_storage_validators
+
+Revision ID: c5e2b8d41a76
+Revises: 7d3c9a2e5f18
+Create Date: 2026-10-18 22:48:31.517264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e2b8d41a76'
+down_revision: Union[str, None] = '7d3c9a2e5f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('file_metadata', sa.Column('storage_etag', sa.String(length=255), nullable=True))
+    op.add_column('file_metadata', sa.Column('storage_modified_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('file_metadata') as batch_op:
+        batch_op.drop_column('storage_modified_at')
+        batch_op.drop_column('storage_etag')
@@ -0,0 +1,89 @@
+"""hash_refresh_tokens
+
+Revision ID: d2a67c51985b
+Revises: 2f6d23b14f36
+Create Date: 2026-10-18 17:46:13.270581
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a67c51985b'
+down_revision: Union[str, None] = '2f6d23b14f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+# 固定 32 bytes 的 SHA-256 digest；MySQL 的 BLOB 不能直接建立索引，改用 BINARY(32)
+TOKEN_HASH_TYPE = sa.LargeBinary(length=32).with_variant(mysql.BINARY(32), 'mysql')
+
+refresh_tokens = sa.table(
+    'refresh_tokens',
+    sa.column('id', sa.Integer()),
+    sa.column('token', sa.String()),
+    sa.column('token_hash', sa.LargeBinary()),
+)
+
+# 離線 (--sql) 模式下由資料庫計算 SHA-256 (token 是 ASCII，與 hash_token 的 UTF-8 編碼相同)
+OFFLINE_HASH_SQL = {
+    'mysql': "UPDATE refresh_tokens SET token_hash = UNHEX(SHA2(token, 256))",
+    'postgresql': "UPDATE refresh_tokens SET token_hash = sha256(convert_to(token, 'UTF8'))",
+}
+
+
+def _hash_existing_tokens(conn) -> None:
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(refresh_tokens.c.id, refresh_tokens.c.token)
+            .where(refresh_tokens.c.id > last_id)
+            .order_by(refresh_tokens.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            refresh_tokens.update()
+            .where(refresh_tokens.c.id == sa.bindparam('_id'))
+            .values(token_hash=sa.bindparam('_token_hash')),
+            [{'_id': row.id, '_token_hash': hashlib.sha256(row.token.encode()).digest()} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('token_hash', TOKEN_HASH_TYPE, nullable=True))
+
+    # 以 SHA-256 雜湊既有的 token (與 RefreshToken.hash_token 相同)，已發出的 cookie 在升級後仍然有效
+    if context.is_offline_mode():
+        # --sql 產生 SQL 腳本時無法逐批讀取資料，改由資料庫計算雜湊
+        dialect = op.get_context().dialect.name
+        if dialect not in OFFLINE_HASH_SQL:
+            raise NotImplementedError(f"Offline upgrade is not supported on {dialect}")
+        op.execute(OFFLINE_HASH_SQL[dialect])
+    else:
+        _hash_existing_tokens(op.get_bind())
+
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('token_hash', existing_type=TOKEN_HASH_TYPE, nullable=False)
+        batch_op.drop_index('ix_refresh_tokens_token')
+        batch_op.drop_column('token')
+        batch_op.create_index(batch_op.f('ix_refresh_tokens_token_hash'), ['token_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 雜湊無法還原成 token 明文：刪除所有 refresh token，使用者需要重新登入
+    op.execute(refresh_tokens.delete())
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_refresh_tokens_token_hash'))
+        batch_op.drop_column('token_hash')
+        batch_op.add_column(sa.Column('token', sa.String(length=512), nullable=False))
+        batch_op.create_index(batch_op.f('ix_refresh_tokens_token'), ['token'], unique=True)
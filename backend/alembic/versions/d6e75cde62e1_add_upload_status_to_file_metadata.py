@@ -0,0 +1,29 @@
+"""add_upload_status_to_file_metadata
+
+Revision ID: d6e75cde62e1
+Revises: 86e6950aa32c
+Create Date: 2026-10-18 09:12:31.482210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6e75cde62e1'
+down_revision: Union[str, None] = '86e6950aa32c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 既有的檔案都已上傳完成，因此以 'available' 作為預設值
+    op.add_column('file_metadata', sa.Column('upload_status', sa.String(length=20), nullable=False, server_default='available'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('file_metadata', 'upload_status')
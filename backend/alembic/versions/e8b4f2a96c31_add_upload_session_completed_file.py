@@ -0,0 +1,29 @@
+"""add_upload_session_completed_file
+
+Revision ID: e8b4f2a96c31
+Revises: c5e2b8d41a76
+Create Date: 2026-10-18 23:20:42.088915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b4f2a96c31'
+down_revision: Union[str, None] = 'c5e2b8d41a76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('upload_sessions', sa.Column('completed_file_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('upload_sessions') as batch_op:
+        batch_op.drop_column('completed_file_id')
@@ -1,91 +1,99 @@
 # backend/app/api/v1/endpoints/files.py
 from fastapi import (
     APIRouter, Depends, HTTPException,
-    status, UploadFile, File as FastAPIFile, Query
+    status, UploadFile, File as FastAPIFile, Query, Request, Response
 )
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-import uuid # For generating unique filenames in S3
+import hashlib
 import logging
+from datetime import datetime, timedelta, timezone
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.core.security import get_current_active_user
-from app.models.user import User
+from app.core.user_cache import UserPrincipal
+from app.models.file import FileUploadStatus
 from app.schemas.user import UserRole # Assuming UserRole is an Enum in your models
-from app.schemas.file import FileCreate, FileRead, PresignedUrlResponse, FileRename
+from app.schemas.file import (
+    FileCreate, FileRead, PresignedUrlResponse, FileRename, UploadUrlRequest, UploadUrlResponse
+)
 from app.crud import file as crud_file
-from app.services.storage_interface import StorageInterface
-from app.dependencies import get_storage_service # Import the dependency
+from app.services.async_storage import AsyncStorage
+from app.services.storage_interface import StorageObjectChanged
+from app.services.content_store import build_storage_path, store_content, delete_stored_file, discard_stored_content
+from app.dependencies import get_async_storage_service # Import the dependency
 from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.core.http_range import (
+    RangeNotSatisfiable, content_disposition, format_http_date, if_range_matches, is_not_modified, parse_range_header
+)
 from app.api.v1.endpoints.users import require_manager_or_admin_role
 from app.crud import user as crud_user
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+MAX_PAGE_SIZE = 1000
+
+
+def parse_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+
+def paginate(files: list, limit: int, response: Response) -> list:
+    """
+    files 以 limit + 1 筆查詢：多出的一筆代表還有下一頁，
+    此時以本頁最後一筆的 (uploaded_at, id) 產生 cursor 放進 X-Next-Cursor 標頭。
+    """
+    if len(files) > limit:
+        files = files[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(files[-1].uploaded_at, files[-1].id)
+    return files
+
+
 @router.post("/upload", response_model=FileRead, status_code=status.HTTP_201_CREATED)
 async def upload_file_endpoint(
     uploaded_file: UploadFile = FastAPIFile(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
-    storage_service: StorageInterface = Depends(get_storage_service)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service)
 ):
     if not uploaded_file.filename:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No filename provided.")
 
-    # Sanitize filename and create a unique storage path
-    sanitized_filename = "".join(c if c.isalnum() or c in ['.', '_', '-'] else '_' for c in uploaded_file.filename)
-    storage_path = f"{current_user.id}/{uuid.uuid4()}_{sanitized_filename}"
-
-    # --- Get file size and content_type BEFORE consuming the file stream for upload ---
-    # Read the entire file content into memory or a temporary file on disk first
-    # This is important because uploaded_file.file (SpooledTemporaryFile) can only be read once reliably.
-    
-    # Option 1: Read into a BytesIO buffer (for moderately sized files)
-    # from io import BytesIO
-    # file_content_buffer = BytesIO()
-    # await uploaded_file.seek(0) # Ensure pointer is at the beginning
-    # shutil.copyfileobj(uploaded_file.file, file_content_buffer)
-    # file_size = file_content_buffer.tell()
-    # file_content_buffer.seek(0) # Reset buffer pointer for S3 upload
-
-    # Option 2: Get size first, then reset for S3 (might be risky if file is spooled to disk and closed)
-    # This was the problematic approach. Let's improve it by reading first.
-
-    # Safer approach: Determine size by reading the stream.
-    # For UploadFile, a robust way to get size is to read it.
-    # However, if we read it here, we need to ensure the S3 upload function can re-read it
-    # or we pass the read content.
-    # Let's get the size from the UploadFile object itself if possible, or by reading its contents.
-    # The most robust way is to read the file content once.
-
     try:
-        # Read the file content. Note: This loads the entire file into memory.
-        # For very large files, consider streaming or saving to a temp disk file first.
+        # 直接把 UploadFile 的 spool 交給 storage backend，backend 以固定大小的區塊讀取，
+        # 整個檔案不會被讀進記憶體；內容已存在時只增加共用 blob 的引用數，不會寫入 storage。
         await uploaded_file.seek(0) # Ensure we start from the beginning
-        file_bytes = await uploaded_file.read()
-        file_size = len(file_bytes) # Get size from the read bytes
-        
-        # Now that we have the content in `file_bytes`, we need to provide a file-like
-        # object for this content to the S3 upload function.
-        from io import BytesIO
-        file_content_for_s3 = BytesIO(file_bytes)
-
-        # Upload to S3 (or MinIO via interface)
-        actual_storage_path = storage_service.upload_file(
-            file_content=file_content_for_s3, # Pass the BytesIO object
-            destination_path=storage_path,
-            content_type=uploaded_file.content_type
+        stored_content = await store_content(
+            db,
+            storage_service,
+            uploaded_file.file,
+            owner_id=current_user.id,
+            filename=uploaded_file.filename,
+            content_type=uploaded_file.content_type,
         )
-        
+
         # Create metadata in DB
         file_meta_in = FileCreate(
             filename=uploaded_file.filename, # Store original filename
-            storage_path=actual_storage_path, # Path in S3
+            storage_path=stored_content.storage_path, # Path in S3
             file_type=uploaded_file.content_type,
-            size=file_size, # Use the size obtained before S3 upload
+            size=stored_content.size, # Size counted while streaming from the spool
             owner_id=current_user.id,
+            blob_id=stored_content.blob_id,
         )
-        db_file_meta = crud_file.create_file_metadata(db=db, file_in=file_meta_in)
+        try:
+            # 與 blob 引用數的變更在同一個 transaction 中 commit
+            db_file_meta = await crud_file.create_file_metadata(db=db, file_in=file_meta_in)
+        except Exception:
+            await discard_stored_content(db, storage_service, stored_content)
+            raise
         return db_file_meta
         
     except IOError as e:
@@ -95,34 +103,105 @@ async def upload_file_endpoint(
         logger.error(f"Unexpected error during file upload for user {current_user.id}, file {uploaded_file.filename}: {e}", exc_info=True)
         # Consider more specific error handling or rollback if S3 upload succeeded but DB failed.
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred during file upload.")
-    finally:
-        # Ensure the uploaded file (SpooledTemporaryFile) is closed if it's not already
-        # await uploaded_file.close() # Usually FastAPI handles this, but can be explicit.
-        # If using BytesIO, it's good practice to close it too, though GC will handle it.
-        if 'file_content_for_s3' in locals() and file_content_for_s3:
-            file_content_for_s3.close()
+
+
+@router.post("/upload-url", response_model=UploadUrlResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_url(
+    upload_in: UploadUrlRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service)
+):
+    """
+    直接上傳到 bucket 的第一步：回傳 presigned PUT URL 與一筆狀態為 pending 的檔案元數據。
+    客戶端將檔案 PUT 到該 URL 後，需呼叫 POST /files/{file_id}/complete 完成上傳。
+    """
+    storage_path = build_storage_path(current_user.id, upload_in.filename)
+    expiration = settings.PRESIGNED_URL_EXPIRE_SECONDS
+
+    presigned_url = await storage_service.generate_presigned_url(
+        storage_path=storage_path,
+        expiration_seconds=expiration,
+        http_method="PUT",
+        content_type=upload_in.file_type
+    )
+    if not presigned_url:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not generate upload URL.")
+
+    file_meta_in = FileCreate(
+        filename=upload_in.filename,
+        storage_path=storage_path,
+        file_type=upload_in.file_type,
+        size=upload_in.size, # 暫存客戶端宣告的大小，完成時以 storage 的實際大小覆蓋
+        owner_id=current_user.id,
+        upload_status=FileUploadStatus.PENDING,
+    )
+    db_file_meta = await crud_file.create_file_metadata(db=db, file_in=file_meta_in)
+    logger.info(f"User {current_user.id} requested direct upload URL for file ID {db_file_meta.id} ({storage_path})")
+
+    return UploadUrlResponse(
+        file=db_file_meta,
+        url=presigned_url,
+        method="PUT",
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=expiration),
+    )
+
+
+@router.post("/{file_id}/complete", response_model=FileRead)
+async def complete_direct_upload(
+    file_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service)
+):
+    """
+    直接上傳到 bucket 的第二步：以 HEAD 請求確認物件已存在，並以實際大小、類型與 ETag 完成元數據。
+    presigned URL 在完成後到過期之前仍可使用；以同一個 URL 重新上傳後再次呼叫，會以新的物件更新元數據。
+    """
+    file_meta = await crud_file.get_file_metadata_by_id_and_owner(db, file_id=file_id, owner_id=current_user.id)
+    if not file_meta:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found.")
+
+    if file_meta.upload_status == FileUploadStatus.AVAILABLE.value and file_meta.storage_etag is None:
+        return file_meta # 經由 API 上傳的檔案 (之後不會再改變)
+
+    try:
+        object_info = await storage_service.get_file_info(storage_path=file_meta.storage_path)
+    except IOError as e:
+        logger.error(f"IOError while checking uploaded object for file_id {file_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not verify uploaded file: {e}")
+
+    if object_info is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Uploaded object not found in storage.")
+
+    if file_meta.upload_status == FileUploadStatus.AVAILABLE.value and object_info.etag == file_meta.storage_etag:
+        return file_meta # 重複呼叫且物件沒有改變時直接回傳已完成的檔案
+    return await crud_file.complete_file_upload(db, db_file=file_meta, object_info=object_info)
 
 
 @router.get("/", response_model=List[FileRead])
 async def list_user_files(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
-    skip: int = 0,
-    limit: int = 100
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    cursor: Optional[str] = Query(None, description="上一頁回應的 X-Next-Cursor 標頭"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE)
 ):
-    files = crud_file.get_files_by_owner(db, owner_id=current_user.id, skip=skip, limit=limit)
-    return files
+    files = await crud_file.get_files_by_owner(
+        db, owner_id=current_user.id, limit=limit + 1, after=parse_cursor(cursor)
+    )
+    return paginate(files, limit, response)
 
 
 @router.post("/{file_id}/generate-share-link", response_model=PresignedUrlResponse)
 async def generate_file_share_link(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
-    storage_service: StorageInterface = Depends(get_storage_service),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service),
     expire_seconds: Optional[int] = None # Allow custom expiry via query param or body
 ):
-    file_meta = crud_file.get_file_metadata_by_id(db, file_id=file_id)
+    file_meta = await crud_file.get_file_metadata_by_id(db, file_id=file_id)
 
     if not file_meta:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found.")
@@ -131,6 +210,9 @@ async def generate_file_share_link(
     if file_meta.owner_id != current_user.id and current_user.role not in [UserRole.ADMIN, UserRole.MANAGER]: # Assuming UserRole enum
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to share this file.")
 
+    if file_meta.upload_status != FileUploadStatus.AVAILABLE.value:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="File upload has not been completed.")
+
     expiration = expire_seconds if expire_seconds is not None else settings.PRESIGNED_URL_EXPIRE_SECONDS
     
     if expiration > settings.PRESIGNED_URL_EXPIRE_SECONDS_MAX:
@@ -139,7 +221,7 @@ async def generate_file_share_link(
             detail=f"Expiration time cannot exceed {settings.PRESIGNED_URL_EXPIRE_SECONDS_MAX} seconds."
         )
     
-    presigned_url = storage_service.generate_presigned_url(
+    presigned_url = await storage_service.generate_presigned_url(
         storage_path=file_meta.storage_path,
         expiration_seconds=expiration,
         http_method="GET",
@@ -152,14 +234,114 @@ async def generate_file_share_link(
     return PresignedUrlResponse(url=presigned_url, filename=file_meta.filename)
 
 
+def content_etag(file_meta) -> str:
+    """
+    由元數據產生 ETag，條件式請求不需要向 storage 發出 HEAD。
+    經由 API 上傳的內容寫到新的 storage path 之後不再改變，storage path 與大小即可識別；
+    客戶端直接上傳的物件可能以同一個 presigned URL 被覆寫，一併納入完成時 storage 回報的 ETag。
+    """
+    validator = f"{file_meta.storage_path}:{file_meta.size}:{file_meta.storage_etag or ''}"
+    digest = hashlib.sha256(validator.encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def content_last_modified(file_meta) -> datetime:
+    """直接上傳的檔案以 storage 回報的修改時間為準 (uploaded_at 是發出 presigned URL 的時間)。"""
+    return file_meta.storage_modified_at or file_meta.uploaded_at
+
+
+@router.get("/{file_id}/content")
+async def download_file_content(
+    file_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service)
+):
+    """
+    經由 API 串流下載檔案內容，給無法直接連線 bucket (presigned URL) 的客戶端使用。
+    - 以 DOWNLOAD_CHUNK_SIZE_BYTES 為單位從 storage 讀取並送出，記憶體用量與檔案大小無關
+    - Range (單一區段) 回應 206，續傳時只傳送缺少的部分；If-Range 不符時回應完整內容
+    - If-None-Match / If-Modified-Since 符合時回應 304，不讀取 storage
+    """
+    file_meta = await crud_file.get_file_metadata_by_id(db, file_id=file_id)
+
+    if not file_meta:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found.")
+
+    if file_meta.owner_id != current_user.id and current_user.role not in [UserRole.ADMIN, UserRole.MANAGER]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to download this file.")
+
+    if file_meta.upload_status != FileUploadStatus.AVAILABLE.value:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="File upload has not been completed.")
+
+    size = file_meta.size or 0
+    etag = content_etag(file_meta)
+    last_modified = content_last_modified(file_meta)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_http_date(last_modified),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache", # 只有本人可以快取，每次使用前以 ETag 重新驗證
+    }
+
+    if is_not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since"), etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = None
+    if if_range_matches(request.headers.get("if-range"), etag, last_modified):
+        try:
+            byte_range = parse_range_header(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{size}"},
+            )
+
+    media_type = file_meta.file_type or "application/octet-stream"
+    headers["Content-Disposition"] = content_disposition(file_meta.filename)
+    if size == 0:
+        return Response(content=b"", media_type=media_type, headers=headers)
+
+    start, end = byte_range or (0, size - 1)
+    try:
+        # 在送出回應標頭之前開啟物件，storage 的錯誤仍然可以轉換為對應的狀態碼
+        # 直接上傳的檔案以完成時的 ETag 開啟：物件之後被覆寫時，不會以舊的 ETag 與大小送出新內容
+        chunks = await storage_service.open_range(
+            file_meta.storage_path, start=start, end=end, chunk_size=settings.DOWNLOAD_CHUNK_SIZE_BYTES,
+            etag=file_meta.storage_etag,
+        )
+    except StorageObjectChanged:
+        logger.warning(f"Object {file_meta.storage_path} for file_id {file_id} changed after the upload was completed.")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="File content changed in storage after the upload was completed; complete the upload again.",
+        )
+    except FileNotFoundError:
+        logger.error(f"Object {file_meta.storage_path} for file_id {file_id} is missing from storage.")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found in storage.")
+    except NotImplementedError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    except (IOError, ConnectionError) as e:
+        logger.error(f"Could not read file_id {file_id} from storage: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not read file from storage.")
+
+    headers["Content-Length"] = str(end - start + 1)
+    status_code = status.HTTP_200_OK
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+    return StreamingResponse(chunks, status_code=status_code, media_type=media_type, headers=headers)
+
+
 @router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user_file(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
-    storage_service: StorageInterface = Depends(get_storage_service)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service)
 ):
-    file_meta = crud_file.get_file_metadata_by_id(db, file_id=file_id)
+    file_meta = await crud_file.get_file_metadata_by_id(db, file_id=file_id)
 
     if not file_meta:
         # 保持不變：找不到檔案直接回 404
@@ -171,10 +353,8 @@ async def delete_user_file(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this file.")
 
     try:
-        # 1. Delete from S3
-        storage_service.delete_file(storage_path=file_meta.storage_path)
-        # 2. Delete metadata from DB
-        crud_file.delete_file_metadata(db, file_id=file_id)
+        # 刪除 storage 物件與 DB 元數據；共用 blob 的檔案只在最後一個引用被刪除時才刪除物件
+        await delete_stored_file(db, storage_service, file_meta)
         # No content to return on 204
     except IOError as e:
         logger.error(f"IOError during file deletion (S3 part) for file_id {file_id}: {e}")
@@ -189,8 +369,8 @@ async def delete_user_file(
 async def rename_file_endpoint(
     file_id: int,
     file_rename_data: FileRename, # 接收包含 new_filename 的請求主體
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """
     重新命名檔案 (僅修改資料庫中的 filename 元數據)。
@@ -199,7 +379,7 @@ async def rename_file_endpoint(
     logger.info(f"User {current_user.username} (ID: {current_user.id}, Role: {current_user.role}) attempting to rename file ID: {file_id} to '{file_rename_data.new_filename}'")
 
     # 檢查檔案是否存在
-    file_to_rename = crud_file.get_file_metadata_by_id(db, file_id=file_id)
+    file_to_rename = await crud_file.get_file_metadata_by_id(db, file_id=file_id)
     if not file_to_rename:
         logger.warning(f"File ID {file_id} not found for renaming by user {current_user.username}")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
@@ -212,7 +392,7 @@ async def rename_file_endpoint(
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to rename this file")
         owner_id_for_crud = current_user.id # 普通使用者，傳遞 owner_id 以確保只修改自己的
 
-    updated_file = crud_file.update_file_filename(
+    updated_file = await crud_file.update_file_filename(
         db=db,
         file_id=file_id,
         new_filename=file_rename_data.new_filename,
@@ -230,26 +410,28 @@ async def rename_file_endpoint(
 
 @router.get("/all", response_model=List[FileRead], dependencies=[Depends(require_manager_or_admin_role)])
 async def list_all_files_for_admin(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     username: Optional[str] = Query(None, description="Filter files by owner's username"),
     email: Optional[str] = Query(None, description="Filter files by owner's email"),
-    skip: int = 0,
-    limit: int = 100
+    cursor: Optional[str] = Query(None, description="上一頁回應的 X-Next-Cursor 標頭"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE)
 ):
     """
     (Admin/Manager Only) 獲取系統中的所有檔案，可按使用者名稱或 email 過濾。
     """
+    after = parse_cursor(cursor)
     owner_id: Optional[int] = None
     if username:
-        user = crud_user.get_user_by_username(db, username=username)
+        user = await crud_user.get_user_by_username(db, username=username)
         if not user:
             return [] # 如果找不到使用者，直接回傳空列表
         owner_id = user.id
     elif email:
-        user = crud_user.get_user_by_email(db, email=email)
+        user = await crud_user.get_user_by_email(db, email=email)
         if not user:
             return []
         owner_id = user.id
         
-    files = crud_file.get_all_files(db=db, owner_id=owner_id, skip=skip, limit=limit)
-    return files
\ No newline at end of file
+    files = await crud_file.get_all_files(db=db, owner_id=owner_id, limit=limit + 1, after=after)
+    return paginate(files, limit, response)
\ No newline at end of file
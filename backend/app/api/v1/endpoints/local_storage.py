@@ -0,0 +1,122 @@
+# backend/app/api/v1/endpoints/local_storage.py
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+
+from app.core.config import settings
+from app.core.http_range import (
+    RangeNotSatisfiable, content_disposition, format_http_date, if_range_matches, is_not_modified, parse_range_header
+)
+from app.services.local_storage_service import LocalStorageService
+from app.services.storage_interface import StorageInterface, StorageObjectChanged
+from app.dependencies import get_storage_service
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def get_local_storage_service(
+    storage_service: StorageInterface = Depends(get_storage_service)
+) -> LocalStorageService:
+    # 只有 STORAGE_PROVIDER=local 時這些路由才存在意義
+    if not isinstance(storage_service, LocalStorageService):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return storage_service
+
+
+def _verify_token(storage_service: LocalStorageService, token: str, http_method: str) -> dict:
+    claims = storage_service.verify_signed_token(token, http_method)
+    if claims is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired storage URL.")
+    return claims
+
+
+@router.get("/{token}")
+async def download_local_file(
+    token: str,
+    request: Request,
+    storage_service: LocalStorageService = Depends(get_local_storage_service)
+):
+    """
+    以簽署的 URL 下載本機 storage 中的檔案。
+    內容以 mmap 逐塊讀取 (LocalStorageService.open_range) 後串流送出；
+    支援單一區段的 Range / If-Range (206) 與 If-None-Match / If-Modified-Since (304)。
+    """
+    claims = _verify_token(storage_service, token, "GET")
+    try:
+        object_info = storage_service.get_file_info(claims["path"])
+    except ValueError:
+        object_info = None
+    if object_info is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found in storage.")
+
+    size = object_info.size
+    etag = object_info.etag
+    last_modified = object_info.last_modified
+    headers = {"ETag": etag, "Last-Modified": format_http_date(last_modified), "Accept-Ranges": "bytes"}
+
+    if is_not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since"), etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = None
+    if if_range_matches(request.headers.get("if-range"), etag, last_modified):
+        try:
+            byte_range = parse_range_header(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{size}"},
+            )
+
+    media_type = claims.get("content_type") or object_info.content_type or "application/octet-stream"
+    if claims.get("filename"):
+        headers["Content-Disposition"] = content_disposition(claims["filename"])
+    if size == 0:
+        return Response(content=b"", media_type=media_type, headers=headers)
+
+    start, end = byte_range or (0, size - 1)
+    try:
+        # 以 stat 得到的 ETag 開啟：檔案在兩者之間被替換時不會送出與標頭不符的內容
+        chunks = storage_service.open_range(
+            claims["path"], start=start, end=end, chunk_size=settings.DOWNLOAD_CHUNK_SIZE_BYTES, etag=etag
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found in storage.")
+    except StorageObjectChanged:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="File changed while opening it; retry the request.")
+
+    headers["Content-Length"] = str(end - start + 1)
+    status_code = status.HTTP_200_OK
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+    # 同步 iterator 由 StreamingResponse 在 thread pool 中逐塊讀取 (讀取 mmap 可能觸發磁碟 I/O)
+    return StreamingResponse(chunks, status_code=status_code, media_type=media_type, headers=headers)
+
+
+@router.put("/{token}", status_code=status.HTTP_200_OK)
+async def upload_local_file(
+    token: str,
+    request: Request,
+    storage_service: LocalStorageService = Depends(get_local_storage_service)
+):
+    """
+    對應 S3 presigned PUT：把請求本體以區塊串流寫入簽署的 storage path。
+    寫入完成 (且依 LOCAL_STORAGE_FSYNC fsync) 後才回應，之後前端呼叫 /files/{id}/complete。
+    """
+    claims = _verify_token(storage_service, token, "PUT")
+    try:
+        written = await storage_service.write_stream(claims["path"], request.stream())
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid storage path.")
+    except ClientDisconnect:
+        logger.warning(f"Client disconnected while uploading to local storage path {claims['path']}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload interrupted.")
+    except OSError as e:
+        logger.error(f"Failed to write local storage path {claims['path']}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not store file.")
+
+    logger.info(f"Stored {written} bytes at local storage path {claims['path']}")
+    return Response(status_code=status.HTTP_200_OK)
@@ -0,0 +1,514 @@
+# backend/app/api/v1/endpoints/uploads.py
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Header
+from fastapi.responses import JSONResponse
+from starlette.requests import ClientDisconnect
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+import time
+import zlib
+from contextlib import suppress
+
+from app.db.session import SessionLocal, get_db
+from app.core.security import get_current_active_user
+from app.core.config import settings
+from app.core.user_cache import UserPrincipal
+from app.models.file import FileUploadStatus
+from app.models.upload_session import UploadSession
+from app.schemas.file import FileCreate, FileRead, UploadUrlRequest
+from app.schemas.upload import (
+    MultipartUploadCreateResponse, MultipartPartUrlRequest, MultipartPartUrl,
+    MultipartPartUrlResponse, MultipartUploadComplete, MIN_PART_NUMBER, MAX_PART_NUMBER,
+    ResumableUploadCreate, ResumableUploadRead,
+)
+from app.crud import file as crud_file
+from app.crud import pending_upload as crud_pending_upload
+from app.crud import upload_session as crud_upload_session
+from app.services.async_storage import AsyncStorage
+from app.services.content_store import build_storage_path, discard_stored_content, store_content
+from app.dependencies import get_async_storage_service
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+MULTIPART_NOT_SUPPORTED = "Multipart uploads are not supported by the configured storage provider."
+
+# tus 1.0 可續傳上傳協定使用的標頭
+TUS_VERSION = "1.0.0"
+TUS_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+async def get_own_pending_upload(db: AsyncSession, pending_upload_id: int, current_user: UserPrincipal):
+    pending_upload = await crud_pending_upload.get_pending_upload_by_id_and_owner(
+        db, pending_upload_id=pending_upload_id, owner_id=current_user.id
+    )
+    if not pending_upload:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found.")
+    return pending_upload
+
+
+@router.post("/multipart-uploads", response_model=MultipartUploadCreateResponse, status_code=status.HTTP_201_CREATED)
+async def create_multipart_upload(
+    upload_in: UploadUrlRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service)
+):
+    """
+    開始一個 multipart 上傳：在 storage 建立上傳並回傳 pending 的檔案元數據。
+    之後客戶端以 /parts 取得各 part 的 URL 上傳，最後呼叫 /complete。
+    回應的 protocol / sequential 說明上傳方式：S3 的 part 可以平行上傳；
+    GCS 的所有 part 共用一個 resumable session URI，必須依序以 Content-Range 上傳。
+    """
+    storage_path = build_storage_path(current_user.id, upload_in.filename)
+    try:
+        upload_id = await storage_service.create_multipart_upload(
+            storage_path=storage_path, content_type=upload_in.file_type
+        )
+    except NotImplementedError:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=MULTIPART_NOT_SUPPORTED)
+    except IOError as e:
+        logger.error(f"IOError creating multipart upload for user {current_user.id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not start upload: {e}")
+
+    file_meta_in = FileCreate(
+        filename=upload_in.filename,
+        storage_path=storage_path,
+        file_type=upload_in.file_type,
+        size=upload_in.size,
+        owner_id=current_user.id,
+        upload_status=FileUploadStatus.PENDING,
+    )
+    db_file_meta = await crud_file.create_file_metadata(db=db, file_in=file_meta_in)
+    pending_upload = await crud_pending_upload.create_pending_upload(
+        db,
+        file_id=db_file_meta.id,
+        owner_id=current_user.id,
+        storage_path=storage_path,
+        upload_id=upload_id,
+    )
+    logger.info(f"User {current_user.id} started multipart upload {pending_upload.id} for file ID {db_file_meta.id}")
+
+    sync_storage = storage_service.sync
+    alignment = sync_storage.MULTIPART_PART_ALIGNMENT
+    return MultipartUploadCreateResponse(
+        upload=pending_upload,
+        file=db_file_meta,
+        part_size=max(alignment, settings.S3_MULTIPART_CHUNKSIZE_BYTES // alignment * alignment),
+        protocol=sync_storage.MULTIPART_PROTOCOL,
+        sequential=sync_storage.MULTIPART_SEQUENTIAL,
+    )
+
+
+@router.post("/multipart-uploads/{pending_upload_id}/parts", response_model=MultipartPartUrlResponse)
+async def sign_multipart_upload_parts(
+    pending_upload_id: int,
+    part_request: MultipartPartUrlRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service)
+):
+    """
+    為一批 part 編號產生上傳 URL，讓客戶端能一次取得多個 URL 後平行上傳。
+    """
+    pending_upload = await get_own_pending_upload(db, pending_upload_id, current_user)
+
+    invalid_parts = [n for n in part_request.part_numbers if not MIN_PART_NUMBER <= n <= MAX_PART_NUMBER]
+    if invalid_parts:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Part numbers must be between {MIN_PART_NUMBER} and {MAX_PART_NUMBER}.",
+        )
+
+    expiration = settings.PRESIGNED_URL_EXPIRE_SECONDS
+    part_urls = []
+    for part_number in sorted(set(part_request.part_numbers)):
+        try:
+            url = await storage_service.generate_presigned_part_url(
+                storage_path=pending_upload.storage_path,
+                upload_id=pending_upload.upload_id,
+                part_number=part_number,
+                expiration_seconds=expiration,
+            )
+        except NotImplementedError:
+            raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=MULTIPART_NOT_SUPPORTED)
+        if not url:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not generate part upload URL.")
+        part_urls.append(MultipartPartUrl(part_number=part_number, url=url))
+
+    return MultipartPartUrlResponse(
+        parts=part_urls,
+        method="PUT",
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=expiration),
+    )
+
+
+@router.post("/multipart-uploads/{pending_upload_id}/complete", response_model=FileRead)
+async def complete_multipart_upload(
+    pending_upload_id: int,
+    complete_in: MultipartUploadComplete,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service)
+):
+    """
+    完成 multipart 上傳：在 storage 組合各個 part，並以實際大小與類型完成檔案元數據。
+    """
+    pending_upload = await get_own_pending_upload(db, pending_upload_id, current_user)
+
+    try:
+        await storage_service.complete_multipart_upload(
+            storage_path=pending_upload.storage_path,
+            upload_id=pending_upload.upload_id,
+            parts=[part.model_dump() for part in complete_in.parts],
+        )
+        object_info = await storage_service.get_file_info(storage_path=pending_upload.storage_path)
+    except NotImplementedError:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=MULTIPART_NOT_SUPPORTED)
+    except IOError as e:
+        logger.error(f"IOError completing multipart upload {pending_upload_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Could not complete upload: {e}")
+
+    if object_info is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Uploaded object not found in storage.")
+
+    file_meta = await crud_file.complete_file_upload(db, db_file=pending_upload.file, object_info=object_info)
+    await crud_pending_upload.delete_pending_upload(db, pending_upload)
+    logger.info(f"Multipart upload {pending_upload_id} completed as file ID {file_meta.id} ({object_info.size} bytes)")
+    return file_meta
+
+
+@router.delete("/multipart-uploads/{pending_upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_multipart_upload(
+    pending_upload_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service)
+):
+    """
+    中止 multipart 上傳：釋放 storage 中已上傳的 parts，並刪除 pending 的檔案元數據。
+    """
+    pending_upload = await get_own_pending_upload(db, pending_upload_id, current_user)
+    try:
+        await storage_service.abort_multipart_upload(
+            storage_path=pending_upload.storage_path, upload_id=pending_upload.upload_id
+        )
+    except NotImplementedError:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=MULTIPART_NOT_SUPPORTED)
+    except IOError as e:
+        logger.error(f"IOError aborting multipart upload {pending_upload_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not abort upload: {e}")
+
+    await crud_pending_upload.delete_pending_upload(db, pending_upload, delete_file=True)
+
+
+# --- 可續傳 (tus 風格) 上傳：經由 API 上傳，但斷線後可從已接收的 offset 繼續 ---
+
+async def get_own_upload_session(db: AsyncSession, session_id: str, current_user: UserPrincipal):
+    upload_session = await crud_upload_session.get_upload_session_by_id_and_owner(
+        db, session_id=session_id, owner_id=current_user.id
+    )
+    if not upload_session:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found.")
+    return upload_session
+
+
+def upload_offset_headers(upload_session) -> dict:
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(upload_session.offset),
+        "Upload-Length": str(upload_session.expected_size),
+        "Upload-Checksum-CRC32": format(upload_session.checksum_crc32, "08x"),
+        "Cache-Control": "no-store",
+    }
+
+
+@router.post("/resumable-uploads", response_model=ResumableUploadRead, status_code=status.HTTP_201_CREATED)
+async def create_resumable_upload(
+    upload_in: ResumableUploadCreate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+):
+    """
+    建立可續傳上傳的 session。客戶端之後以 PATCH 依序附加資料區塊，
+    斷線後以 HEAD 查詢已接收的 offset 再繼續。
+    """
+    if upload_in.size > settings.RESUMABLE_UPLOAD_MAX_SIZE_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload size cannot exceed {settings.RESUMABLE_UPLOAD_MAX_SIZE_BYTES} bytes.",
+        )
+    os.makedirs(settings.RESUMABLE_UPLOAD_DIR, exist_ok=True)
+    upload_session = await crud_upload_session.create_upload_session(
+        db,
+        owner_id=current_user.id,
+        filename=upload_in.filename,
+        file_type=upload_in.file_type,
+        expected_size=upload_in.size,
+        staging_dir=settings.RESUMABLE_UPLOAD_DIR,
+    )
+    response.headers.update(upload_offset_headers(upload_session))
+    response.headers["Location"] = str(request.url_for("append_resumable_upload", session_id=upload_session.id))
+    logger.info(f"User {current_user.id} created resumable upload session {upload_session.id} ({upload_in.size} bytes)")
+    return upload_session
+
+
+@router.head("/resumable-uploads/{session_id}")
+async def get_resumable_upload_offset(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+):
+    """查詢已接收的 offset (Upload-Offset 標頭)，客戶端從此處繼續上傳。"""
+    upload_session = await get_own_upload_session(db, session_id, current_user)
+    return Response(status_code=status.HTTP_200_OK, headers=upload_offset_headers(upload_session))
+
+
+@router.patch("/resumable-uploads/{session_id}", name="append_resumable_upload")
+async def append_resumable_upload(
+    session_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    content_type: str = Header(..., alias="Content-Type"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    storage_service: AsyncStorage = Depends(get_async_storage_service)
+):
+    """
+    從 Upload-Offset 開始附加一個資料區塊。請求本體以串流方式寫入暫存檔，
+    即使連線中途中斷，已寫入的部分也會被保留並計入 offset。
+    收到全部資料後自動完成上傳，並回傳檔案元數據。
+    """
+    if content_type.split(";")[0].strip() != TUS_CONTENT_TYPE:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=f"Content-Type must be {TUS_CONTENT_TYPE}.")
+
+    upload_session = await get_own_upload_session(db, session_id, current_user)
+    if upload_offset != upload_session.offset:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload-Offset does not match the current offset.",
+            headers=upload_offset_headers(upload_session),
+        )
+    if upload_session.completed_file_id is not None:
+        # 已完成的 session：重試的最後一個 PATCH (例如等待完成時逾時) 取得同一個檔案，不會重複建立
+        return await completed_upload_response(db, upload_session)
+
+    # 先在資料庫取得 session 的獨佔租約才開啟暫存檔：同一個 offset 的並行 PATCH (客戶端在前一個請求
+    # 仍在進行時重試) 只有一個會寫入，另一個直接回應 409，不會在同一個檔案中交錯 truncate 與寫入
+    start_offset = upload_session.offset
+    original_checksum = upload_session.checksum_crc32
+    lease_seconds = settings.RESUMABLE_UPLOAD_CLAIM_SECONDS
+    claim_token = await crud_upload_session.claim_upload_session(
+        db, upload_session, expected_offset=start_offset, lease_seconds=lease_seconds
+    )
+    if claim_token is None:
+        await db.refresh(upload_session)
+        if upload_session.completed_file_id is not None:
+            return await completed_upload_response(db, upload_session)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another request is appending to this upload session.",
+            headers=upload_offset_headers(upload_session),
+        )
+
+    new_offset = start_offset
+    checksum = original_checksum
+    disconnected = False
+    renew_at = time.monotonic() + lease_seconds / 2
+    try:
+        mode = "r+b" if os.path.exists(upload_session.staging_path) else "wb"
+        with open(upload_session.staging_path, mode) as staging_file:
+            staging_file.seek(start_offset)
+            staging_file.truncate() # 捨棄先前中斷的請求在 offset 之後留下的資料
+            try:
+                async for chunk in request.stream():
+                    if new_offset + len(chunk) > upload_session.expected_size:
+                        staging_file.truncate(start_offset)
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Upload exceeds the declared Upload-Length.",
+                        )
+                    if time.monotonic() >= renew_at:
+                        # 寫入前先續約 (客戶端可能停頓超過租約)；續約失敗表示租約已過期並被其他請求取得，
+                        # 暫存檔已屬於該請求，不能再寫入
+                        if not await crud_upload_session.renew_upload_session_claim(
+                            db, upload_session, claim_token, lease_seconds
+                        ):
+                            raise HTTPException(
+                                status_code=status.HTTP_409_CONFLICT,
+                                detail="Upload session was claimed by another request.",
+                            )
+                        renew_at = time.monotonic() + lease_seconds / 2
+                    staging_file.write(chunk)
+                    checksum = zlib.crc32(chunk, checksum)
+                    new_offset += len(chunk)
+            except ClientDisconnect:
+                disconnected = True
+            # offset 只有在資料確實落盤之後才推進；fsync 可能很慢，不在 event loop 上執行
+            staging_file.flush()
+            await storage_service.run(os.fsync, staging_file.fileno())
+    except Exception:
+        # 不推進 offset，只釋放租約 (租約已被其他請求取得時不會更新任何資料)
+        await crud_upload_session.advance_upload_session(
+            db, upload_session, claim_token, new_offset=start_offset, checksum_crc32=original_checksum
+        )
+        raise
+
+    # 收到全部資料時保留租約直到完成上傳：完成期間重試的 PATCH 無法取得 session，不會完成第二次
+    complete = not disconnected and new_offset == upload_session.expected_size
+    if not await crud_upload_session.advance_upload_session(
+        db, upload_session, claim_token, new_offset=new_offset, checksum_crc32=checksum, release_claim=not complete
+    ):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session was modified concurrently.")
+
+    if disconnected:
+        logger.info(f"Client disconnected from resumable upload {session_id} at offset {new_offset}")
+        return Response(status_code=status.HTTP_204_NO_CONTENT, headers=upload_offset_headers(upload_session))
+
+    if not complete:
+        return Response(status_code=status.HTTP_204_NO_CONTENT, headers=upload_offset_headers(upload_session))
+
+    try:
+        file_meta = await finalize_resumable_upload(db, upload_session, claim_token, current_user, storage_service)
+    except Exception:
+        # 完成失敗 (例如 storage 暫時無法使用)：釋放租約，客戶端可以重送最後一個 (空的) PATCH 重試；
+        # CRC 不一致時 session 已被刪除，不需要釋放
+        await db.rollback()
+        if not sa_inspect(upload_session).was_deleted:
+            await db.refresh(upload_session)
+            await crud_upload_session.advance_upload_session(
+                db, upload_session, claim_token, new_offset=new_offset, checksum_crc32=checksum
+            )
+        raise
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=FileRead.model_validate(file_meta).model_dump(mode="json"),
+        headers=upload_offset_headers(upload_session),
+    )
+
+
+async def completed_upload_response(db: AsyncSession, upload_session) -> JSONResponse:
+    file_meta = await crud_file.get_file_metadata_by_id(db, file_id=upload_session.completed_file_id)
+    if file_meta is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="The uploaded file has been deleted.")
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=FileRead.model_validate(file_meta).model_dump(mode="json"),
+        headers=upload_offset_headers(upload_session),
+    )
+
+
+async def keep_upload_session_claim(session_id: str, claim_token: str, lease_seconds: int) -> None:
+    """
+    完成上傳 (存入 storage 可能很久) 期間定期續約。使用獨立的資料庫 session：
+    完成上傳的請求同時在使用自己的 session，AsyncSession 不能並行使用。
+    """
+    while True:
+        await asyncio.sleep(max(lease_seconds / 2, 1))
+        async with SessionLocal() as renew_db:
+            upload_session = await renew_db.get(UploadSession, session_id)
+            if upload_session is None or not await crud_upload_session.renew_upload_session_claim(
+                renew_db, upload_session, claim_token, lease_seconds
+            ):
+                logger.warning(f"Lost the claim on resumable upload {session_id} while completing it")
+                return
+
+
+def _file_crc32(path: str, chunk_size: int = settings.UPLOAD_CHUNK_SIZE_BYTES) -> tuple[int, int]:
+    """以固定大小的區塊讀過整個檔案，返回 (CRC32, 大小)。"""
+    checksum = 0
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            checksum = zlib.crc32(chunk, checksum)
+            size += len(chunk)
+    return checksum, size
+
+
+async def finalize_resumable_upload(
+    db: AsyncSession, upload_session, claim_token: str, current_user: UserPrincipal, storage_service: AsyncStorage
+):
+    """
+    以持有的租約把完整的暫存檔存入 storage (經過內容去重)，建立一般的檔案元數據並記錄在 session 上，
+    最後刪除暫存檔。session 紀錄保留到 reaper 清除，重試的 PATCH 會取得同一個檔案。
+    """
+    renewer = asyncio.create_task(
+        keep_upload_session_claim(upload_session.id, claim_token, settings.RESUMABLE_UPLOAD_CLAIM_SECONDS)
+    )
+    try:
+        file_meta = await _store_resumable_upload(db, upload_session, claim_token, current_user, storage_service)
+    finally:
+        renewer.cancel()
+        with suppress(asyncio.CancelledError):
+            await renewer
+    try:
+        os.remove(upload_session.staging_path)
+    except FileNotFoundError:
+        pass
+    logger.info(f"Resumable upload {upload_session.id} completed as file ID {file_meta.id}")
+    return file_meta
+
+
+async def _store_resumable_upload(
+    db: AsyncSession, upload_session, claim_token: str, current_user: UserPrincipal, storage_service: AsyncStorage
+):
+    # 存入 storage 之前確認暫存檔與各次 PATCH 累計的 CRC32 一致，暫存檔被其他程序改動時不會存入損毀的內容
+    staged_checksum, staged_size = await storage_service.run(_file_crc32, upload_session.staging_path)
+    if staged_checksum != upload_session.checksum_crc32 or staged_size != upload_session.expected_size:
+        logger.error(
+            f"Resumable upload {upload_session.id} staging file does not match its recorded checksum or size; discarding it"
+        )
+        await crud_upload_session.delete_upload_session(db, upload_session)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Received data failed the checksum verification; please restart the upload.",
+        )
+
+    try:
+        with open(upload_session.staging_path, "rb") as staging_file:
+            stored_content = await store_content(
+                db,
+                storage_service,
+                staging_file,
+                owner_id=current_user.id,
+                filename=upload_session.filename,
+                content_type=upload_session.file_type,
+            )
+    except IOError as e:
+        logger.error(f"IOError finalizing resumable upload {upload_session.id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not upload file: {e}")
+
+    file_meta_in = FileCreate(
+        filename=upload_session.filename,
+        storage_path=stored_content.storage_path,
+        file_type=upload_session.file_type,
+        size=stored_content.size,
+        owner_id=current_user.id,
+        blob_id=stored_content.blob_id,
+    )
+    try:
+        # 與 blob 引用數的變更在同一個 transaction 中 commit；租約已被其他請求取得時不建立檔案
+        file_meta = await crud_upload_session.complete_upload_session(db, upload_session, claim_token, file_meta_in)
+    except Exception:
+        await discard_stored_content(db, storage_service, stored_content)
+        raise
+    if file_meta is None:
+        await discard_stored_content(db, storage_service, stored_content)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session was claimed by another request.")
+    return file_meta
+
+
+@router.delete("/resumable-uploads/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_resumable_upload(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+):
+    """取消可續傳上傳並刪除已接收的資料。"""
+    upload_session = await get_own_upload_session(db, session_id, current_user)
+    await crud_upload_session.delete_upload_session(db, upload_session)
@@ -1,10 +1,11 @@
 # backend/app/api/v1/endpoints/users.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Any
 
-from app.db.session import get_db
-from app.core.security import get_current_active_user
+from app.db.session import get_db, get_read_db
+from app.core.security import get_current_active_user, get_current_active_db_user, get_password_hasher
+from app.core.user_cache import UserPrincipal
 from app.models.user import User, UserRole # 匯入 User 和 UserRole
 from app.schemas.user import UserRead, AdminUserCreate, AdminResetPassword # 用於回應
 from app.schemas.admin import AdminUserUpdate # 用於管理員更新使用者
@@ -20,7 +21,7 @@ logger = logging.getLogger(__name__) # 設定 logger
 
 router = APIRouter()
 
-def require_admin_role(current_user: User = Depends(get_current_active_user)):
+def require_admin_role(current_user: UserPrincipal = Depends(get_current_active_user)):
     """
     相依性：要求目前使用者必須是 ADMIN 角色。
     """
@@ -31,7 +32,7 @@ def require_admin_role(current_user: User = Depends(get_current_active_user)):
         )
     return current_user
 
-def require_manager_or_admin_role(current_user: User = Depends(get_current_active_user)):
+def require_manager_or_admin_role(current_user: UserPrincipal = Depends(get_current_active_user)):
     """
     相依性：要求目前使用者必須是 MANAGER 或 ADMIN 角色。
     """
@@ -46,25 +47,25 @@ def require_manager_or_admin_role(current_user: User = Depends(get_current_activ
 async def read_users_by_admin(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    # current_admin: User = Depends(require_admin_role) # 已透過 dependencies 注入並檢查
+    db: AsyncSession = Depends(get_read_db),
+    # current_admin: UserPrincipal = Depends(require_admin_role) # 已透過 dependencies 注入並檢查
 ):
     """
     (Admin only) 獲取使用者列表。
     """
-    users = crud_user.get_users(db, skip=skip, limit=limit)
+    users = await crud_user.get_users(db, skip=skip, limit=limit)
     return users
 
 @router.get("/{user_id}", response_model=UserRead, dependencies=[Depends(require_admin_role)])
 async def read_user_by_admin(
     user_id: int,
-    db: Session = Depends(get_db),
-    # current_admin: User = Depends(require_admin_role)
+    db: AsyncSession = Depends(get_read_db),
+    # current_admin: UserPrincipal = Depends(require_admin_role)
 ):
     """
     (Admin only) 根據 ID 獲取特定使用者資訊。
     """
-    db_user = crud_user.get_user(db, user_id=user_id)
+    db_user = await crud_user.get_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return db_user
@@ -73,13 +74,13 @@ async def read_user_by_admin(
 async def update_user_by_admin_endpoint(
     user_id: int,
     user_in: AdminUserUpdate, # 從請求主體獲取更新資料
-    db: Session = Depends(get_db),
-    # current_admin: User = Depends(require_admin_role)
+    db: AsyncSession = Depends(get_db),
+    # current_admin: UserPrincipal = Depends(require_admin_role)
 ):
     """
     (Admin only) 更新使用者資訊 (例如角色、啟用狀態)。
     """
-    user_to_update = crud_user.get_user(db, user_id=user_id)
+    user_to_update = await crud_user.get_user(db, user_id=user_id)
     if not user_to_update:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
@@ -89,14 +90,14 @@ async def update_user_by_admin_endpoint(
     #    (user_in.role != UserRole.ADMIN or user_in.is_active is False):
     #     raise HTTPException(status_code=400, detail="Admin users cannot demote themselves or deactivate their own account this way.")
 
-    updated_user = crud_user.update_user_by_admin(db=db, user_to_update=user_to_update, user_in=user_in)
+    updated_user = await crud_user.update_user_by_admin(db=db, user_to_update=user_to_update, user_in=user_in)
     return updated_user
 
 @router.delete("/{user_id}", response_model=UserRead, dependencies=[Depends(require_admin_role)])
 async def delete_user_by_admin(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_admin: User = Depends(require_admin_role) # 確保是 Admin 操作
+    db: AsyncSession = Depends(get_db),
+    current_admin: UserPrincipal = Depends(require_admin_role) # 確保是 Admin 操作
 ):
     """
     (Admin only) 刪除使用者。
@@ -105,7 +106,7 @@ async def delete_user_by_admin(
     if user_id == current_admin.id: # 防止管理員刪除自己
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Administrators cannot delete their own account.")
 
-    user_to_delete = crud_user.remove_user(db, user_id=user_id)
+    user_to_delete = await crud_user.remove_user(db, user_id=user_id)
     if not user_to_delete:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user_to_delete # 回傳被刪除的使用者資訊
@@ -113,8 +114,8 @@ async def delete_user_by_admin(
 @router.patch("/users/me/username", response_model=UserRead)
 async def update_own_username(
     user_update_data: UserUpdateUsername, # 接收包含新 username 的請求主體
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user) # 獲取目前登入的使用者
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_db_user) # 需要修改使用者，從資料庫載入
 ):
     """
     更新目前登入使用者自己的 username。
@@ -127,7 +128,7 @@ async def update_own_username(
         # 這裡我們直接返回，因為沒有實際變更
         return current_user
 
-    updated_user = crud_user.update_current_user_username(
+    updated_user = await crud_user.update_current_user_username(
         db=db, user_to_update=current_user, new_username=new_username
     )
 
@@ -144,14 +145,14 @@ async def update_own_username(
 @router.patch("/me/password", status_code=status.HTTP_204_NO_CONTENT)
 async def update_own_password(
     password_data: UserUpdatePassword,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_db_user), # 需要密碼雜湊，從資料庫載入
 ):
     """
     更新目前使用者自己的密碼。
     """
     # 驗證舊密碼是否正確
-    if not crud_user.verify_password(password_data.current_password, current_user.hashed_password):
+    if not await get_password_hasher().verify(password_data.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password",
@@ -165,7 +166,7 @@ async def update_own_password(
         )
 
     # 更新密碼
-    crud_user.update_user_password(db=db, user=current_user, new_password=password_data.new_password)
+    await crud_user.update_user_password(db=db, user=current_user, new_password=password_data.new_password)
     
     # HTTP 204 不需要回傳 body
     return
@@ -173,32 +174,32 @@ async def update_own_password(
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_admin_role)])
 async def create_user_as_admin(
     user_in: AdminUserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     (Admin only) 建立新使用者，可指定角色。
     """
     # 檢查 email 和 username 是否已被註冊
-    if crud_user.get_user_by_email(db, email=user_in.email):
+    if await crud_user.get_user_by_email(db, email=user_in.email):
         raise HTTPException(status_code=400, detail="Email already registered")
-    if crud_user.get_user_by_username(db, username=user_in.username):
+    if await crud_user.get_user_by_username(db, username=user_in.username):
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    user = crud_user.create_user_by_admin(db=db, user_in=user_in)
+    user = await crud_user.create_user_by_admin(db=db, user_in=user_in)
     return user
 
 @router.patch("/{user_id}/reset-password", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_admin_role)])
 async def reset_password_by_admin(
     user_id: int,
     password_data: AdminResetPassword,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     (Admin only) 重設指定使用者的密碼。
     """
-    user = crud_user.get_user(db, user_id=user_id)
+    user = await crud_user.get_user(db, user_id=user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    crud_user.update_user_password(db=db, user=user, new_password=password_data.new_password)
+    await crud_user.update_user_password(db=db, user=user, new_password=password_data.new_password)
     return
\ No newline at end of file
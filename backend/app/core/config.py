@@ -4,6 +4,15 @@ from typing import Optional, List
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # API 使用的 async 連線字串；未設定時由 DATABASE_URL 自動換成對應的 async driver
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # 唯讀副本 (read replica)；設定後列表類的唯讀 endpoint 改從副本讀取 (可能落後主庫數秒)
+    DATABASE_READ_URL: Optional[str] = None
+    # --- SQLAlchemy 連線池 (每個 worker process 各自一個；主庫與副本各自一個) ---
+    DB_POOL_SIZE: int = 5 # 常駐的連線數
+    DB_MAX_OVERFLOW: int = 10 # 尖峰時可額外開啟的連線數
+    DB_POOL_TIMEOUT_SECONDS: float = 30 # 連線都在使用中時等待的上限，超過則拋出錯誤
+    DB_POOL_RECYCLE_SECONDS: int = 1800 # 連線使用超過此秒數後重新建立 (早於資料庫或 proxy 的閒置逾時)；-1 表示不重建
     
     PROJECT_NAME: str
     VERSION: str
@@ -13,6 +22,41 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # --- Password Hashing Settings ---
+    # 第一個是新雜湊使用的演算法，其餘的只用來驗證既有的雜湊 (登入成功時自動改用第一個重新雜湊)
+    # 使用 argon2 需要另外安裝 argon2-cffi
+    PASSWORD_HASH_SCHEMES: List[str] = ["bcrypt"]
+    # 成本參數可用 `python -m benchmarks.calibrate_password_hash` 在部署的硬體上量測後寫入 .env；
+    # 調整後，成本不同的既有雜湊會在使用者下次登入時重新雜湊
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST_KIB: int = 19456
+    ARGON2_PARALLELISM: int = 1
+    # bcrypt 在專用的 thread pool 中執行的 thread 數；未設定時為 CPU 核心數 - 1 (至少 1)，保留一個核心給 event loop
+    PASSWORD_HASH_MAX_WORKERS: Optional[int] = None
+    # 執行中加上排隊中的上限，超過時登入 / 註冊等請求直接回應 503
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+
+    # --- Login / Refresh Rate Limit Settings (token bucket) ---
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory" # "memory": 每個 worker 各自計算；"database": 以資料庫在所有 worker 之間共用
+    RATE_LIMIT_MEMORY_MAX_KEYS: int = 100000
+    # BURST 為可連續嘗試的次數，PER_MINUTE 為之後每分鐘恢復的次數
+    LOGIN_RATE_LIMIT_IP_BURST: int = 20
+    LOGIN_RATE_LIMIT_IP_PER_MINUTE: float = 20
+    LOGIN_RATE_LIMIT_USERNAME_BURST: int = 10
+    LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE: float = 5
+    REFRESH_RATE_LIMIT_IP_BURST: int = 60
+    REFRESH_RATE_LIMIT_IP_PER_MINUTE: float = 60
+
+    # --- Authenticated-user Cache Settings ---
+    # get_current_user 快取使用者的 id / 角色 / 啟用狀態，命中時不查詢資料庫
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60 # 沒有收到失效通知時，變更最多延遲這麼久才生效
+    USER_CACHE_INVALIDATION_BROKER: str = "local" # "local": 單一 worker；"postgres": 以 LISTEN/NOTIFY 通知所有 worker
+
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
 
@@ -28,11 +72,73 @@ class Settings(BaseSettings):
     AWS_SESSION_TOKEN: Optional[str] = None # For AWS Academy temporary credentials
     AWS_REGION: Optional[str] = None
     S3_BUCKET_NAME: Optional[str] = None
+    # --- S3 Transfer Settings (boto3 TransferConfig) ---
+    S3_MULTIPART_THRESHOLD_BYTES: int = 8 * 1024 * 1024 # 超過此大小改用 multipart upload
+    S3_MULTIPART_CHUNKSIZE_BYTES: int = 8 * 1024 * 1024 # 每個 part 的大小 (S3 最小 5 MB)
+    S3_MAX_CONCURRENCY: int = 10 # 同時上傳的 part 數
+    S3_MAX_POOL_CONNECTIONS: int = 10 # boto3 client 的連線池大小，應 >= S3_MAX_CONCURRENCY
+    S3_REPORT_PART_THROUGHPUT: bool = False # 是否記錄每個 part 的上傳吞吐量
+
+    # --- Google Cloud Storage Settings ---
+    GOOGLE_APPLICATION_CREDENTIALS: Optional[str] = None
+    GCS_BUCKET_NAME: Optional[str] = None
+    GCS_UPLOAD_ORIGIN: Optional[str] = None # 前端的 origin，用於瀏覽器直接上傳到 resumable session
+
+    # --- Local Filesystem Storage Settings (STORAGE_PROVIDER=local) ---
+    LOCAL_STORAGE_ROOT: str = "uploads"
+    LOCAL_STORAGE_FSYNC: str = "always" # "always": 每次寫入後 fsync 檔案與目錄；"never": 交給 OS 決定何時寫回
+    LOCAL_STORAGE_BASE_URL: str = "" # 簽署 URL 的前綴 (例如 https://api.example.com)；空字串表示相對路徑
+
+    # --- Storage Executor Settings ---
+    # 執行阻塞式 storage 呼叫 (boto3 / google-cloud-storage) 的專用 thread 數，即同時進行的 storage 呼叫上限
+    STORAGE_EXECUTOR_MAX_WORKERS: int = 16
+
+    # --- Health Check / Warm-up Settings ---
+    STARTUP_WARMUP_ENABLED: bool = True # 啟動時預先建立資料庫連線與 storage client
+    STARTUP_WARMUP_DB_CONNECTIONS: int = 2 # 預先建立的資料庫連線數 (不超過連線池大小)
+    HEALTH_CHECK_CACHE_SECONDS: float = 5.0 # /health?deep=1 的探測結果快取秒數
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2.0 # 每個探測的逾時
 
     # --- Presigned URL Settings ---
     PRESIGNED_URL_EXPIRE_SECONDS: int = 3600 # Default 1 hour
     PRESIGNED_URL_EXPIRE_SECONDS_MAX: int = 86400 # Maximum 24 hours
 
+    # --- Download Proxy Settings (GET /files/{id}/content) ---
+    # 每次從 storage 讀取並送給客戶端的區塊大小；每個進行中的下載最多在記憶體中保留一塊
+    DOWNLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024 # 1 MB
+
+    # --- Upload Settings ---
+    # 上傳時每次從 spool 讀取並交給 storage backend 的區塊大小 (GCS 需為 256 KB 的倍數)
+    UPLOAD_CHUNK_SIZE_BYTES: int = 8 * 1024 * 1024 # 8 MB
+    # 以 SHA-256 對經由 API 上傳的內容去重，相同內容只在 storage 中存一份
+    CONTENT_DEDUP_ENABLED: bool = True
+    # 超過此時間仍未完成的 multipart / presigned 上傳會被背景 reaper 中止並清除
+    MULTIPART_UPLOAD_EXPIRE_HOURS: int = 24
+    UPLOAD_REAPER_ENABLED: bool = True
+    UPLOAD_REAPER_INTERVAL_SECONDS: int = 3600
+    # 可續傳上傳的暫存目錄；多節點部署時所有 API 節點需掛載同一個共享 volume
+    RESUMABLE_UPLOAD_DIR: str = "uploads/sessions"
+    RESUMABLE_UPLOAD_MAX_SIZE_BYTES: int = 50 * 1024 * 1024 * 1024 # 50 GB
+    # PATCH 寫入暫存檔前取得的 session 租約秒數，寫入期間每過一半就續約；請求中斷 (例如 worker 被終止) 時租約過期後才能續傳
+    RESUMABLE_UPLOAD_CLAIM_SECONDS: int = 60
+
+    # --- Production Server Settings (python -m app.server) ---
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: Optional[int] = None # None: 依可用的 CPU 與記憶體自動決定
+    SERVER_WORKER_MEMORY_MB: int = 512 # 自動決定 worker 數時每個 worker 預留的記憶體
+    SERVER_MAX_REQUESTS: int = 10000 # 每個 worker 處理這麼多請求後重新啟動 (0 表示不限制)，限制記憶體增長
+    SERVER_MAX_REQUESTS_JITTER: int = 1000 # 隨機加上 0 ~ jitter，避免所有 worker 同時重新啟動
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 120 # 停止或重新啟動 worker 時等待進行中請求 (例如上傳) 完成的上限
+    SERVER_PROXY_HEADERS: bool = True # 信任 X-Forwarded-For 等標頭 (來源限定為 SERVER_FORWARDED_ALLOW_IPS)
+    SERVER_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    # 多個 worker 時各自的 metrics 寫入此目錄，/metrics 回應合併後的結果；未設定時 master 建立暫存目錄
+    SERVER_METRICS_DIR: Optional[str] = None
+    SERVER_METRICS_FLUSH_SECONDS: float = 5
+    # 多個 worker 需要 USER_CACHE_INVALIDATION_BROKER="postgres" 與 RATE_LIMIT_BACKEND="database"，
+    # 否則快取失效與 rate limit 只在單一 worker 內生效；設為 True 時只記錄警告並照常啟動
+    SERVER_ALLOW_PER_WORKER_STATE: bool = False
+
     ENVIRONMENT: str = "development"
     LOG_LEVEL: str = "info"
     CLOUDWATCH_LOG_GROUP: Optional[str] = None
@@ -40,6 +146,12 @@ class Settings(BaseSettings):
     
     # --- 新增 Refresh Token 相關設定 ---
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7 # Refresh Token 預設 7 天過期
+    # 背景任務定期分批刪除已過期、以及撤銷超過保留天數的 Refresh Token
+    REFRESH_TOKEN_PURGE_ENABLED: bool = True
+    REFRESH_TOKEN_PURGE_INTERVAL_SECONDS: int = 3600
+    REFRESH_TOKEN_PURGE_BATCH_SIZE: int = 1000 # 每個 transaction 最多刪除的列數
+    REFRESH_TOKEN_PURGE_BATCH_PAUSE_SECONDS: float = 0.5 # 批次之間的間隔，讓其他請求取得鎖與連線
+    REFRESH_TOKEN_REVOKED_RETENTION_DAYS: int = 7 # 撤銷後保留的天數 (方便追查 token 重複使用)
     REFRESH_TOKEN_COOKIE_NAME: str = "refresh_token"
     REFRESH_TOKEN_COOKIE_PATH: str = "/"
     REFRESH_TOKEN_COOKIE_DOMAIN: Optional[str] = None # None 表示僅限當前網域
@@ -0,0 +1,84 @@
+# backend/app/core/http_metrics.py
+import time
+
+from starlette.routing import replace_params
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import Counter, Histogram
+
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", labelnames=("method", "route")
+)
+http_requests = Counter(
+    "http_requests", "HTTP requests by route template and status code", labelnames=("method", "route", "status")
+)
+
+UNMATCHED_ROUTE = "unmatched" # 404 等沒有對應 route 的請求合併為一個 label，避免任意路徑造成 label 數量暴增
+
+
+def get_route_template(scope: Scope) -> str:
+    """
+    返回請求對應的 route 範本。router 比對成功後會把 route 放進 scope (與 middleware 共用同一個 dict)。
+    route.path 可能不含 include_router 的 prefix (依 FastAPI 版本而定)，因此以實際路徑中
+    route 本身以外的部分作為 prefix 補回。
+    """
+    route = scope.get("route")
+    route_path = getattr(route, "path", None)
+    if route_path is None:
+        return UNMATCHED_ROUTE
+    path = scope["path"]
+    try:
+        # replace_params 會修改傳入的 dict，所以傳入複本
+        rendered, _ = replace_params(route.path_format, route.param_convertors, dict(scope.get("path_params", {})))
+    except (AttributeError, KeyError, ValueError):
+        return route_path
+    if rendered and path.endswith(rendered):
+        return path[: len(path) - len(rendered)] + route_path
+    return route_path
+
+
+class HTTPMetricsMiddleware:
+    """
+    記錄每個 HTTP 請求的延遲與狀態碼。
+
+    以 route 的路徑範本 (例如 /api/v1/files/{file_id}) 作為 label，而不是實際的 URL，
+    label 的數量固定為 route 數 x method 數。使用純 ASGI middleware 而不是 BaseHTTPMiddleware，
+    不會額外建立 task 或包裝 response body，串流下載也不受影響。
+    延遲量到 response 的第一個訊息 (http.response.start)，不包含串流 body 的傳送時間。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500 # app 拋出例外而沒有送出 response 時視為 500
+        recorded = False
+
+        def record() -> None:
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route_path = get_route_template(scope)
+            method = scope["method"]
+            http_request_duration_seconds.labels(method=method, route=route_path).observe(
+                time.perf_counter() - started
+            )
+            http_requests.labels(method=method, route=route_path, status=str(status_code)).inc()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                record()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record()
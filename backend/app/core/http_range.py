@@ -0,0 +1,108 @@
+# backend/app/core/http_range.py
+"""
+HTTP 條件式請求與 Range 請求的解析 (RFC 9110)，給自行串流內容的 endpoint 使用。
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+
+class RangeNotSatisfiable(ValueError):
+    """Range 的起點超過內容長度，endpoint 應回應 416 並帶上 Content-Range: bytes */{size}。"""
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析 Range 標頭，返回 (start, end) (含兩端)。
+    沒有 Range、語法不正確或要求多個區段時返回 None，表示忽略 Range 並回應完整內容。
+    """
+    if not header:
+        return None
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, dash, last = ranges.strip().partition("-")
+    if not dash or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+
+    if not first: # bytes=-N：最後 N 個位元組
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - suffix), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _etags(header: str) -> list:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches_any(header: str, etag: str) -> bool:
+    """If-None-Match 使用的弱比較：忽略 W/ 前綴，"*" 符合任何 ETag。"""
+    return any(tag == "*" or _opaque(tag) == _opaque(etag) for tag in _etags(header))
+
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def format_http_date(value: datetime) -> str:
+    return format_datetime(as_utc(value), usegmt=True)
+
+
+def as_utc(value: datetime) -> datetime:
+    """資料庫中的時間是不帶時區的 UTC (datetime.utcnow)。HTTP 日期只到秒，去掉微秒。"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def is_not_modified(
+    if_none_match: Optional[str], if_modified_since: Optional[str], etag: str, last_modified: datetime
+) -> bool:
+    """是否應回應 304。有 If-None-Match 時只看它 (RFC 9110 13.2.2)，忽略 If-Modified-Since。"""
+    if if_none_match:
+        return etag_matches_any(if_none_match, etag)
+    since = parse_http_date(if_modified_since)
+    return since is not None and as_utc(last_modified) <= since
+
+
+def if_range_matches(if_range: Optional[str], etag: str, last_modified: datetime) -> bool:
+    """
+    If-Range 成立時才處理 Range，否則回應完整內容 (客戶端手上的部分內容已經過期)。
+    ETag 使用強比較 (弱 ETag 永遠不符合)；日期必須與 Last-Modified 完全相同。
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return not if_range.startswith("W/") and if_range == etag
+    since = parse_http_date(if_range)
+    return since is not None and since == as_utc(last_modified)
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """
+    與 presigned URL 相同的 Content-Disposition 格式；非 ASCII 的檔名使用 RFC 6266 的 filename*。
+    含引號、反斜線或控制字元的檔名也改用 filename*，避免破壞標頭。
+    """
+    if filename.isascii() and filename.isprintable() and '"' not in filename and "\\" not in filename:
+        return f'{disposition}; filename="{filename}"'
+    return f"{disposition}; filename*=UTF-8''{quote(filename)}"
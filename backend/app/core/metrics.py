@@ -0,0 +1,308 @@
+# backend/app/core/metrics.py
+"""
+輕量的 in-process metrics，以 Prometheus text exposition format 從 /metrics 輸出。
+
+每個 worker process 各自累計。多 worker 部署 (python -m app.server) 時各 worker 定期把
+snapshot() 寫入共享目錄，/metrics 合併所有 worker 的結果輸出 (見 app.core.metrics_multiprocess)。
+"""
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_family(name: str, documentation: str, metric_type: str, labelnames: Sequence[str], samples) -> str:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+    for suffix, labelvalues, extra, value in samples:
+        lines.append(f"{name}{suffix}{_format_labels(labelnames, labelvalues, extra)} {_format_value(value)}")
+    return "\n".join(lines)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: LabelValues, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, labelvalues)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(str(value))}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["MetricsRegistry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock() # storage executor 與 bcrypt pool 的 thread 也會更新 metrics
+        self._children: Dict[LabelValues, "_Metric"] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *labelvalues: str, **labelkwargs: str):
+        if labelkwargs:
+            labelvalues = tuple(str(labelkwargs[name]) for name in self.labelnames)
+        key = tuple(str(value) for value in labelvalues)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}")
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._new_child()
+                self._children[key] = child
+            return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> List[Tuple[str, LabelValues, Optional[Dict[str, str]], float]]:
+        """返回 (suffix, label values, 額外 labels, value) 的列表。"""
+        if not self.labelnames:
+            return self._own_samples(())
+        samples = []
+        with self._lock:
+            children = list(self._children.items())
+        for labelvalues, child in children:
+            samples.extend(child._own_samples(labelvalues))
+        return samples
+
+    def _own_samples(self, labelvalues: LabelValues):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return _render_family(self.name, self.documentation, self.metric_type, self.labelnames, self._samples())
+
+    def snapshot(self) -> dict:
+        """可序列化為 JSON 的目前值，給 merge_snapshots 合併多個 process 的結果。"""
+        return {
+            "help": self.documentation,
+            "type": self.metric_type,
+            "labelnames": list(self.labelnames),
+            "samples": [
+                [suffix, list(labelvalues), extra or {}, value] for suffix, labelvalues, extra, value in self._samples()
+            ],
+        }
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def _own_samples(self, labelvalues: LabelValues):
+        return [("_total", labelvalues, None, self._value)]
+
+
+class Counter(_Metric):
+    """只增不減的計數器。name 不含 _total，輸出時自動加上。"""
+    metric_type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        self._child = _CounterChild()
+        super().__init__(*args, **kwargs)
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._child.inc(amount)
+
+    @property
+    def value(self) -> float:
+        return self._child.value
+
+    def _own_samples(self, labelvalues: LabelValues):
+        return self._child._own_samples(labelvalues)
+
+
+class _GaugeChild:
+    def __init__(self, function: Optional[Callable[[], float]] = None):
+        self._value = 0.0
+        self._function = function
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """之後每次輸出都呼叫 function 取得目前的值 (例如連線池的使用量)。"""
+        self._function = function
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return float(self._function()) if self._function is not None else self._value
+
+    def _own_samples(self, labelvalues: LabelValues):
+        return [("", labelvalues, None, self.value)]
+
+
+class Gauge(_Metric):
+    """可增可減的數值；提供 function 時每次輸出都呼叫它取得目前的值。"""
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["MetricsRegistry"] = None, function: Optional[Callable[[], float]] = None):
+        self._child = _GaugeChild(function)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._child.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._child.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._child.dec(amount)
+
+    @property
+    def value(self) -> float:
+        return self._child.value
+
+    def _own_samples(self, labelvalues: LabelValues):
+        return self._child._own_samples(labelvalues)
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1) # 最後一格是 +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._buckets, value) # 落在第一個 le >= value 的 bucket
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def _own_samples(self, labelvalues: LabelValues):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        samples = []
+        cumulative = 0
+        for upper_bound, count in zip(self._buckets + (float("inf"),), counts):
+            cumulative += count
+            samples.append(("_bucket", labelvalues, {"le": _format_value(upper_bound)}, cumulative))
+        samples.append(("_sum", labelvalues, None, total))
+        samples.append(("_count", labelvalues, None, cumulative))
+        return samples
+
+
+class Histogram(_Metric):
+    """
+    分佈統計 (例如延遲)。每次 observe 只是一次二分搜尋與加總，
+    輸出時才把各 bucket 轉為 Prometheus 的累計形式 (_bucket{le=...}、_sum、_count)。
+    """
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["MetricsRegistry"] = None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._child = _HistogramChild(self.buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._child.observe(value)
+
+    @property
+    def count(self) -> int:
+        return self._child.count
+
+    def _own_samples(self, labelvalues: LabelValues):
+        return self._child._own_samples(labelvalues)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, dict]], include_gauges: bool = True) -> Dict[str, dict]:
+    """
+    把多個 process 的 snapshot 相加：counter 與 histogram (累計的 bucket、_sum、_count) 直接加總，
+    gauge 也加總 (例如各 worker 連線池的連線數合計為整個節點的連線數)。
+    """
+    merged: Dict[str, dict] = {}
+    for snapshot in snapshots:
+        for name, family in snapshot.items():
+            if family["type"] == "gauge" and not include_gauges:
+                continue
+            target = merged.setdefault(name, {**family, "samples": {}})
+            for suffix, labelvalues, extra, value in family["samples"]:
+                key = (suffix, tuple(labelvalues), tuple(sorted(extra.items())))
+                target["samples"][key] = target["samples"].get(key, 0.0) + value
+    for family in merged.values():
+        family["samples"] = [
+            [suffix, list(labelvalues), dict(extra), value] for (suffix, labelvalues, extra), value in family["samples"].items()
+        ]
+    return merged
+
+
+def render_snapshot(snapshot: Dict[str, dict]) -> str:
+    return "\n".join(
+        _render_family(name, family["help"], family["type"], family["labelnames"], family["samples"])
+        for name, family in snapshot.items()
+    ) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
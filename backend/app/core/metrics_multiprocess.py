@@ -0,0 +1,113 @@
+# backend/app/core/metrics_multiprocess.py
+"""
+多 worker 部署時合併各 worker 的 metrics。
+
+每個 worker 的 registry 只有自己的計數，Prometheus 每次抓取 /metrics 時會由任意一個 worker 回應，
+直接輸出會讓 counter 在不相關的值之間跳動 (看起來像是不斷重設)。因此：
+
+- 每個 worker 每 SERVER_METRICS_FLUSH_SECONDS 秒 (以及結束前) 把 snapshot 寫入
+  SERVER_METRICS_DIR/worker-<pid>.json；
+- 回應 /metrics 的 worker 先寫入自己最新的 snapshot，再合併目錄中所有 worker 的結果
+  (其他 worker 的值最多延遲 SERVER_METRICS_FLUSH_SECONDS 秒)；
+- worker 結束 (例如達到 SERVER_MAX_REQUESTS) 後，master 把它的 counter 與 histogram 併入 archive.json，
+  合計值不會因為 worker 重新啟動而下降；gauge 只計算仍在執行的 worker。
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+from typing import Optional
+
+from app.core.metrics import REGISTRY, merge_snapshots, render_snapshot
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILE = "archive.json"
+
+
+def _worker_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"worker-{pid}.json")
+
+
+def _write_json(path: str, data: dict) -> None:
+    # 先寫入暫存檔再 os.replace，讀取端不會讀到寫到一半的檔案
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_snapshot(directory: str) -> None:
+    _write_json(_worker_path(directory, os.getpid()), REGISTRY.snapshot())
+
+
+def render_directory(directory: str) -> str:
+    """合併 archive 與所有 worker 的 snapshot，輸出 Prometheus text format。"""
+    for _ in range(3):
+        archive = _read_json(os.path.join(directory, ARCHIVE_FILE)) or {"pids": [], "metrics": {}}
+        archived_pids = set(archive["pids"])
+        snapshots = [archive["metrics"]]
+        complete = True
+        for path in glob.glob(os.path.join(directory, "worker-*.json")):
+            pid = int(os.path.basename(path)[len("worker-"):-len(".json")])
+            if pid in archived_pids: # master 已併入 archive、尚未刪除的檔案
+                continue
+            snapshot = _read_json(path)
+            if snapshot is None:
+                # 讀取期間被 master 併入 archive 並刪除；重新讀取 archive，避免少算這個 worker
+                complete = False
+                break
+            snapshots.append(snapshot)
+        if complete:
+            break
+    return render_snapshot(merge_snapshots(snapshots))
+
+
+def archive_worker_snapshot(directory: str, pid: int) -> None:
+    """
+    由 master 在 worker 結束後呼叫 (單一 thread)：把 counter 與 histogram 併入 archive，再刪除 worker 的檔案。
+    archive 記錄已併入的 pid，兩個步驟之間讀取的 /metrics 不會重複計算。
+    """
+    path = _worker_path(directory, pid)
+    snapshot = _read_json(path)
+    if snapshot is None:
+        return
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    archive = _read_json(archive_path) or {"pids": [], "metrics": {}}
+    _write_json(archive_path, {
+        "pids": archive["pids"] + [pid],
+        "metrics": merge_snapshots([archive["metrics"], snapshot], include_gauges=False),
+    })
+    os.remove(path)
+
+
+def reset_directory(directory: str) -> None:
+    """master 啟動時清除上次執行留下的檔案 (counter 從 0 開始，Prometheus 會視為一次重設)。"""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "worker-*.json*")) + glob.glob(os.path.join(directory, ARCHIVE_FILE)):
+        os.remove(path)
+
+
+async def run_metrics_flusher(directory: str, interval_seconds: float) -> None:
+    """worker 的背景任務：定期寫入 snapshot，取消時 (worker 結束前) 再寫入最後一次。"""
+    try:
+        while True:
+            try:
+                await asyncio.to_thread(write_snapshot, directory)
+            except OSError as e:
+                logger.warning(f"Could not write metrics snapshot to {directory}: {e}")
+            await asyncio.sleep(interval_seconds)
+    finally:
+        try:
+            write_snapshot(directory)
+        except OSError as e:
+            logger.warning(f"Could not write final metrics snapshot to {directory}: {e}")
@@ -0,0 +1,27 @@
+# backend/app/core/pagination.py
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+# 回應中放置下一頁 cursor 的標頭 (列表回應本體維持為陣列，既有的客戶端不受影響)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(uploaded_at: datetime, item_id: int) -> str:
+    """把排序鍵 (uploaded_at, id) 編碼成不透明的 cursor 字串。"""
+    raw = f"{uploaded_at.isoformat()}|{item_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析 encode_cursor 產生的 cursor。
+    格式不正確時拋出 ValueError，由 endpoint 轉為 400。
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        uploaded_at, item_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(uploaded_at), int(item_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,189 @@
+# backend/app/core/rate_limit.py
+"""
+登入與 refresh token 的 admission control (token bucket)。
+
+每個限制 (RateLimit) 以 key 區分 bucket (例如每個來源 IP、每個 username 一個)：
+bucket 最多存放 capacity 個 token，每秒補充 refill_per_second 個，每個請求取用一個。
+token 不足時在執行任何 bcrypt 或資料庫查詢之前就回應 429 與 Retry-After。
+
+backend (RATE_LIMIT_BACKEND)：
+- memory:   每個 worker process 各自計算 (多 worker 時實際上限為 worker 數倍)
+- database: bucket 存在 rate_limit_buckets 資料表，所有 worker / 節點共用；
+            開發環境使用 SQLite 即可在本機執行同一套邏輯
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Sequence, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app.core.config import settings
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+rate_limit_rejected = Counter("rate_limit_rejected", "Requests rejected by a rate limit", labelnames=("limit",))
+
+MAX_SUBJECT_LENGTH = 200 # bucket key 的長度上限 (username 來自未驗證的表單輸入)
+BUCKET_PURGE_INTERVAL_SECONDS = 600
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    name: str
+    capacity: float # 允許的瞬間突發量
+    refill_per_second: float
+
+    @property
+    def seconds_to_full(self) -> float:
+        return self.capacity / self.refill_per_second
+
+
+def refill_and_take(tokens: float, elapsed_seconds: float, limit: RateLimit) -> Tuple[float, float]:
+    """
+    依經過的時間補充 token 後嘗試取用一個。
+    返回 (剩餘 token 數, 需要等待的秒數)；可以取用時等待秒數為 0。
+    """
+    tokens = min(limit.capacity, tokens + elapsed_seconds * limit.refill_per_second)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / limit.refill_per_second
+
+
+class InMemoryRateLimitBackend:
+    """單一 process 內的 bucket；只在 event loop 中使用，不需要加鎖。超過 max_keys 時淘汰最久未使用的 bucket。"""
+
+    def __init__(self, max_keys: int, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        now = self._clock()
+        tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+        tokens, retry_after = refill_and_take(tokens, now - updated_at, limit)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    async def purge_idle(self, idle_for: timedelta) -> int:
+        # LRU 淘汰已限制記憶體用量，不需要額外清除
+        return 0
+
+
+class DatabaseRateLimitBackend:
+    """以資料庫保存 bucket，在所有 worker 之間共用限制 (每次取用一個短的 transaction)。"""
+
+    def __init__(self, session_factory=None):
+        if session_factory is None:
+            from app.db.session import SessionLocal
+            session_factory = SessionLocal
+        self._session_factory = session_factory
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        from app.crud import rate_limit_bucket as crud_rate_limit_bucket
+
+        async with self._session_factory() as db:
+            return await crud_rate_limit_bucket.take_token(db, key=key, limit=limit)
+
+    async def purge_idle(self, idle_for: timedelta) -> int:
+        from app.crud import rate_limit_bucket as crud_rate_limit_bucket
+
+        async with self._session_factory() as db:
+            return await crud_rate_limit_bucket.delete_idle_buckets(
+                db, updated_before=datetime.utcnow() - idle_for
+            )
+
+
+def create_rate_limit_backend(name: str):
+    if name == "memory":
+        return InMemoryRateLimitBackend(max_keys=settings.RATE_LIMIT_MEMORY_MAX_KEYS)
+    if name == "database":
+        return DatabaseRateLimitBackend()
+    raise ValueError(f"Unsupported rate limit backend: {name}")
+
+
+@lru_cache(maxsize=None)
+def get_rate_limit_backend():
+    return create_rate_limit_backend(settings.RATE_LIMIT_BACKEND)
+
+
+LOGIN_IP_LIMIT = RateLimit(
+    "login-ip", settings.LOGIN_RATE_LIMIT_IP_BURST, settings.LOGIN_RATE_LIMIT_IP_PER_MINUTE / 60
+)
+LOGIN_USERNAME_LIMIT = RateLimit(
+    "login-username", settings.LOGIN_RATE_LIMIT_USERNAME_BURST, settings.LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE / 60
+)
+REFRESH_IP_LIMIT = RateLimit(
+    "refresh-ip", settings.REFRESH_RATE_LIMIT_IP_BURST, settings.REFRESH_RATE_LIMIT_IP_PER_MINUTE / 60
+)
+ALL_LIMITS = (LOGIN_IP_LIMIT, LOGIN_USERNAME_LIMIT, REFRESH_IP_LIMIT)
+
+
+async def enforce_rate_limits(checks: Sequence[Tuple[RateLimit, str]]) -> None:
+    """
+    依序從每個 (限制, 對象) 的 bucket 取用 token，任一個不足時拋出 429。
+    共享 backend 無法使用時放行請求 (登入本身仍需要資料庫，不會因此多出可用的攻擊面)。
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    backend = get_rate_limit_backend()
+    for limit, subject in checks:
+        try:
+            retry_after = await backend.take(f"{limit.name}:{subject[:MAX_SUBJECT_LENGTH]}", limit)
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, allowing request ({limit.name}): {e}")
+            return
+        if retry_after > 0:
+            rate_limit_rejected.labels(limit=limit.name).inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please retry later",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+
+def get_client_ip(request: Request) -> str:
+    # 在 reverse proxy 後方時需以 uvicorn --proxy-headers / --forwarded-allow-ips 讓 request.client 反映真正的來源
+    return request.client.host if request.client else "unknown"
+
+
+async def limit_login_attempts(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(), # 與 endpoint 共用同一次表單解析
+) -> None:
+    """相依性：登入前依來源 IP 與 username 限制嘗試次數。"""
+    await enforce_rate_limits([
+        (LOGIN_IP_LIMIT, get_client_ip(request)),
+        (LOGIN_USERNAME_LIMIT, form_data.username.lower()),
+    ])
+
+
+async def limit_refresh_attempts(request: Request) -> None:
+    """相依性：依來源 IP 限制 refresh token 的使用次數。"""
+    await enforce_rate_limits([(REFRESH_IP_LIMIT, get_client_ip(request))])
+
+
+async def run_rate_limit_bucket_purge() -> None:
+    """
+    背景任務：定期刪除閒置的 bucket。閒置超過 seconds_to_full 的 bucket 已經補滿，
+    刪除後與從未使用過的 bucket 相同，不影響限制的結果。
+    """
+    idle_for = timedelta(seconds=max(limit.seconds_to_full for limit in ALL_LIMITS))
+    while True:
+        try:
+            purged = await get_rate_limit_backend().purge_idle(idle_for)
+            if purged:
+                logger.info(f"Purged {purged} idle rate limit bucket(s).")
+        except Exception as e:
+            logger.error(f"Rate limit bucket purge failed: {e}", exc_info=True)
+        await asyncio.sleep(BUCKET_PURGE_INTERVAL_SECONDS)
@@ -1,20 +1,67 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Callable, Optional, Sequence, Tuple, TypeVar
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings # 引用設定檔
 from app.schemas.token import TokenData # Token 承載資料的 Pydantic schema
 from app.crud import user as crud_user # 使用者 CRUD 操作
 from app.db.session import get_db # 資料庫 session 相依性
 from app.models.user import User # 使用者 ORM 模型
+from app.core.user_cache import UserPrincipal, user_principal_cache
+from app.core.metrics import Counter, Gauge
 
-# Password hashing context using bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def build_password_context(
+    schemes: Sequence[str],
+    bcrypt_rounds: int = 12,
+    argon2_time_cost: int = 2,
+    argon2_memory_cost_kib: int = 19456,
+    argon2_parallelism: int = 1,
+) -> CryptContext:
+    """
+    建立密碼雜湊的 CryptContext。schemes 中第一個以外的演算法都標記為 deprecated。
+    成本參數的下限與上限都設為目標值，因此成本與目前設定不同的雜湊 needs_update 都為 True，
+    會在登入成功時以新參數重新雜湊 (不論是調高或調低成本)。
+    """
+    options = {}
+    if "bcrypt" in schemes:
+        options.update(
+            bcrypt__default_rounds=bcrypt_rounds,
+            bcrypt__min_rounds=bcrypt_rounds,
+            bcrypt__max_rounds=bcrypt_rounds,
+        )
+    if "argon2" in schemes:
+        from passlib.hash import argon2
+
+        # passlib 在第一次雜湊時才載入 backend，這裡提早檢查，避免登入時才出錯
+        if not argon2.has_backend():
+            raise RuntimeError("PASSWORD_HASH_SCHEMES includes 'argon2' but argon2-cffi is not installed")
+        options.update(
+            argon2__default_rounds=argon2_time_cost,
+            argon2__min_rounds=argon2_time_cost,
+            argon2__max_rounds=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_cost_kib,
+            argon2__parallelism=argon2_parallelism,
+        )
+    return CryptContext(schemes=list(schemes), deprecated="auto", **options)
+
+
+# Password hashing context (演算法與成本參數來自設定)
+pwd_context = build_password_context(
+    settings.PASSWORD_HASH_SCHEMES,
+    bcrypt_rounds=settings.BCRYPT_ROUNDS,
+    argon2_time_cost=settings.ARGON2_TIME_COST,
+    argon2_memory_cost_kib=settings.ARGON2_MEMORY_COST_KIB,
+    argon2_parallelism=settings.ARGON2_PARALLELISM,
+)
 
 ALGORITHM = settings.ALGORITHM # "HS256"
 JWT_SECRET_KEY = settings.JWT_SECRET_KEY # 您的 JWT 密鑰
@@ -32,6 +79,79 @@ def get_password_hash(password: str) -> str:
     """產生密碼的雜湊值"""
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    驗證密碼；若驗證成功且既有雜湊的演算法或成本參數已過時 (needs_update)，一併返回以目前設定產生的新雜湊。
+    返回 (是否相符, 新雜湊或 None)。
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+T = TypeVar("T")
+
+password_hash_in_flight = Gauge("password_hash_in_flight", "Password hash/verify calls running or waiting in the hasher pool")
+password_hash_queue_depth = Gauge("password_hash_queue_depth", "Password hash/verify calls waiting for a free hasher thread")
+password_hash_rejected = Counter("password_hash_rejected", "Password hash/verify calls rejected because the hasher pool was full")
+
+
+class PasswordHasher:
+    """
+    在專用的 thread pool 中執行 bcrypt，避免每次約數百毫秒的雜湊運算卡住 event loop。
+    bcrypt 在運算期間會釋放 GIL，多個 thread 可以真正平行執行。
+
+    同時最多 max_workers 個雜湊在執行，另外最多 (max_pending - max_workers) 個在排隊；
+    超過時直接回應 503，讓登入尖峰只影響登入本身，而不是讓佇列無限增長。
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, retry_after_seconds: int = 1):
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self.retry_after_seconds = retry_after_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._pending = 0 # 只在 event loop 中修改，不需要加鎖
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        if self._pending >= self.max_pending:
+            password_hash_rejected.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent authentication requests, please retry shortly",
+                headers={"Retry-After": str(self.retry_after_seconds)},
+            )
+        self._pending += 1
+        self._update_gauges()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        password_hash_in_flight.set(self._pending)
+        password_hash_queue_depth.set(max(0, self._pending - self.max_workers))
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self.run(verify_and_update_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+@lru_cache(maxsize=None)
+def get_password_hasher() -> PasswordHasher:
+    max_workers = settings.PASSWORD_HASH_MAX_WORKERS or max(1, (os.cpu_count() or 1) - 1)
+    return PasswordHasher(
+        max_workers=max_workers,
+        max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+        retry_after_seconds=settings.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+    )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     根據提供的資料和過期時間來建立新的 access token。
@@ -46,13 +166,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def create_user_access_token(user: User, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    為使用者簽發 access token。除了 sub (username) 之外，也帶有 user id、角色與目前的 token_epoch，
+    驗證時只需比對 epoch 就能確認角色與啟用狀態沒有在簽發後被變更。
+    """
+    return create_access_token(
+        data={
+            "sub": user.username,
+            "uid": user.id,
+            "role": user.role.value,
+            "epoch": user.token_epoch or 0,
+        },
+        expires_delta=expires_delta,
+    )
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme), # 從 Authorization 標頭獲取 token
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_db)
+) -> UserPrincipal:
     """
     解碼並驗證 access token，返回目前使用者。
-    如果 token 無效或使用者不存在，則拋出 HTTPException。
+
+    停用、角色變更與重設密碼都會遞增使用者的 token_epoch，因此 token 的 epoch 與目前的 epoch 相同時，
+    token 中的角色與啟用狀態就是目前的狀態，授權檢查不需要再讀取 users 資料表。
+    目前的 epoch 優先從 user_principal_cache 取得，快取未命中時才查詢資料庫
+    (AsyncSession 在第一次查詢時才取得連線，快取命中時不會用到資料庫連線)。
+    如果 token 無效、已被撤銷或使用者不存在，則拋出 HTTPException。
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -61,26 +202,61 @@ async def get_current_user(
     )
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError: # 包括 Token 過期 (ExpiredSignatureError) 或簽名無效等
+        token_data = TokenData(
+            username=payload.get("sub"),
+            user_id=payload.get("uid"),
+            role=payload.get("role"),
+            token_epoch=payload.get("epoch"),
+        )
+    except (JWTError, ValueError): # 包括 Token 過期 (ExpiredSignatureError)、簽名無效或 claims 格式錯誤
         raise credentials_exception
-    
-    user = crud_user.get_user_by_username(db, username=token_data.username)
-    if user is None:
+    # 舊格式的 token (只有 sub) 沒有 epoch 可以比對，要求重新登入
+    if token_data.user_id is None or token_data.token_epoch is None:
         raise credentials_exception
-    return user
+
+    principal = user_principal_cache.get(token_data.user_id) if settings.USER_CACHE_ENABLED else None
+    if principal is None:
+        generation = user_principal_cache.generation
+        user = await crud_user.get_user(db, user_id=token_data.user_id)
+        if user is None:
+            raise credentials_exception
+        principal = UserPrincipal.from_user(user)
+        if settings.USER_CACHE_ENABLED:
+            user_principal_cache.put(principal, generation=generation)
+
+    if principal.token_epoch != token_data.token_epoch:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: UserPrincipal = Depends(get_current_user)
+) -> UserPrincipal:
     """
     獲取目前登入且狀態為 active 的使用者。
     如果使用者 inactive，則拋出 HTTPException。
     """
     if not current_user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+async def get_current_active_db_user(
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """
+    需要修改目前使用者 (或讀取密碼雜湊) 的 endpoint 使用：從資料庫載入完整的 User ORM 物件。
+    """
+    user = await crud_user.get_user(db, user_id=current_user.id)
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
@@ -0,0 +1,276 @@
+# backend/app/core/user_cache.py
+"""
+已驗證使用者的 in-process 快取。
+
+get_current_user 在每個需要登入的請求都要確認 access token 的 token_epoch 仍是使用者目前的 epoch，
+這裡以 LRU + TTL 的方式快取使用者目前的狀態 (UserPrincipal)，命中時不需要查詢 users 資料表。
+
+會改變這些資訊的寫入 (crud_user 中的更新 / 刪除 / 改密碼) 在 commit 後呼叫 invalidate：
+先清除本 process 的快取，再透過 invalidation broker 通知其他 worker 清除。
+broker 無法送出通知時，其他 worker 最多在 USER_CACHE_TTL_SECONDS 之後看到變更。
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "user_cache_invalidation"
+# LISTEN 連線中斷 (資料庫重新啟動、failover、閒置連線被切斷) 後重新連線的等待時間，每次失敗加倍
+RECONNECT_INITIAL_DELAY_SECONDS = 0.5
+RECONNECT_MAX_DELAY_SECONDS = 30.0
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """get_current_user 返回的目前使用者 (不含密碼雜湊，不綁定資料庫 session)。"""
+    id: int
+    username: str
+    email: str
+    role: UserRole
+    is_active: bool
+    token_epoch: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            role=user.role,
+            is_active=bool(user.is_active),
+            token_epoch=user.token_epoch or 0,
+        )
+
+
+class UserPrincipalCache:
+    """以 user id 為 key 的 LRU + TTL 快取；只在 event loop 中使用，不需要加鎖。"""
+
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[int, Tuple[float, UserPrincipal]]" = OrderedDict()
+        # 每次 invalidate 都遞增；查詢資料庫期間若有 invalidate 發生，就不把可能過時的結果放進快取
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int) -> Optional[UserPrincipal]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            user_cache_misses.inc()
+            return None
+        expires_at, principal = entry
+        if expires_at <= self._clock():
+            del self._entries[user_id]
+            user_cache_misses.inc()
+            return None
+        self._entries.move_to_end(user_id)
+        user_cache_hits.inc()
+        return principal
+
+    def put(self, principal: UserPrincipal, generation: Optional[int] = None) -> None:
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[principal.id] = (self._clock() + self.ttl_seconds, principal)
+        self._entries.move_to_end(principal.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, user_id: int) -> None:
+        self.generation += 1
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+
+class LocalInvalidationBroker:
+    """單一 worker 部署用：不需要通知其他 process。"""
+
+    async def start(self, on_invalidate: Callable[[str], None], on_resync: Callable[[], None]) -> None:
+        pass
+
+    async def publish(self, payload: str) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class PostgresInvalidationBroker:
+    """
+    以 PostgreSQL 的 LISTEN / NOTIFY 在多個 worker 之間廣播失效通知。
+    使用獨立的 asyncpg 連線 (不佔用 SQLAlchemy 連線池)；NOTIFY 會在發送者自己的 LISTEN 上也收到一次，無妨。
+
+    連線中斷時以指數退避重新連線。中斷期間其他 worker 送出的通知都收不到，因此重新 LISTEN 之後呼叫 on_resync
+    清除整個快取；本 worker 在中斷期間要送出的通知先保留，重新連線後再送出。
+    重新連線之前，變更在其他 worker 最多延遲 USER_CACHE_TTL_SECONDS 生效。
+    """
+
+    def __init__(self, dsn: str, channel: str = INVALIDATION_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self._connection = None
+        self._lock = asyncio.Lock() # asyncpg 連線同一時間只能執行一個查詢
+        self._on_invalidate: Optional[Callable[[str], None]] = None
+        self._on_resync: Optional[Callable[[], None]] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._unsent: Set[str] = set() # 連線中斷期間未能送出的通知
+
+    async def start(self, on_invalidate: Callable[[str], None], on_resync: Callable[[], None]) -> None:
+        self._on_invalidate = on_invalidate
+        self._on_resync = on_resync
+        self._stopping = False
+        await self._connect()
+        logger.info(f"User cache invalidation: listening on PostgreSQL channel '{self.channel}'")
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            await connection.add_listener(self.channel, self._handle_notification)
+        except BaseException:
+            await connection.close()
+            raise
+        connection.add_termination_listener(self._handle_termination)
+        self._connection = connection
+
+    def _handle_notification(self, connection, pid, channel, payload: str) -> None:
+        if self._on_invalidate is not None:
+            self._on_invalidate(payload)
+
+    def _handle_termination(self, connection) -> None:
+        if connection is not self._connection:
+            return
+        self._connection = None
+        if self._stopping:
+            return
+        logger.warning("User cache invalidation: lost the PostgreSQL LISTEN connection; reconnecting")
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = RECONNECT_INITIAL_DELAY_SECONDS
+        while not self._stopping:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+            except Exception as e:
+                delay = min(delay * 2, RECONNECT_MAX_DELAY_SECONDS)
+                logger.warning(f"User cache invalidation: reconnect failed ({e}); retrying in {delay:.1f}s")
+                continue
+            # 已重新 LISTEN：中斷期間錯過的通知無法補回，清除整個快取
+            if self._on_resync is not None:
+                self._on_resync()
+            logger.info(f"User cache invalidation: reconnected to PostgreSQL channel '{self.channel}'")
+            unsent, self._unsent = self._unsent, set()
+            for payload in unsent:
+                try:
+                    await self.publish(payload)
+                except Exception as e:
+                    logger.warning(f"User cache invalidation: failed to publish queued payload {payload!r}: {e}")
+            return
+
+    async def publish(self, payload: str) -> None:
+        connection = self._connection
+        if connection is None:
+            if self._reconnect_task is not None and not self._stopping:
+                self._unsent.add(payload) # 重新連線後送出
+            return
+        async with self._lock:
+            await connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await connection.close()
+
+
+def _postgres_dsn() -> str:
+    from app.db.session import get_async_database_url
+
+    # asyncpg 只接受 postgresql:// 形式的 DSN
+    return get_async_database_url().replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def create_invalidation_broker(name: str):
+    if name == "local":
+        return LocalInvalidationBroker()
+    if name == "postgres":
+        return PostgresInvalidationBroker(_postgres_dsn())
+    raise ValueError(f"Unsupported user cache invalidation broker: {name}")
+
+
+user_cache_hits = Counter("user_cache_hits", "Authenticated-user cache hits in get_current_user")
+user_cache_misses = Counter("user_cache_misses", "Authenticated-user cache misses in get_current_user")
+
+
+def _hit_ratio() -> float:
+    lookups = user_cache_hits.value + user_cache_misses.value
+    return user_cache_hits.value / lookups if lookups else 0.0
+
+
+user_cache_hit_ratio = Gauge("user_cache_hit_ratio", "Fraction of get_current_user lookups served from the cache", function=_hit_ratio)
+
+user_principal_cache = UserPrincipalCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+)
+user_cache_size = Gauge("user_cache_size", "Number of cached user principals", function=lambda: len(user_principal_cache))
+
+_broker = LocalInvalidationBroker()
+
+
+def _handle_invalidation(payload: str) -> None:
+    try:
+        user_principal_cache.discard(int(payload))
+    except ValueError:
+        logger.warning(f"Ignoring malformed user cache invalidation payload: {payload!r}")
+
+
+async def start_invalidation_broker() -> None:
+    """在 lifespan 啟動時呼叫；連線失敗時退回只依靠 TTL，不影響服務啟動。"""
+    global _broker
+    broker = create_invalidation_broker(settings.USER_CACHE_INVALIDATION_BROKER)
+    try:
+        await broker.start(_handle_invalidation, user_principal_cache.clear)
+    except Exception as e:
+        logger.error(f"Failed to start user cache invalidation broker '{settings.USER_CACHE_INVALIDATION_BROKER}': {e}")
+        broker = LocalInvalidationBroker()
+    _broker = broker
+
+
+async def stop_invalidation_broker() -> None:
+    global _broker
+    await _broker.stop()
+    _broker = LocalInvalidationBroker()
+
+
+async def invalidate_user(user_id: int) -> None:
+    """清除指定使用者的快取，並通知其他 worker。"""
+    user_principal_cache.discard(user_id)
+    try:
+        await _broker.publish(str(user_id))
+    except Exception as e:
+        logger.warning(f"Failed to publish user cache invalidation for user {user_id}: {e}")
@@ -2,6 +2,10 @@
 from . import user
 from . import refresh_token
 from . import file # Add this line
+from . import pending_upload
+from . import upload_session
+from . import content_blob
+from . import rate_limit_bucket
 
 # Optional: for easier imports
 # from .user import ...
@@ -0,0 +1,71 @@
+# backend/app/crud/content_blob.py
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.models.content_blob import ContentBlob
+from app.models.file import FileMetadata
+
+async def get_blob_by_sha256(db: AsyncSession, sha256: str) -> Optional[ContentBlob]:
+    return await db.scalar(select(ContentBlob).where(ContentBlob.sha256 == sha256))
+
+async def acquire_existing_blob(db: AsyncSession, sha256: str) -> Optional[ContentBlob]:
+    """
+    若內容已存在，以原子的 UPDATE 將 ref_count 加一並回傳該 blob；不存在則回傳 None。
+    與 release_blob 的刪除互斥：blob 在更新前被刪除時 UPDATE 影響 0 列，視為不存在。
+    不 commit：由呼叫端與引用此 blob 的檔案元數據在同一個 transaction 中 commit，
+    元數據寫入失敗時 rollback 會一併撤銷引用數的增加。
+    """
+    result = await db.execute(
+        update(ContentBlob)
+        .where(ContentBlob.sha256 == sha256, ContentBlob.ref_count > 0)
+        .values(ref_count=ContentBlob.ref_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return None
+    blob = await get_blob_by_sha256(db, sha256)
+    if blob is not None:
+        await db.refresh(blob) # session 中可能已有此 blob，以資料庫中的 ref_count 為準
+    return blob
+
+async def create_blob(db: AsyncSession, *, sha256: str, storage_path: str, size: int) -> ContentBlob:
+    """
+    建立新的 content blob (ref_count = 1)，與 acquire_existing_blob 相同只 flush 不 commit。
+    若同樣的內容剛好被並行上傳並搶先建立，改為引用既有的 blob (此時 transaction 會被 rollback，
+    因此必須在寫入其他資料之前呼叫)；呼叫端可由返回的 storage_path 是否相同判斷是否改用了既有的 blob。
+    """
+    db_blob = ContentBlob(sha256=sha256, storage_path=storage_path, size=size, ref_count=1)
+    db.add(db_blob)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        existing_blob = await acquire_existing_blob(db, sha256)
+        if existing_blob is None:
+            raise
+        return existing_blob
+    return db_blob
+
+async def delete_file_metadata_and_release_blob(db: AsyncSession, file_meta: FileMetadata) -> Optional[str]:
+    """
+    在同一個 transaction 中刪除檔案元數據並將其 blob 的 ref_count 減一 (以 SELECT ... FOR UPDATE 鎖定 blob)。
+    若這是最後一個引用，一併刪除 blob 紀錄並回傳需要從 storage 刪除的路徑；否則回傳 None。
+    """
+    storage_path_to_delete = None
+    blob = await db.scalar(
+        select(ContentBlob)
+        .where(ContentBlob.id == file_meta.blob_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    await db.delete(file_meta)
+    if blob is not None:
+        blob.ref_count -= 1
+        if blob.ref_count <= 0:
+            storage_path_to_delete = blob.storage_path
+            await db.flush() # 先刪除引用此 blob 的檔案元數據，再刪除 blob 本身
+            await db.delete(blob)
+    await db.commit()
+    return storage_path_to_delete
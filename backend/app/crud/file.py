@@ -1,68 +1,167 @@
 # backend/app/crud/file.py
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import Row, and_, exists, or_, select
+from sqlalchemy.sql import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from datetime import datetime, timezone
 
-from app.models.file import FileMetadata
-from app.schemas.file import FileCreate
+from app.models.file import FileMetadata, FileUploadStatus
+from app.models.pending_upload import PendingUpload
+from app.schemas.file import FileCreate, FileRead
+from app.services.storage_interface import StorageObjectInfo
 
-def create_file_metadata(db: Session, file_in: FileCreate) -> FileMetadata:
-    db_file = FileMetadata(
+# 列表只需要 FileRead 的欄位：直接查詢這些欄位而非整個 ORM 物件，
+# 省去 ORM 物件的建立與 identity map 的追蹤，也不會讀取列表用不到的欄位
+FILE_LISTING_COLUMNS = tuple(getattr(FileMetadata, field_name) for field_name in FileRead.model_fields)
+
+def build_file_metadata(file_in: FileCreate) -> FileMetadata:
+    """建立尚未加入 session 的 FileMetadata，給需要與其他變更在同一個 transaction 中 commit 的呼叫端使用。"""
+    return FileMetadata(
         filename=file_in.filename,
         storage_path=file_in.storage_path,
         file_type=file_in.file_type,
         size=file_in.size,
         owner_id=file_in.owner_id,
         is_encrypted=file_in.is_encrypted,
-        encryption_method=file_in.encryption_method
+        encryption_method=file_in.encryption_method,
+        upload_status=file_in.upload_status.value,
+        blob_id=file_in.blob_id
     )
+
+async def create_file_metadata(db: AsyncSession, file_in: FileCreate) -> FileMetadata:
+    db_file = build_file_metadata(file_in)
     db.add(db_file)
-    db.commit()
-    db.refresh(db_file)
+    await db.commit()
+    await db.refresh(db_file)
     return db_file
 
-def get_file_metadata_by_id(db: Session, file_id: int) -> Optional[FileMetadata]:
-    return db.query(FileMetadata).filter(FileMetadata.id == file_id).first()
+async def get_file_metadata_by_id(db: AsyncSession, file_id: int) -> Optional[FileMetadata]:
+    return await db.get(FileMetadata, file_id)
 
-def get_file_metadata_by_id_and_owner(
-    db: Session, file_id: int, owner_id: int
+async def get_file_metadata_by_id_and_owner(
+    db: AsyncSession, file_id: int, owner_id: int
 ) -> Optional[FileMetadata]:
-    return db.query(FileMetadata).filter(FileMetadata.id == file_id, FileMetadata.owner_id == owner_id).first()
+    return await db.scalar(
+        select(FileMetadata).where(FileMetadata.id == file_id, FileMetadata.owner_id == owner_id)
+    )
 
-def get_files_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 100) -> List[FileMetadata]:
-    return db.query(FileMetadata).filter(FileMetadata.owner_id == owner_id).offset(skip).limit(limit).all()
+def _keyset_page(query: Select, after: Optional[Tuple[datetime, int]], limit: int) -> Select:
+    """
+    以 (uploaded_at, id) 由新到舊做 keyset 分頁：after 為上一頁最後一筆的排序鍵。
+    不使用 OFFSET，因此第 N 頁與第 1 頁的成本相同。
+    """
+    if after is not None:
+        after_uploaded_at, after_id = after
+        query = query.where(
+            or_(
+                FileMetadata.uploaded_at < after_uploaded_at,
+                and_(FileMetadata.uploaded_at == after_uploaded_at, FileMetadata.id < after_id),
+            )
+        )
+    return query.order_by(FileMetadata.uploaded_at.desc(), FileMetadata.id.desc()).limit(limit)
 
-def delete_file_metadata(db: Session, file_id: int) -> Optional[FileMetadata]:
-    db_file = db.query(FileMetadata).filter(FileMetadata.id == file_id).first()
+def build_files_by_owner_query(
+    owner_id: int, limit: int = 100, after: Optional[Tuple[datetime, int]] = None
+) -> Select:
+    query = select(*FILE_LISTING_COLUMNS).where(
+        FileMetadata.owner_id == owner_id,
+        FileMetadata.upload_status == FileUploadStatus.AVAILABLE.value, # 尚未完成上傳的檔案不列出
+    )
+    return _keyset_page(query, after, limit)
+
+async def get_files_by_owner(
+    db: AsyncSession, owner_id: int, limit: int = 100, after: Optional[Tuple[datetime, int]] = None
+) -> List[Row]:
+    """返回只包含 FILE_LISTING_COLUMNS 的 Row (可直接以 FileRead 序列化)。"""
+    result = await db.execute(build_files_by_owner_query(owner_id, limit, after))
+    return list(result.all())
+
+async def delete_file_metadata(db: AsyncSession, file_id: int) -> Optional[FileMetadata]:
+    db_file = await db.get(FileMetadata, file_id)
     if db_file:
-        db.delete(db_file)
-        db.commit()
+        await db.delete(db_file)
+        await db.commit()
     return db_file # Returns the deleted object or None if not found
 
-def update_file_filename(
-    db: Session, file_id: int, new_filename: str, owner_id: Optional[int] = None
+async def update_file_filename(
+    db: AsyncSession, file_id: int, new_filename: str, owner_id: Optional[int] = None
 ) -> Optional[FileMetadata]:
     """
     更新指定檔案的檔案名稱。
     如果提供了 owner_id，則僅當檔案屬於該擁有者時才更新。
     """
-    query = db.query(FileMetadata).filter(FileMetadata.id == file_id)
+    query = select(FileMetadata).where(FileMetadata.id == file_id)
     if owner_id is not None: # 如果是普通使用者操作，則需要驗證擁有權
-        query = query.filter(FileMetadata.owner_id == owner_id)
-    
-    db_file = query.first()
-    
+        query = query.where(FileMetadata.owner_id == owner_id)
+
+    db_file = await db.scalar(query)
+
     if db_file:
         db_file.filename = new_filename
         db.add(db_file) # 或者 db.merge(db_file)
-        db.commit()
-        db.refresh(db_file)
+        await db.commit()
+        await db.refresh(db_file)
     return db_file
 
-def get_all_files(db: Session, owner_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[FileMetadata]:
+def build_all_files_query(
+    owner_id: Optional[int] = None, limit: int = 100, after: Optional[Tuple[datetime, int]] = None
+) -> Select:
+    query = select(*FILE_LISTING_COLUMNS).where(FileMetadata.upload_status == FileUploadStatus.AVAILABLE.value)
+    if owner_id is not None:
+        query = query.where(FileMetadata.owner_id == owner_id)
+    return _keyset_page(query, after, limit)
+
+async def get_all_files(
+    db: AsyncSession,
+    owner_id: Optional[int] = None,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+) -> List[Row]:
     """
     獲取所有檔案的列表，如果提供了 owner_id，則按擁有者過濾。
+    返回只包含 FILE_LISTING_COLUMNS 的 Row。
     """
-    query = db.query(FileMetadata)
-    if owner_id is not None:
-        query = query.filter(FileMetadata.owner_id == owner_id)
-    return query.order_by(FileMetadata.uploaded_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(build_all_files_query(owner_id, limit, after))
+    return list(result.all())
+
+async def complete_file_upload(
+    db: AsyncSession, db_file: FileMetadata, object_info: StorageObjectInfo
+) -> FileMetadata:
+    """
+    將 presigned 上傳的檔案標記為完成，並以 storage 回報的實際大小、類型、ETag 與修改時間更新元數據。
+    已完成的檔案再次呼叫時 (物件被重新上傳) 以同樣方式更新。
+    """
+    db_file.size = object_info.size
+    if object_info.content_type:
+        db_file.file_type = object_info.content_type
+    db_file.storage_etag = object_info.etag
+    if object_info.last_modified is not None:
+        # 資料庫中的時間是不帶時區的 UTC
+        last_modified = object_info.last_modified
+        if last_modified.tzinfo is not None:
+            last_modified = last_modified.astimezone(timezone.utc).replace(tzinfo=None)
+        db_file.storage_modified_at = last_modified
+    db_file.upload_status = FileUploadStatus.AVAILABLE.value
+    db.add(db_file)
+    await db.commit()
+    await db.refresh(db_file)
+    return db_file
+
+async def get_stale_pending_files(
+    db: AsyncSession, uploaded_before: datetime, limit: int = 100
+) -> List[FileMetadata]:
+    """
+    取得在 uploaded_before 之前建立、仍停留在 pending 狀態的 presigned 上傳 (供背景 reaper 使用)。
+    """
+    result = await db.scalars(
+        select(FileMetadata)
+        .where(
+            FileMetadata.upload_status == FileUploadStatus.PENDING.value,
+            FileMetadata.uploaded_at < uploaded_before,
+            # multipart 上傳由 pending_uploads 的流程處理
+            ~exists().where(PendingUpload.file_id == FileMetadata.id),
+        )
+        .order_by(FileMetadata.uploaded_at)
+        .limit(limit)
+    )
+    return list(result.all())
@@ -0,0 +1,58 @@
+# backend/app/crud/pending_upload.py
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from datetime import datetime
+from typing import List, Optional
+
+from app.models.pending_upload import PendingUpload
+
+async def create_pending_upload(
+    db: AsyncSession, *, file_id: int, owner_id: int, storage_path: str, upload_id: str
+) -> PendingUpload:
+    db_pending_upload = PendingUpload(
+        file_id=file_id,
+        owner_id=owner_id,
+        storage_path=storage_path,
+        upload_id=upload_id,
+    )
+    db.add(db_pending_upload)
+    await db.commit()
+    await db.refresh(db_pending_upload)
+    return db_pending_upload
+
+async def get_pending_upload_by_id_and_owner(
+    db: AsyncSession, pending_upload_id: int, owner_id: int
+) -> Optional[PendingUpload]:
+    # 完成或中止上傳時都會用到對應的檔案元數據，一併載入 (async session 不能 lazy load)
+    return await db.scalar(
+        select(PendingUpload)
+        .options(joinedload(PendingUpload.file))
+        .where(PendingUpload.id == pending_upload_id, PendingUpload.owner_id == owner_id)
+    )
+
+async def get_stale_pending_uploads(
+    db: AsyncSession, created_before: datetime, limit: int = 100
+) -> List[PendingUpload]:
+    """
+    取得在 created_before 之前建立、仍未完成的 multipart 上傳 (供背景 reaper 使用)。
+    """
+    result = await db.scalars(
+        select(PendingUpload)
+        .options(joinedload(PendingUpload.file))
+        .where(PendingUpload.created_at < created_before)
+        .order_by(PendingUpload.created_at)
+        .limit(limit)
+    )
+    return list(result.all())
+
+async def delete_pending_upload(db: AsyncSession, pending_upload: PendingUpload, delete_file: bool = False) -> None:
+    """
+    刪除 multipart 上傳紀錄。
+    delete_file=True 時一併刪除對應的 pending 檔案元數據 (中止上傳時使用)。
+    pending_upload 需以上面的查詢取得，file 關聯才會已經載入。
+    """
+    if delete_file and pending_upload.file is not None:
+        await db.delete(pending_upload.file)
+    await db.delete(pending_upload)
+    await db.commit()
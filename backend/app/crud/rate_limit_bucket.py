@@ -0,0 +1,56 @@
+# backend/app/crud/rate_limit_bucket.py
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+
+from app.core.rate_limit import RateLimit, refill_and_take
+from app.models.rate_limit_bucket import RateLimitBucket
+
+MAX_UPDATE_ATTEMPTS = 8
+
+async def take_token(db: AsyncSession, *, key: str, limit: RateLimit) -> float:
+    """
+    從 key 的 bucket 取用一個 token，返回需要等待的秒數 (0 表示取用成功)。
+
+    以 compare-and-swap 更新：只有 version 仍是讀取時的值才寫入，否則代表並行的請求已先更新，重新讀取再算一次。
+    不需要 SELECT ... FOR UPDATE (SQLite 不支援)，也不會在 transaction 中長時間持有鎖。
+    """
+    for _ in range(MAX_UPDATE_ATTEMPTS):
+        now = datetime.utcnow()
+        bucket = (await db.execute(
+            select(RateLimitBucket.tokens, RateLimitBucket.updated_at, RateLimitBucket.version).where(RateLimitBucket.key == key)
+        )).first()
+        if bucket is None:
+            tokens, retry_after = refill_and_take(limit.capacity, 0, limit)
+            db.add(RateLimitBucket(key=key, tokens=tokens, updated_at=now, version=0))
+            try:
+                await db.commit()
+            except IntegrityError:
+                await db.rollback() # 並行的請求搶先建立了同一個 bucket，改為更新它
+                continue
+            return retry_after
+
+        elapsed_seconds = max(0.0, (now - bucket.updated_at).total_seconds())
+        tokens, retry_after = refill_and_take(bucket.tokens, elapsed_seconds, limit)
+        result = await db.execute(
+            update(RateLimitBucket)
+            .where(RateLimitBucket.key == key, RateLimitBucket.version == bucket.version)
+            .values(tokens=tokens, updated_at=max(now, bucket.updated_at), version=bucket.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if result.rowcount == 1:
+            return retry_after
+    # 同一個 bucket 的競爭激烈到一直更新失敗，視為超過限制
+    return 1 / limit.refill_per_second
+
+async def delete_idle_buckets(db: AsyncSession, updated_before: datetime) -> int:
+    """刪除在 updated_before 之後沒有再被使用的 bucket，返回刪除的數量。"""
+    result = await db.execute(
+        delete(RateLimitBucket)
+        .where(RateLimitBucket.updated_at < updated_before)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
@@ -1,80 +1,175 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
 from app.models.refresh_token import RefreshToken
 from app.models.user import User
 
-def create_refresh_token(
-    db: Session, *, user: User, expires_delta: timedelta, token_value: str | None = None
-) -> RefreshToken:
-    """
-    為指定使用者建立並儲存一個新的 Refresh Token。
-    """
+def _build_refresh_token(
+    *, user_id: int, expires_delta: timedelta, token_value: str | None = None
+) -> Tuple[RefreshToken, str]:
     if token_value is None:
         token_value = RefreshToken.generate_token()
-    
-    expires_at = datetime.utcnow() + expires_delta
     db_refresh_token = RefreshToken(
-        user_id=user.id,
-        token=token_value,
-        expires_at=expires_at
+        user_id=user_id,
+        token_hash=RefreshToken.hash_token(token_value),
+        expires_at=datetime.utcnow() + expires_delta,
+    )
+    return db_refresh_token, token_value
+
+async def create_refresh_token(
+    db: AsyncSession, *, user: User, expires_delta: timedelta, token_value: str | None = None
+) -> Tuple[RefreshToken, str]:
+    """
+    為指定使用者建立並儲存一個新的 Refresh Token。
+    資料庫只保存 token 的雜湊，返回 (RefreshToken, token 明文)；明文只能在此時取得，用來設定 cookie。
+    """
+    db_refresh_token, token_value = _build_refresh_token(
+        user_id=user.id, expires_delta=expires_delta, token_value=token_value
     )
     db.add(db_refresh_token)
-    db.commit()
-    db.refresh(db_refresh_token)
-    return db_refresh_token
+    await db.commit()
+    return db_refresh_token, token_value
 
-def get_refresh_token_by_value(db: Session, token_value: str) -> RefreshToken | None:
+async def get_refresh_token_by_value(db: AsyncSession, token_value: str) -> RefreshToken | None:
     """
     根據 token 字串查詢 Refresh Token。
     """
-    return db.query(RefreshToken).filter(RefreshToken.token == token_value).first()
+    return await db.scalar(
+        select(RefreshToken).where(RefreshToken.token_hash == RefreshToken.hash_token(token_value))
+    )
 
-def get_active_refresh_token_by_value(db: Session, token_value: str) -> RefreshToken | None:
+async def get_active_refresh_token_by_value(db: AsyncSession, token_value: str) -> RefreshToken | None:
+    """
+    根據 token 字串查詢有效的 (未過期且未撤銷的) Refresh Token，一併載入 user (async session 不能 lazy load)。
     """
-    根據 token 字串查詢有效的 (未過期且未撤銷的) Refresh Token。
+    return await db.scalar(
+        select(RefreshToken)
+        .options(joinedload(RefreshToken.user, innerjoin=True))
+        .where(
+            RefreshToken.token_hash == RefreshToken.hash_token(token_value),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > datetime.utcnow(),
+        )
+    )
+
+async def rotate_refresh_token(
+    db: AsyncSession, *, token_value: str, expires_delta: timedelta
+) -> Optional[Tuple[User, Optional[str]]]:
     """
-    token = db.query(RefreshToken).filter(RefreshToken.token == token_value).first()
-    if token and token.is_active:
-        return token
-    return None
+    在同一個 transaction 中撤銷舊的 Refresh Token 並建立新的 (滾動機制)：
+    查詢 (一併載入 user)、撤銷、新增，最後一次 commit。
 
-def revoke_refresh_token(db: Session, token: RefreshToken) -> RefreshToken:
+    返回 None 表示 token 不存在、已過期或已撤銷 (包括並行的請求剛好先換發了同一個 token)。
+    使用者已停用時只撤銷舊 token，返回 (user, None)；否則返回 (user, 新 token 明文)。
+    """
+    old_token = await get_active_refresh_token_by_value(db, token_value=token_value)
+    if old_token is None:
+        return None
+
+    # 以條件式 UPDATE 撤銷：同一個 token 被並行使用時只有一個請求會成功，不需要 SELECT ... FOR UPDATE
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == old_token.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        return None
+
+    user = old_token.user
+    new_token_value = None
+    if user.is_active:
+        new_token, new_token_value = _build_refresh_token(user_id=user.id, expires_delta=expires_delta)
+        db.add(new_token)
+    await db.commit()
+    return user, new_token_value
+
+async def revoke_refresh_token_by_value(db: AsyncSession, token_value: str) -> bool:
+    """
+    以單一 UPDATE 撤銷指定的 Refresh Token (登出時使用)。
+    返回是否有 token 被撤銷。
+    """
+    result = await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == RefreshToken.hash_token(token_value),
+            RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+async def revoke_refresh_token(db: AsyncSession, token: RefreshToken) -> RefreshToken:
     """
     撤銷一個 Refresh Token。
     """
     if token:
         token.revoked_at = datetime.utcnow()
         db.add(token)
-        db.commit()
-        db.refresh(token)
+        await db.commit()
+        await db.refresh(token)
     return token
 
-def revoke_all_refresh_tokens_for_user(db: Session, user_id: int) -> int:
+def build_revoke_all_refresh_tokens_statement(user_id: int):
+    """撤銷指定使用者所有有效 Refresh Tokens 的 UPDATE，讓呼叫端與其他變更放在同一個 transaction 中執行。"""
+    return (
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+async def revoke_all_refresh_tokens_for_user(db: AsyncSession, user_id: int) -> int:
     """
     撤銷指定使用者的所有 Refresh Tokens。
     返回被撤銷的 token 數量。
     """
-    now = datetime.utcnow()
-    updated_count = (
-        db.query(RefreshToken)
-        .filter(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
-        .update({"revoked_at": now}, synchronize_session=False)
-    )
-    db.commit()
-    return updated_count
+    result = await db.execute(build_revoke_all_refresh_tokens_statement(user_id))
+    await db.commit()
+    return result.rowcount
 
-def delete_expired_refresh_tokens(db: Session) -> int:
+async def delete_expired_refresh_tokens(db: AsyncSession) -> int:
     """
     刪除資料庫中所有已過期的 Refresh Tokens。
     返回被刪除的 token 數量。
     (這可以由一個背景任務定期執行)
     """
     now = datetime.utcnow()
-    deleted_count = (
-        db.query(RefreshToken)
-        .filter(RefreshToken.expires_at < now)
-        .delete(synchronize_session=False)
+    result = await db.execute(
+        delete(RefreshToken)
+        .where(RefreshToken.expires_at < now)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+async def delete_stale_refresh_tokens_batch(
+    db: AsyncSession, *, expired_before: datetime, revoked_before: datetime, limit: int
+) -> int:
+    """
+    刪除最多 limit 筆已過期 (expires_at < expired_before) 或撤銷已久 (revoked_at < revoked_before) 的 Refresh Tokens。
+    先以索引挑出 id，再以 id 列表依主鍵刪除，每批各自 commit，transaction 與鎖只持續一個批次。
+    (MySQL 不支援 IN 子查詢中的 LIMIT，也不能在 DELETE 的子查詢中讀取同一張表，因此分成兩個語句。)
+    返回被刪除的 token 數量 (小於 limit 表示已清除完畢)。
+    """
+    stale_ids = list(await db.scalars(
+        select(RefreshToken.id)
+        .where(or_(RefreshToken.expires_at < expired_before, RefreshToken.revoked_at < revoked_before))
+        .limit(limit)
+    ))
+    if not stale_ids:
+        await db.commit() # 結束 SELECT 開啟的 transaction
+        return 0
+    result = await db.execute(
+        delete(RefreshToken)
+        .where(RefreshToken.id.in_(stale_ids))
+        .execution_options(synchronize_session=False)
     )
-    db.commit()
-    return deleted_count
\ No newline at end of file
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,145 @@
+# backend/app/crud/upload_session.py
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from typing import List, Optional
+import os
+import uuid
+
+from app.crud.file import build_file_metadata
+from app.models.file import FileMetadata
+from app.models.upload_session import UploadSession
+from app.schemas.file import FileCreate
+
+async def create_upload_session(
+    db: AsyncSession, *, owner_id: int, filename: str, file_type: Optional[str], expected_size: int, staging_dir: str
+) -> UploadSession:
+    session_id = str(uuid.uuid4())
+    db_upload_session = UploadSession(
+        id=session_id,
+        owner_id=owner_id,
+        filename=filename,
+        file_type=file_type,
+        expected_size=expected_size,
+        offset=0,
+        checksum_crc32=0,
+        staging_path=f"{staging_dir}/{session_id}.part",
+    )
+    db.add(db_upload_session)
+    await db.commit()
+    await db.refresh(db_upload_session)
+    return db_upload_session
+
+async def get_upload_session_by_id_and_owner(
+    db: AsyncSession, session_id: str, owner_id: int
+) -> Optional[UploadSession]:
+    return await db.scalar(
+        select(UploadSession).where(UploadSession.id == session_id, UploadSession.owner_id == owner_id)
+    )
+
+async def claim_upload_session(
+    db: AsyncSession, upload_session: UploadSession, expected_offset: int, lease_seconds: int
+) -> Optional[str]:
+    """
+    在寫入暫存檔之前取得 session 的獨佔租約：只有 offset 仍等於 expected_offset、session 尚未完成，
+    且沒有其他請求持有未過期的租約時才成功。返回 claim token，失敗時返回 None。
+    同一個 session 的並行 PATCH (例如客戶端在第一個請求仍在進行時重試) 只有一個能寫入暫存檔。
+    """
+    now = datetime.utcnow()
+    claim_token = str(uuid.uuid4())
+    result = await db.execute(
+        update(UploadSession)
+        .where(
+            UploadSession.id == upload_session.id,
+            UploadSession.offset == expected_offset,
+            UploadSession.completed_file_id.is_(None),
+            or_(UploadSession.claim_token.is_(None), UploadSession.claimed_until < now),
+        )
+        .values(claim_token=claim_token, claimed_until=now + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return claim_token if result.rowcount == 1 else None
+
+async def renew_upload_session_claim(
+    db: AsyncSession, upload_session: UploadSession, claim_token: str, lease_seconds: int
+) -> bool:
+    """延長租約；租約已過期並被其他請求取得時返回 False，呼叫端必須停止寫入。"""
+    result = await db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload_session.id, UploadSession.claim_token == claim_token)
+        .values(claimed_until=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+async def advance_upload_session(
+    db: AsyncSession, upload_session: UploadSession, claim_token: str, new_offset: int, checksum_crc32: int,
+    release_claim: bool = True,
+) -> bool:
+    """
+    以持有的租約推進 offset 並釋放租約 (new_offset 與目前相同時只釋放租約)。
+    release_claim=False 時保留租約 (收到全部資料後接著完成上傳，完成前其他請求不能再取得 session)。
+    租約已被其他請求取得時不更新，返回 False。
+    """
+    values = dict(offset=new_offset, checksum_crc32=checksum_crc32, updated_at=datetime.utcnow())
+    if release_claim:
+        values.update(claim_token=None, claimed_until=None)
+    result = await db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload_session.id, UploadSession.claim_token == claim_token)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await db.refresh(upload_session)
+    return result.rowcount == 1
+
+async def complete_upload_session(
+    db: AsyncSession, upload_session: UploadSession, claim_token: str, file_in: FileCreate
+) -> Optional[FileMetadata]:
+    """
+    以持有的租約完成 session：建立檔案元數據、記錄 completed_file_id 並釋放租約，
+    與呼叫端尚未 commit 的變更 (blob 引用數) 在同一個 transaction 中 commit。
+    租約已被其他請求取得時 rollback 並返回 None，不會建立重複的檔案。
+    """
+    db_file = build_file_metadata(file_in)
+    db.add(db_file)
+    await db.flush()
+    result = await db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload_session.id, UploadSession.claim_token == claim_token)
+        .values(completed_file_id=db_file.id, updated_at=datetime.utcnow(), claim_token=None, claimed_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        return None
+    await db.commit()
+    await db.refresh(db_file)
+    await db.refresh(upload_session)
+    return db_file
+
+async def delete_upload_session(db: AsyncSession, upload_session: UploadSession) -> None:
+    """刪除 session 紀錄及其暫存檔。"""
+    try:
+        os.remove(upload_session.staging_path)
+    except FileNotFoundError:
+        pass
+    await db.delete(upload_session)
+    await db.commit()
+
+async def get_stale_upload_sessions(
+    db: AsyncSession, updated_before: datetime, limit: int = 100
+) -> List[UploadSession]:
+    """
+    取得在 updated_before 之後就沒有再收到資料的 session (供背景 reaper 使用)。
+    """
+    result = await db.scalars(
+        select(UploadSession)
+        .where(UploadSession.updated_at < updated_before)
+        .order_by(UploadSession.updated_at)
+        .limit(limit)
+    )
+    return list(result.all())
@@ -1,13 +1,33 @@
 # backend/app/dependencies.py
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+from typing import Dict, Type
 from fastapi import HTTPException, status
 
 from app.services.storage_interface import StorageInterface
-from app.services.s3_service import S3Service
-from app.services.gcs_service import GCSService  # Import GCSService if needed
+from app.services.async_storage import AsyncStorage
 from app.core.config import settings
 
 
+# STORAGE_PROVIDER -> "module:class"。provider 的模組在第一次使用時才匯入，
+# 每個 worker 只載入設定的那一個 SDK (boto3 或 google-cloud-storage)，啟動較快、記憶體用量較低
+STORAGE_PROVIDERS: Dict[str, str] = {
+    "s3": "app.services.s3_service:S3Service",
+    "gcs": "app.services.gcs_service:GCSService",
+    "local": "app.services.local_storage_service:LocalStorageService",
+}
+
+
+def load_storage_provider(provider: str) -> Type[StorageInterface]:
+    """匯入並返回 provider 對應的 storage service 類別。"""
+    try:
+        module_name, class_name = STORAGE_PROVIDERS[provider].split(":")
+    except KeyError:
+        raise ValueError(f"Unsupported storage provider: '{provider}'")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
 # 使用 @lru_cache(maxsize=None) 確保 service 只會被初始化一次
 # 這是一個高效的單例模式實現
 @lru_cache(maxsize=None)
@@ -25,20 +45,18 @@ def get_storage_service() -> StorageInterface:
     provider = settings.STORAGE_PROVIDER.lower()
     
     try:
-        # 根據 provider 決定要實體化哪個服務
-        if provider == "s3":
-            print("Initializing S3Service...")
-            service = S3Service()
-        elif provider == "gcs":
-            print("Initializing GCSService...")
-            service = GCSService()
-        else:
-            # 如果設定了不支援的 provider，直接拋出錯誤
-            raise ValueError(f"Unsupported storage provider: '{provider}'")
-            
-        return service
-
-    except (ValueError, ConnectionError) as e:
+        # 根據 provider 決定要實體化哪個服務 (不支援的 provider 會拋出 ValueError)
+        service_class = load_storage_provider(provider)
+        print(f"Initializing {service_class.__name__}...")
+        return service_class()
+
+    except ImportError as e:
+        # provider 的 SDK 沒有安裝
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Storage service ('{provider}') is not available: {e}"
+        )
+    except (ValueError, ConnectionError, OSError) as e:
         # 捕捉由 S3Service 或 GCSService 的 __init__ 拋出的設定錯誤或連線錯誤
         # 並將其轉換為 HTTP 503 錯誤，告知客戶端服務暫時不可用
         raise HTTPException(
@@ -52,6 +70,24 @@ def get_storage_service() -> StorageInterface:
             detail=f"An unexpected error occurred while initializing the storage service: {e}"
         )
 
+@lru_cache(maxsize=None)
+def get_storage_executor() -> ThreadPoolExecutor:
+    """專門執行阻塞式 storage 呼叫的 thread pool，與 FastAPI/AnyIO 預設的 thread pool 分開。"""
+    return ThreadPoolExecutor(
+        max_workers=settings.STORAGE_EXECUTOR_MAX_WORKERS, thread_name_prefix="storage"
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_storage_service() -> AsyncStorage:
+    """
+    Async Storage Service Factory.
+    Wraps the configured storage service so every call runs on the storage executor
+    instead of blocking the event loop.
+    """
+    return AsyncStorage(get_storage_service(), get_storage_executor())
+
+
 # 您原本的 FastAPI 相依性注入函式可以簡化成這樣
 # 這個函式可以直接在 FastAPI 的 depends() 中使用
 def get_storage_dependency() -> StorageInterface:
@@ -1,12 +1,73 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Response, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE
+from app.core.metrics_multiprocess import render_directory, run_metrics_flusher, write_snapshot
+from app.core.http_metrics import HTTPMetricsMiddleware
+from app.core.user_cache import start_invalidation_broker, stop_invalidation_broker
 from app.api.v1.endpoints import auth as api_v1_auth_router
 from app.api.v1.endpoints import files as api_v1_files_router # Add files router
 from app.api.v1.endpoints import users as api_v1_users_router # Add users router
+from app.api.v1.endpoints import uploads as api_v1_uploads_router
+from app.api.v1.endpoints import local_storage as api_v1_local_storage_router
+from app.core.security import get_password_hasher
+from app.core.rate_limit import run_rate_limit_bucket_purge
+from app.services.upload_reaper import run_upload_reaper
+from app.services.refresh_token_purger import run_refresh_token_purger
+from app.services.health import run_deep_health_check, warm_up
+from app.dependencies import get_async_storage_service, get_storage_executor
+from app.db.session import engine, read_engine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 訂閱其他 worker 發出的使用者快取失效通知
+    await start_invalidation_broker()
+    # 預先建立資料庫連線與 storage client，第一批請求不必等待初始化
+    if settings.STARTUP_WARMUP_ENABLED:
+        await warm_up()
+    # 啟動背景任務：定期中止逾時未完成的上傳
+    background_tasks = []
+    if settings.UPLOAD_REAPER_ENABLED:
+        background_tasks.append(asyncio.create_task(run_upload_reaper()))
+    # 分批刪除過期與撤銷已久的 refresh token，避免資料表與索引無限增長
+    if settings.REFRESH_TOKEN_PURGE_ENABLED:
+        background_tasks.append(asyncio.create_task(run_refresh_token_purger()))
+    # 共享的 rate limit bucket 存在資料庫中，定期刪除閒置的 bucket
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND == "database":
+        background_tasks.append(asyncio.create_task(run_rate_limit_bucket_purge()))
+    # 多 worker 時定期把這個 worker 的 metrics 寫入共享目錄，由 /metrics 合併 (見 app.core.metrics_multiprocess)
+    if settings.SERVER_METRICS_DIR:
+        background_tasks.append(asyncio.create_task(
+            run_metrics_flusher(settings.SERVER_METRICS_DIR, settings.SERVER_METRICS_FLUSH_SECONDS)
+        ))
+    yield
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await stop_invalidation_broker()
+    # 等待進行中的 storage 呼叫與密碼雜湊結束，下次啟動時重新建立 executor；
+    # 快取的 AsyncStorage 持有舊的 executor，一併清除
+    get_storage_executor().shutdown(wait=True)
+    get_storage_executor.cache_clear()
+    get_async_storage_service.cache_clear()
+    get_password_hasher().shutdown()
+    get_password_hasher.cache_clear()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
+    lifespan=lifespan,
 )
 
 # CORS configuration
@@ -16,15 +77,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 讓瀏覽器端可以讀取列表分頁的 cursor 與可續傳上傳的進度 (HEAD 查詢 offset 後從中斷處繼續)
+    expose_headers=[
+        NEXT_CURSOR_HEADER,
+        "Location", "Tus-Resumable", "Upload-Offset", "Upload-Length", "Upload-Checksum-CRC32",
+    ],
 )
+# 最後加入的 middleware 在最外層，量測的延遲包含 CORS 等其他 middleware
+app.add_middleware(HTTPMetricsMiddleware)
 
 app.include_router(api_v1_auth_router.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(api_v1_files_router.router, prefix="/api/v1/files", tags=["Files"]) # Add files router
 app.include_router(api_v1_users_router.router, prefix="/api/v1/users", tags=["Users"]) # Add users router
+app.include_router(api_v1_uploads_router.router, prefix="/api/v1/files", tags=["Uploads"])
+app.include_router(api_v1_local_storage_router.router, prefix="/api/v1/storage/local", tags=["Local Storage"])
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Cloud File System API"}
 
 @app.get("/health")
-async def health_check():
-    return {"status": "healthy", "version": settings.VERSION}
\ No newline at end of file
+async def health_check(response: Response, deep: bool = False):
+    """
+    預設只確認 process 可以回應。deep=1 時一併探測資料庫與 storage bucket
+    (結果快取 HEALTH_CHECK_CACHE_SECONDS 秒)，任一項失敗時回應 503。
+    """
+    if not deep:
+        return {"status": "healthy", "version": settings.VERSION}
+    checks = await run_deep_health_check()
+    healthy = all(check["status"] == "ok" for check in checks.values())
+    if not healthy:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "healthy" if healthy else "unhealthy", "version": settings.VERSION, "checks": checks}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    if not settings.SERVER_METRICS_DIR:
+        return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+    # 由 app.server 啟動時：合併所有 worker (包括已結束的) 的 metrics，先寫入自己最新的值
+    directory = settings.SERVER_METRICS_DIR
+    await asyncio.to_thread(write_snapshot, directory)
+    body = await asyncio.to_thread(render_directory, directory)
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
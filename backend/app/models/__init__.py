@@ -1,9 +1,13 @@
 # backend/app/models/__init__.py
 from .user import User, UserRole # 假設 UserRole 在 user.py
 from .refresh_token import RefreshToken # 新增這一行
-from .file import FileMetadata
+from .file import FileMetadata, FileUploadStatus
+from .pending_upload import PendingUpload
+from .upload_session import UploadSession
+from .content_blob import ContentBlob
+from .rate_limit_bucket import RateLimitBucket
 # 如果您有 user_role.py 和 role.py，也一併匯入
 # from .role import Role
 # from .user_role import user_roles_table
 
-__all__ = ["User", "UserRole", "RefreshToken", "FileMetadata"] # 將 RefreshToken 加入 __all__
\ No newline at end of file
+__all__ = ["User", "UserRole", "RefreshToken", "FileMetadata", "FileUploadStatus", "PendingUpload", "UploadSession", "ContentBlob", "RateLimitBucket"] # 將 RefreshToken 加入 __all__
\ No newline at end of file
@@ -0,0 +1,19 @@
+# backend/app/models/content_blob.py
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger
+from app.db.base_class import Base
+from datetime import datetime
+
+class ContentBlob(Base):
+    """
+    以內容雜湊 (SHA-256) 定址的共享物件。
+    內容相同的上傳共用同一個 storage 物件，ref_count 記錄引用它的檔案數量，
+    最後一個引用被刪除時才刪除 storage 中的物件。
+    """
+    __tablename__ = "content_blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, index=True, nullable=False) # 內容的 SHA-256 (hex)
+    storage_path = Column(String(255), unique=True, nullable=False) # blobs/{sha256[:2]}/{sha256}
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,15 +1,27 @@
 # backend/app/models/file.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 from datetime import datetime
+import enum
+
+
+class FileUploadStatus(str, enum.Enum):
+    PENDING = "pending" # 已發出 presigned 上傳 URL，等待客戶端完成上傳
+    AVAILABLE = "available" # 物件已存在於 storage，可以下載/分享
 
 class FileMetadata(Base):
     __tablename__ = "file_metadata"
+    __table_args__ = (
+        # 列表查詢以 (uploaded_at, id) 由新到舊做 keyset 分頁：
+        # 依擁有者列出 (一般使用者 / admin 過濾使用者) 與不過濾的 admin 列表各用一個索引
+        Index("ix_file_metadata_owner_id_uploaded_at_id", "owner_id", "uploaded_at", "id"),
+        Index("ix_file_metadata_uploaded_at_id", "uploaded_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), index=True, nullable=False) # Original filename
-    storage_path = Column(String(255), unique=True, index=True, nullable=False) # Path in S3/MinIO
+    storage_path = Column(String(255), index=True, nullable=False) # Path in S3/MinIO (去重後多個檔案可共用同一個 blob)
     file_type = Column(String(100), nullable=True) # MIME type
     size = Column(Integer, nullable=True) # In bytes
     
@@ -18,5 +30,12 @@ class FileMetadata(Base):
     
     is_encrypted = Column(Boolean, default=True) # Assuming SSE-S3 by default
     encryption_method = Column(String(50), default="SSE-S3")
+    upload_status = Column(String(20), default=FileUploadStatus.AVAILABLE.value, nullable=False)
+    blob_id = Column(Integer, ForeignKey("content_blobs.id"), nullable=True, index=True) # 經過內容去重的檔案才有值
+    # 客戶端直接上傳 (presigned / multipart) 完成時 storage 回報的 ETag 與修改時間，下載的驗證標頭由此產生；
+    # presigned URL 在完成後仍可能被再次使用，下載時以此確認物件沒有被覆寫
+    storage_etag = Column(String(255), nullable=True)
+    storage_modified_at = Column(DateTime, nullable=True)
 
-    owner = relationship("User")
\ No newline at end of file
+    owner = relationship("User")
+    blob = relationship("ContentBlob")
\ No newline at end of file
@@ -0,0 +1,21 @@
+# backend/app/models/pending_upload.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from app.db.base_class import Base
+from datetime import datetime
+
+class PendingUpload(Base):
+    """
+    尚未完成的 multipart 上傳 (S3 multipart upload / GCS resumable session)。
+    完成或中止後刪除；逾時未完成的由背景 reaper 中止，避免已上傳的 parts 佔用 storage。
+    """
+    __tablename__ = "pending_uploads"
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_id = Column(Integer, ForeignKey("file_metadata.id", ondelete="CASCADE"), nullable=False, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    storage_path = Column(String(255), nullable=False)
+    upload_id = Column(String(1024), nullable=False) # S3 UploadId 或 GCS resumable session URI
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    file = relationship("FileMetadata")
@@ -0,0 +1,21 @@
+# backend/app/models/rate_limit_bucket.py
+from sqlalchemy import Column, String, DateTime, Float, Integer
+from sqlalchemy.dialects import mysql
+from app.db.base_class import Base
+from datetime import datetime
+
+class RateLimitBucket(Base):
+    """
+    共享 rate limit backend (RATE_LIMIT_BACKEND=database) 的 token bucket 狀態。
+    多個 worker / 節點透過同一個資料庫共用限制；tokens 在每次取用時依經過的時間補充。
+    """
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(255), primary_key=True) # 例如 "login-ip:203.0.113.7"
+    tokens = Column(Float, nullable=False) # 上次更新時剩餘的 token 數
+    # 補充 token 依經過的時間計算，需要微秒精度 (MySQL 的 DATETIME 預設只到秒)
+    updated_at = Column(
+        DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"), nullable=False, default=datetime.utcnow, index=True
+    )
+    # 每次更新遞增，作為 compare-and-swap 的條件 (同一秒內的兩次更新 updated_at 可能相同)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
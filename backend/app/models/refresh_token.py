@@ -1,5 +1,7 @@
+import hashlib
 import secrets
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, LargeBinary
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 from datetime import datetime, timedelta
@@ -9,10 +11,12 @@ class RefreshToken(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False) # 關聯到 User 模型
-    token = Column(String(512), unique=True, index=True, nullable=False) # Refresh Token 字串
-    expires_at = Column(DateTime, nullable=False) # 過期時間
+    # Refresh Token 的 SHA-256 digest (固定 32 bytes)；明文只存在使用者的 cookie 中，資料庫外洩時無法直接使用
+    # (MySQL 的 BLOB 不能直接建立索引，改用 BINARY(32))
+    token_hash = Column(LargeBinary(32).with_variant(mysql.BINARY(32), "mysql"), unique=True, index=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True) # 過期時間 (背景清除依此索引分批刪除)
     created_at = Column(DateTime, default=datetime.utcnow)
-    revoked_at = Column(DateTime, nullable=True) # 標記為已撤銷的時間
+    revoked_at = Column(DateTime, nullable=True, index=True) # 標記為已撤銷的時間
 
     user = relationship("User") # 建立與 User 的關聯
 
@@ -21,5 +25,10 @@ class RefreshToken(Base):
         return self.revoked_at is None and datetime.utcnow() < self.expires_at
 
     @staticmethod
-    def generate_token(length: int = 128) -> str:
-        return secrets.token_urlsafe(length)
\ No newline at end of file
+    def generate_token(nbytes: int = 32) -> str:
+        return secrets.token_urlsafe(nbytes) # 256 bits 的隨機值
+
+    @staticmethod
+    def hash_token(token: str) -> bytes:
+        # token 本身是高熵的隨機值，不需要 bcrypt 之類的慢速雜湊
+        return hashlib.sha256(token.encode()).digest()
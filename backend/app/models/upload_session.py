@@ -0,0 +1,29 @@
+# backend/app/models/upload_session.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, BigInteger
+from app.db.base_class import Base
+from datetime import datetime
+
+class UploadSession(Base):
+    """
+    可續傳 (tus 風格) 上傳的 session 狀態。
+    已接收的位元組暫存在 staging_path，offset 與 checksum 記錄目前的進度，
+    斷線後客戶端查詢 offset 即可從中斷處繼續上傳。
+    """
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(36), primary_key=True, index=True) # uuid4，作為不可猜測的 session 識別碼
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    file_type = Column(String(100), nullable=True)
+    expected_size = Column(BigInteger, nullable=False) # 客戶端宣告的總大小 (Upload-Length)
+    offset = Column(BigInteger, nullable=False, default=0) # 已接收的位元組數 (Upload-Offset)
+    checksum_crc32 = Column(BigInteger, nullable=False, default=0) # 已接收內容的累計 CRC32
+    staging_path = Column(String(512), nullable=False)
+    # 正在寫入暫存檔的 PATCH 請求 (claim_upload_session)；租約過期後其他請求可以接手
+    claim_token = Column(String(36), nullable=True)
+    claimed_until = Column(DateTime, nullable=True)
+    # 完成後建立的檔案 (不設外鍵，檔案之後可能被刪除)；保留 session 讓重試的最後一個 PATCH 取得同一個結果，
+    # 紀錄由背景 reaper 依 updated_at 清除
+    completed_file_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
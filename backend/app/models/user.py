@@ -21,3 +21,6 @@ class User(Base):
     # 新增 role 欄位
     role = Column(Enum(UserRole), default=UserRole.USER, nullable=False) # 預設為一般使用者
 
+    # access token 中帶有簽發時的 token_epoch；停用、角色變更、重設密碼時遞增，使先前簽發的 token 失效
+    token_epoch = Column(Integer, default=0, server_default="0", nullable=False)
+
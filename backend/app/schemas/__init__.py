@@ -1,11 +1,15 @@
 # backend/app/schemas/__init__.py
 from .user import UserBase, UserCreate, UserRead, UserUpdate
 from .token import Token, TokenData
-from .file import FileBase, FileCreate, FileRead, FileUpdate, PresignedUrlResponse, FileRename
+from .file import (
+    FileBase, FileCreate, FileRead, FileUpdate, PresignedUrlResponse, FileRename,
+    UploadUrlRequest, UploadUrlResponse,
+)
 
 __all__ = [
     "UserBase", "UserCreate", "UserRead", "UserUpdate",
     "Token", "TokenData",
-    "FileBase", "FileCreate", "FileRead", "FileUpdate", "PresignedUrlResponse" # Add File schemas,
-    "FileRename"  # Include FileRename if needed
+    "FileBase", "FileCreate", "FileRead", "FileUpdate", "PresignedUrlResponse", # Add File schemas
+    "FileRename",  # Include FileRename if needed
+    "UploadUrlRequest", "UploadUrlResponse",
 ]
\ No newline at end of file
@@ -3,6 +3,8 @@ from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
+from app.models.file import FileUploadStatus
+
 class FileBase(BaseModel):
     filename: str
     file_type: Optional[str] = None
@@ -13,6 +15,8 @@ class FileCreate(FileBase): # Used when creating metadata in DB
     owner_id: int
     is_encrypted: bool = True
     encryption_method: str = "SSE-S3"
+    upload_status: FileUploadStatus = FileUploadStatus.AVAILABLE
+    blob_id: Optional[int] = None # 內容去重後共用的 content blob
 
 class FileUpdate(BaseModel): # For potential future use (e.g., renaming)
     filename: Optional[str] = None
@@ -24,6 +28,7 @@ class FileRead(FileBase):
     uploaded_at: datetime
     is_encrypted: bool
     encryption_method: str
+    upload_status: FileUploadStatus = FileUploadStatus.AVAILABLE
 
     class Config:
         from_attributes = True
@@ -36,4 +41,15 @@ class PresignedUrlResponse(BaseModel):
     url: str
     filename: str # Include original filename for convenience
     method: str = "GET" # The HTTP method this URL is for
-    expires_at: Optional[datetime] = None # Optional: Calculate and provide actual expiry time
\ No newline at end of file
+    expires_at: Optional[datetime] = None # Optional: Calculate and provide actual expiry time
+
+class UploadUrlRequest(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    file_type: Optional[str] = None # MIME type，會簽入 presigned URL，客戶端上傳時需帶相同的 Content-Type
+    size: Optional[int] = Field(None, ge=0) # 客戶端宣告的檔案大小，完成上傳時會以 storage 的實際大小為準
+
+class UploadUrlResponse(BaseModel):
+    file: FileRead # 狀態為 pending 的檔案元數據
+    url: str # 客戶端直接 PUT 檔案內容到此 URL
+    method: str = "PUT"
+    expires_at: Optional[datetime] = None
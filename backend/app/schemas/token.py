@@ -1,11 +1,15 @@
 from pydantic import BaseModel
 from typing import Optional
 
+from app.models.user import UserRole
+
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
-    # 如果您使用 user_id 作為 subject，可以是：
-    # user_id: Optional[int] = None
\ No newline at end of file
+    # access token 中的使用者 claims (見 security.create_user_access_token)
+    user_id: Optional[int] = None
+    role: Optional[UserRole] = None
+    token_epoch: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,63 @@
+# backend/app/schemas/upload.py
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import datetime
+
+from app.schemas.file import FileRead
+
+# S3 multipart upload 的 part 編號範圍
+MIN_PART_NUMBER = 1
+MAX_PART_NUMBER = 10000
+
+class MultipartUploadRead(BaseModel):
+    id: int
+    file_id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class MultipartUploadCreateResponse(BaseModel):
+    upload: MultipartUploadRead
+    file: FileRead # 狀態為 pending 的檔案元數據
+    part_size: int # 建議的 part 大小 (除了最後一個 part 之外，S3 要求每個 part 至少 5 MB)
+    # "s3-parts"：各 part 的 URL 不同，可以平行上傳，完成時提交各 part 的 ETag；
+    # "gcs-resumable"：所有 part 上傳到同一個 session URI，依序上傳並帶 Content-Range
+    # (bytes {start}-{end}/*，最後一段為 /{總大小})，除最後一段外大小為 256 KiB 的倍數
+    protocol: Literal["s3-parts", "gcs-resumable"] = "s3-parts"
+    sequential: bool = False # True 時必須等前一個 part 完成才能上傳下一個
+
+class MultipartPartUrlRequest(BaseModel):
+    part_numbers: List[int] = Field(..., min_length=1, max_length=1000)
+
+class MultipartPartUrl(BaseModel):
+    part_number: int
+    url: str
+
+class MultipartPartUrlResponse(BaseModel):
+    parts: List[MultipartPartUrl]
+    method: str = "PUT"
+    expires_at: Optional[datetime] = None
+
+class MultipartUploadPart(BaseModel):
+    part_number: int = Field(..., ge=MIN_PART_NUMBER, le=MAX_PART_NUMBER)
+    etag: str # 上傳 part 時 storage 回傳的 ETag 標頭
+
+class MultipartUploadComplete(BaseModel):
+    parts: List[MultipartUploadPart] = Field(default_factory=list)
+
+class ResumableUploadCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    file_type: Optional[str] = None
+    size: int = Field(..., ge=0) # 檔案總大小 (tus 的 Upload-Length)
+
+class ResumableUploadRead(BaseModel):
+    id: str
+    filename: str
+    file_type: Optional[str] = None
+    expected_size: int
+    offset: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
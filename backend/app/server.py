@@ -0,0 +1,345 @@
+# backend/app/server.py
+"""
+正式環境的多 worker 啟動器 (prefork)。
+
+    python -m app.server [--workers N] [--host 0.0.0.0] [--port 8000]
+
+- master 先匯入 app.main 並綁定 listening socket，再 fork 出 worker：
+  匯入後的模組以 copy-on-write 與所有 worker 共用，worker 啟動只需執行 lifespan。
+- worker 數預設依可用的 CPU (含 cgroup 配額與 CPU affinity) 與記憶體 (SERVER_WORKER_MEMORY_MB) 決定。
+- 每個 worker 處理 SERVER_MAX_REQUESTS (加上隨機 jitter) 個請求後結束，由 master 補上新的 worker，
+  限制長時間執行造成的記憶體增長。
+- 每個 worker 各自的狀態：多個 worker 時需要 USER_CACHE_INVALIDATION_BROKER="postgres" 與
+  RATE_LIMIT_BACKEND="database" (或停用 user cache / rate limit)。設定不符時：明確指定 --workers/SERVER_WORKERS
+  則拒絕啟動，自動決定 worker 數則退回 1 個 worker；SERVER_ALLOW_PER_WORKER_STATE=true 時只記錄警告。
+- metrics：worker 把各自的 metrics 寫入 SERVER_METRICS_DIR (未設定時為 master 建立的暫存目錄)，
+  任一 worker 回應的 /metrics 都是所有 worker 的合計；結束的 worker 的 counter 由 master 併入，不會歸零。
+- 訊號：
+  SIGHUP          逐一替換 worker：先啟動新的 worker，再讓舊的停止接受連線並等待進行中的請求 (例如上傳) 完成
+  SIGTERM/SIGINT  所有 worker 停止接受連線，最多等待 SERVER_GRACEFUL_TIMEOUT_SECONDS 後結束
+  worker 都是從 master fork 出來的，SIGHUP 不會載入新的程式碼；部署新版本時重新啟動整個 process
+  (SIGTERM 會先等待進行中的請求)。
+"""
+import argparse
+import logging
+import math
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.metrics_multiprocess import archive_worker_snapshot, reset_directory
+
+# master 的訊息與 uvicorn 的訊息輸出到同一個 logger
+logger = logging.getLogger("uvicorn.error")
+
+MIN_RESPAWN_INTERVAL_SECONDS = 1.0 # worker 啟動後立即結束 (例如 lifespan 失敗) 時，避免不斷 fork
+SHUTDOWN_KILL_GRACE_SECONDS = 5 # 超過 graceful timeout 後再等待的秒數，之後以 SIGKILL 結束
+
+
+def _read_cgroup_file(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def effective_cpu_count() -> int:
+    """可用的 CPU 數：CPU affinity 與 cgroup CPU 配額 (容器的 --cpus) 中較小者。"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError: # macOS 沒有 sched_getaffinity
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    cpu_max = _read_cgroup_file("/sys/fs/cgroup/cpu.max") # cgroup v2: "<quota> <period>" 或 "max <period>"
+    if cpu_max and not cpu_max.startswith("max"):
+        quota_us, period_us = cpu_max.split()
+        quota = int(quota_us) / int(period_us)
+    else:
+        quota_us = _read_cgroup_file("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") # cgroup v1
+        period_us = _read_cgroup_file("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if quota_us and period_us and int(quota_us) > 0:
+            quota = int(quota_us) / int(period_us)
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def available_memory_bytes() -> Optional[int]:
+    """可用的記憶體：cgroup 的記憶體上限，沒有上限時為實體記憶體總量。"""
+    memory_max = _read_cgroup_file("/sys/fs/cgroup/memory.max") # cgroup v2
+    if memory_max and memory_max != "max":
+        return int(memory_max)
+    limit = _read_cgroup_file("/sys/fs/cgroup/memory/memory.limit_in_bytes") # cgroup v1 (沒有上限時是極大值)
+    if limit and int(limit) < 1 << 60:
+        return int(limit)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def compute_worker_count(cpus: int, memory_bytes: Optional[int], worker_memory_mb: int) -> int:
+    """
+    async worker 的 I/O 等待不佔用 CPU，每個核心一個 worker 即可用滿 CPU (bcrypt 與 JSON 序列化)；
+    同時不超過記憶體可以容納的 worker 數。
+    """
+    workers = cpus
+    if memory_bytes and worker_memory_mb > 0:
+        workers = min(workers, memory_bytes // (worker_memory_mb * 1024 * 1024))
+    return max(1, int(workers))
+
+
+def per_worker_state_problems() -> List[str]:
+    """只存在單一 worker 記憶體中、多個 worker 時會不一致的設定。"""
+    problems = []
+    if settings.USER_CACHE_ENABLED and settings.USER_CACHE_INVALIDATION_BROKER != "postgres":
+        problems.append(
+            "USER_CACHE_INVALIDATION_BROKER is not 'postgres': password changes, deactivation and logout-all "
+            "only invalidate the cache of the worker that handled them (others serve stale users for up to "
+            "USER_CACHE_TTL_SECONDS)"
+        )
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND != "database":
+        problems.append(
+            "RATE_LIMIT_BACKEND is not 'database': each worker keeps its own buckets, so the effective "
+            "limit is multiplied by the number of workers"
+        )
+    return problems
+
+
+def resolve_worker_count(requested: Optional[int], auto_count: int) -> int:
+    """
+    檢查多 worker 時每個 worker 各自的狀態。明確指定的 worker 數與設定衝突時結束 process (設定錯誤)，
+    自動決定的 worker 數則退回 1 個 worker，行為與單一 process 相同。
+    """
+    workers = requested or auto_count
+    problems = per_worker_state_problems() if workers > 1 else []
+    if not problems:
+        return workers
+    for problem in problems:
+        logger.warning(f"Running {workers} workers: {problem}")
+    if settings.SERVER_ALLOW_PER_WORKER_STATE:
+        logger.warning("SERVER_ALLOW_PER_WORKER_STATE is set; starting anyway")
+        return workers
+    if requested:
+        logger.error(
+            f"Refusing to start {workers} workers. Use USER_CACHE_INVALIDATION_BROKER=postgres and "
+            f"RATE_LIMIT_BACKEND=database, set SERVER_WORKERS=1, or set SERVER_ALLOW_PER_WORKER_STATE=true"
+        )
+        sys.exit(1)
+    logger.warning("Falling back to 1 worker; configure the shared backends above to use more")
+    return 1
+
+
+class Master:
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int, metrics_dir: str):
+        self.config = config
+        self.sock = sock
+        self.metrics_dir = metrics_dir
+        self.worker_count = workers
+        self.workers: Dict[int, float] = {} # pid -> 啟動時間
+        self.draining: Dict[int, float] = {} # 正在停止的舊 worker: pid -> 送出 SIGTERM 的時間
+        self.reload_queue: List[int] = []
+        self.last_spawn = 0.0
+        self.should_exit = False
+
+    # --- worker ---
+
+    def spawn_worker(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker() # 不會返回
+        self.workers[pid] = time.monotonic()
+        self.last_spawn = time.monotonic()
+        logger.info(f"Started worker [{pid}]")
+
+    def _run_worker(self) -> None:
+        exit_code = 0
+        try:
+            # 還原 master 的訊號處理；uvicorn 會自行處理 SIGINT/SIGTERM (停止接受連線並等待進行中的請求)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            if settings.SERVER_MAX_REQUESTS > 0:
+                # 各 worker 的上限不同，避免同時重新啟動
+                self.config.limit_max_requests = settings.SERVER_MAX_REQUESTS + random.randint(
+                    0, max(0, settings.SERVER_MAX_REQUESTS_JITTER)
+                )
+            uvicorn.Server(self.config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception(f"Worker [{os.getpid()}] crashed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code) # 不執行 master 的 atexit 與 finally
+
+    def reap_workers(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self._archive_metrics(pid)
+            if pid in self.draining:
+                del self.draining[pid]
+                logger.info(f"Old worker [{pid}] finished draining")
+            elif self.workers.pop(pid, None) is not None:
+                if os.WIFSIGNALED(status) or os.WEXITSTATUS(status) == 0:
+                    logger.info(f"Worker [{pid}] exited; replacing it") # 達到 max requests 或被手動停止
+                else:
+                    logger.warning(f"Worker [{pid}] exited with status {os.WEXITSTATUS(status)}; replacing it")
+                if pid in self.reload_queue:
+                    self.reload_queue.remove(pid)
+
+    def maintain_worker_count(self) -> None:
+        if self.should_exit:
+            return
+        while len(self.workers) < self.worker_count:
+            if time.monotonic() - self.last_spawn < MIN_RESPAWN_INTERVAL_SECONDS:
+                return
+            self.spawn_worker()
+
+    def continue_reload(self) -> None:
+        """一次只替換一個 worker：等上一個舊 worker 結束後，才啟動下一個新的 worker 並停止對應的舊 worker。"""
+        if self.should_exit or self.draining or not self.reload_queue:
+            return
+        old_pid = self.reload_queue.pop(0)
+        if old_pid not in self.workers:
+            return
+        self.spawn_worker() # 先補上新的 worker，替換期間可處理的連線數不會減少
+        del self.workers[old_pid]
+        self.draining[old_pid] = time.monotonic()
+        os.kill(old_pid, signal.SIGTERM)
+
+    def kill_stuck_draining_workers(self) -> None:
+        deadline = settings.SERVER_GRACEFUL_TIMEOUT_SECONDS + SHUTDOWN_KILL_GRACE_SECONDS
+        for pid, since in list(self.draining.items()):
+            if time.monotonic() - since > deadline:
+                logger.warning(f"Old worker [{pid}] did not stop in time; killing it")
+                self._kill(pid, signal.SIGKILL)
+
+    def _archive_metrics(self, pid: int) -> None:
+        try:
+            archive_worker_snapshot(self.metrics_dir, pid)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not archive metrics of worker [{pid}]: {e}")
+
+    @staticmethod
+    def _kill(pid: int, sig: int) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    # --- 訊號 ---
+
+    def handle_reload(self, sig, frame) -> None:
+        logger.info("Received SIGHUP; replacing workers one at a time")
+        self.reload_queue = list(self.workers)
+
+    def handle_exit(self, sig, frame) -> None:
+        self.should_exit = True
+
+    # --- 主迴圈 ---
+
+    def run(self) -> None:
+        signal.signal(signal.SIGHUP, self.handle_reload)
+        signal.signal(signal.SIGTERM, self.handle_exit)
+        signal.signal(signal.SIGINT, self.handle_exit)
+        logger.info(f"Master [{os.getpid()}] starting {self.worker_count} worker(s)")
+        for _ in range(self.worker_count):
+            self.spawn_worker()
+
+        while not self.should_exit:
+            time.sleep(0.2)
+            self.reap_workers()
+            self.maintain_worker_count()
+            self.continue_reload()
+            self.kill_stuck_draining_workers()
+
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        pids = list(self.workers) + list(self.draining)
+        logger.info(f"Shutting down {len(pids)} worker(s); waiting for in-flight requests")
+        for pid in pids:
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + settings.SERVER_GRACEFUL_TIMEOUT_SECONDS + SHUTDOWN_KILL_GRACE_SECONDS
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+                    self._archive_metrics(pid)
+            time.sleep(0.1)
+        for pid in remaining:
+            logger.warning(f"Worker [{pid}] did not stop in time; killing it")
+            self._kill(pid, signal.SIGKILL)
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.sock.close()
+        logger.info("Master exiting")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    args = parser.parse_args()
+
+    # 在 fork 之前匯入 app，worker 共用已載入的模組 (不在 fork 前建立 thread 或資料庫連線)
+    from app.main import app
+
+    cpus = effective_cpu_count()
+    workers = resolve_worker_count(
+        args.workers, compute_worker_count(cpus, available_memory_bytes(), settings.SERVER_WORKER_MEMORY_MB)
+    )
+    if settings.PASSWORD_HASH_MAX_WORKERS is None:
+        # 多個 worker 時每個 worker 的 bcrypt thread 數隨之減少，整個節點合計約等於 CPU 數
+        settings.PASSWORD_HASH_MAX_WORKERS = max(1, cpus // workers)
+
+    config = uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        log_level=settings.LOG_LEVEL,
+        proxy_headers=settings.SERVER_PROXY_HEADERS,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    )
+    # fork 之前設定，worker 繼承同一個目錄；結束的 worker 重新啟動後 counter 不會歸零
+    temporary_metrics_dir = settings.SERVER_METRICS_DIR is None
+    if temporary_metrics_dir:
+        settings.SERVER_METRICS_DIR = tempfile.mkdtemp(prefix="cfs-metrics-")
+    reset_directory(settings.SERVER_METRICS_DIR)
+
+    sock = config.bind_socket()
+    logger.info(f"Detected {cpus} CPU(s); using {workers} worker(s)")
+    try:
+        Master(config, sock, workers, settings.SERVER_METRICS_DIR).run()
+    finally:
+        if temporary_metrics_dir:
+            shutil.rmtree(settings.SERVER_METRICS_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# backend/app/services/async_storage.py
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor
+from typing import IO, Any, AsyncIterator, Callable, Iterator, List, Optional, TypeVar
+
+from .storage_interface import DEFAULT_READ_CHUNK_SIZE, StorageInterface, StorageObjectInfo
+
+T = TypeVar("T")
+
+
+class AsyncStorage:
+    """
+    StorageInterface 的 async 版本。
+
+    boto3 與 google-cloud-storage 都是阻塞式的 client，直接在 async endpoint 中呼叫會卡住
+    整個 event loop：一個慢的 S3 請求會拖慢同一個 worker 上所有其他請求。
+    這裡把每個呼叫交給專用且有上限的 executor (STORAGE_EXECUTOR_MAX_WORKERS)，
+    同時進行的 storage 呼叫數量有上限，超過的會在 executor 中排隊，而不會佔用 event loop。
+    """
+
+    def __init__(self, storage: StorageInterface, executor: Executor):
+        self.sync = storage  # 底層的同步 service，給需要在 executor 中一併執行的工作使用
+        self._executor = executor
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在 storage executor 中執行任意同步函式 (例如同時操作 DB 與 storage 的 store_content)。"""
+        loop = asyncio.get_running_loop()
+        # 與 asyncio.to_thread 相同，把 contextvars 一併帶進 worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+
+    async def upload_file(
+        self, file_content: IO[Any], destination_path: str, content_type: Optional[str] = None
+    ) -> str:
+        return await self.run(
+            self.sync.upload_file,
+            file_content=file_content, destination_path=destination_path, content_type=content_type
+        )
+
+    async def delete_file(self, storage_path: str) -> None:
+        await self.run(self.sync.delete_file, storage_path=storage_path)
+
+    async def generate_presigned_url(
+        self, storage_path: str,
+        expiration_seconds: int,
+        http_method: str = "GET",
+        download_filename: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Optional[str]:
+        return await self.run(
+            self.sync.generate_presigned_url,
+            storage_path=storage_path,
+            expiration_seconds=expiration_seconds,
+            http_method=http_method,
+            download_filename=download_filename,
+            content_type=content_type,
+        )
+
+    async def get_file_info(self, storage_path: str) -> Optional[StorageObjectInfo]:
+        return await self.run(self.sync.get_file_info, storage_path=storage_path)
+
+    async def probe(self) -> None:
+        await self.run(self.sync.probe)
+
+    async def open_range(
+        self, storage_path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        etag: Optional[str] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        在 executor 中開啟物件 (物件不存在等錯誤在這裡拋出)，返回逐塊讀取的 async iterator。
+        每次只在 executor 中讀取一塊，等 response 送出這一塊後才讀下一塊：
+        記憶體用量只和 chunk_size 有關，等待慢的客戶端時也不佔用 executor 的 thread。
+        """
+        chunks = await self.run(
+            self.sync.open_range, storage_path=storage_path, start=start, end=end, chunk_size=chunk_size, etag=etag
+        )
+        return self._read_chunks(chunks)
+
+    async def _read_chunks(self, chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+        pending = None
+        try:
+            while True:
+                pending = self._executor.submit(next, chunks, None)
+                chunk = await asyncio.wrap_future(pending)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                if pending is None:
+                    close()
+                else:
+                    # 客戶端斷線而取消時，executor 中的讀取可能還在進行；等它完成後再關閉 (連線或檔案)，
+                    # 不能在讀取中的 generator 上呼叫 close()
+                    pending.add_done_callback(lambda _: close())
+
+    async def create_multipart_upload(self, storage_path: str, content_type: Optional[str] = None) -> str:
+        return await self.run(self.sync.create_multipart_upload, storage_path=storage_path, content_type=content_type)
+
+    async def generate_presigned_part_url(
+        self, storage_path: str, upload_id: str, part_number: int, expiration_seconds: int
+    ) -> Optional[str]:
+        return await self.run(
+            self.sync.generate_presigned_part_url,
+            storage_path=storage_path,
+            upload_id=upload_id,
+            part_number=part_number,
+            expiration_seconds=expiration_seconds,
+        )
+
+    async def complete_multipart_upload(self, storage_path: str, upload_id: str, parts: List[dict]) -> None:
+        await self.run(self.sync.complete_multipart_upload, storage_path=storage_path, upload_id=upload_id, parts=parts)
+
+    async def abort_multipart_upload(self, storage_path: str, upload_id: str) -> None:
+        await self.run(self.sync.abort_multipart_upload, storage_path=storage_path, upload_id=upload_id)
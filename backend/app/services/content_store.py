@@ -0,0 +1,135 @@
+# backend/app/services/content_store.py
+import hashlib
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import IO, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud import content_blob as crud_content_blob
+from app.crud import file as crud_file
+from app.models.file import FileMetadata
+from app.services.async_storage import AsyncStorage
+from app.services.streaming import CountingReader
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredContent:
+    storage_path: str
+    size: int
+    blob_id: Optional[int] = None # 經過內容去重時為共用的 content blob
+    uploaded: bool = True # 這次是否寫入了新的 storage 物件 (引用既有 blob 時為 False)
+
+
+def build_storage_path(owner_id: int, filename: str) -> str:
+    """Sanitize filename and create a unique storage path: {owner_id}/{uuid}_{filename}"""
+    sanitized_filename = "".join(c if c.isalnum() or c in ['.', '_', '-'] else '_' for c in filename)
+    return f"{owner_id}/{uuid.uuid4()}_{sanitized_filename}"
+
+
+def build_blob_storage_path(sha256: str) -> str:
+    """
+    每個 blob 紀錄使用自己的路徑：{sha256} 之下再加上 uuid。
+    最後一個引用被刪除時，blob 紀錄先被刪除、storage 物件之後才刪除；
+    期間上傳相同內容會建立新的 blob 紀錄並寫入新的路徑，不會被刪除中的物件覆蓋或連帶刪除。
+    """
+    return f"blobs/{sha256[:2]}/{sha256}/{uuid.uuid4().hex}"
+
+
+def _hash_content(raw: IO[bytes]) -> tuple[str, int]:
+    """以固定大小的區塊讀過整個檔案，返回 (SHA-256, 大小)。"""
+    hash_stream = CountingReader(raw, hasher=hashlib.sha256())
+    for _ in hash_stream.iter_chunks():
+        pass
+    return hash_stream.hasher.hexdigest(), hash_stream.bytes_read
+
+
+async def store_content(
+    db: AsyncSession,
+    storage_service: AsyncStorage,
+    raw: IO[bytes],
+    *,
+    owner_id: int,
+    filename: str,
+    content_type: Optional[str] = None,
+) -> StoredContent:
+    """
+    將本機的可 seek 檔案 (UploadFile 的 spool 或可續傳上傳的暫存檔) 存入 storage。
+
+    啟用 CONTENT_DEDUP_ENABLED 時，先以固定大小的區塊讀過一次本機檔案計算 SHA-256：
+    內容已存在就只增加 blob 的 ref_count，完全不寫入 storage；否則才上傳到新的 blob 路徑。
+    讀檔、雜湊與上傳都在 storage executor 中執行，資料庫操作則直接在 event loop 上 await。
+
+    blob 的變更不會在這裡 commit：呼叫端接著建立檔案元數據並一起 commit，
+    失敗時應呼叫 discard_stored_content 撤銷引用並刪除這次寫入的物件。
+    必須在 transaction 中寫入其他資料之前呼叫 (並行建立相同 blob 時會 rollback)。
+    """
+    raw.seek(0)
+    if not settings.CONTENT_DEDUP_ENABLED:
+        upload_stream = CountingReader(raw)
+        storage_path = await storage_service.upload_file(
+            file_content=upload_stream,
+            destination_path=build_storage_path(owner_id, filename),
+            content_type=content_type
+        )
+        return StoredContent(storage_path=storage_path, size=upload_stream.bytes_read)
+
+    sha256, size = await storage_service.run(_hash_content, raw)
+
+    existing_blob = await crud_content_blob.acquire_existing_blob(db, sha256)
+    if existing_blob is not None:
+        logger.info(f"Deduplicated upload of {size} bytes for user {owner_id} onto blob {existing_blob.id}")
+        return StoredContent(
+            storage_path=existing_blob.storage_path, size=existing_blob.size, blob_id=existing_blob.id, uploaded=False
+        )
+
+    raw.seek(0)
+    storage_path = await storage_service.upload_file(
+        file_content=CountingReader(raw),
+        destination_path=build_blob_storage_path(sha256),
+        content_type=content_type
+    )
+    blob = await crud_content_blob.create_blob(db, sha256=sha256, storage_path=storage_path, size=size)
+    if blob.storage_path != storage_path:
+        # 並行上傳相同內容的請求搶先建立了 blob，改為引用它；剛寫入的物件沒有任何紀錄引用
+        await _delete_unreferenced_object(storage_service, storage_path)
+        return StoredContent(storage_path=blob.storage_path, size=blob.size, blob_id=blob.id, uploaded=False)
+    return StoredContent(storage_path=blob.storage_path, size=blob.size, blob_id=blob.id)
+
+
+async def _delete_unreferenced_object(storage_service: AsyncStorage, storage_path: str) -> None:
+    try:
+        await storage_service.delete_file(storage_path=storage_path)
+    except IOError as e:
+        logger.error(f"Could not delete unreferenced object {storage_path}: {e}")
+
+
+async def discard_stored_content(db: AsyncSession, storage_service: AsyncStorage, stored_content: StoredContent) -> None:
+    """
+    store_content 之後建立檔案元數據失敗時呼叫：rollback 撤銷 blob 引用數的增加 (或新建立的 blob 紀錄)，
+    並刪除這次寫入的 storage 物件。
+    """
+    await db.rollback()
+    if stored_content.uploaded:
+        await _delete_unreferenced_object(storage_service, stored_content.storage_path)
+
+
+async def delete_stored_file(db: AsyncSession, storage_service: AsyncStorage, file_meta: FileMetadata) -> None:
+    """
+    刪除檔案元數據與其 storage 物件。
+    共用 blob 的檔案只有在最後一個引用被刪除時才刪除 storage 物件。
+    """
+    if file_meta.blob_id is None:
+        await storage_service.delete_file(storage_path=file_meta.storage_path)
+        await crud_file.delete_file_metadata(db, file_id=file_meta.id)
+        return
+
+    storage_path_to_delete = await crud_content_blob.delete_file_metadata_and_release_blob(db, file_meta)
+    if storage_path_to_delete:
+        # 元數據與 blob 紀錄已刪除；每個 blob 紀錄的路徑都不同，之後上傳相同內容會寫入新的路徑，
+        # 刪除這個物件不會影響新的 blob。失敗時只會留下無人引用的物件，不影響使用者
+        await _delete_unreferenced_object(storage_service, storage_path_to_delete)
@@ -1,17 +1,21 @@
 # backend/app/services/gcs_service.py
 import os
 from google.cloud import storage
-from google.api_core.exceptions import GoogleAPICallError
-from typing import IO, Optional, Any
+from google.api_core.exceptions import GoogleAPICallError, NotFound
+from typing import IO, Optional, Any, Iterator, List
 import logging
 from urllib.parse import quote
 import datetime
+import requests
 
 from app.core.config import settings
-from .storage_interface import StorageInterface
+from .storage_interface import DEFAULT_READ_CHUNK_SIZE, StorageInterface, StorageObjectChanged, StorageObjectInfo
+from .storage_metrics import instrumented
 
 logger = logging.getLogger(__name__)
 
+_GCS_CHUNK_ALIGNMENT = 256 * 1024 # GCS resumable upload 的區塊大小必須是 256 KB 的倍數
+
 class GCSService(StorageInterface):
     def __init__(self):
         try:
@@ -31,6 +35,7 @@ class GCSService(StorageInterface):
             logger.error(f"Error initializing GCSService: {e}")
             raise
 
+    @instrumented("gcs", "upload")
     def upload_file(
         self, file_content: IO[Any], destination_path: str, content_type: Optional[str] = None
     ) -> str:
@@ -38,6 +43,12 @@ class GCSService(StorageInterface):
         try:
             # GCS 中的物件被稱為 Blob (二進位大型物件)
             blob = self.bucket.blob(destination_path)
+            # 使用 resumable upload 並限制每個區塊的大小 (需為 256 KB 的倍數)，
+            # 避免 client library 以預設的 100 MB 區塊緩衝整個上傳
+            blob.chunk_size = max(
+                _GCS_CHUNK_ALIGNMENT,
+                settings.UPLOAD_CHUNK_SIZE_BYTES // _GCS_CHUNK_ALIGNMENT * _GCS_CHUNK_ALIGNMENT,
+            )
             
             # 將檔案指標移至開頭，確保能完整讀取
             file_content.seek(0)
@@ -52,21 +63,27 @@ class GCSService(StorageInterface):
             logger.error(f"An unexpected error occurred during GCS upload: {e}")
             raise
 
+    @instrumented("gcs", "delete")
     def delete_file(self, storage_path: str) -> None:
         """從 GCS 刪除檔案."""
         try:
             blob = self.bucket.blob(storage_path)
             blob.delete()
             logger.info(f"Successfully deleted from GCS: {self.bucket_name}/{storage_path}")
+        except NotFound:
+            # 與 S3 的 delete_object 行為一致：物件不存在時視為已刪除
+            logger.warning(f"GCS object {self.bucket_name}/{storage_path} not found, nothing to delete.")
         except GoogleAPICallError as e:
             logger.error(f"Failed to delete {storage_path} from GCS: {e}")
             raise IOError(f"GCS delete failed: {e}")
 
+    @instrumented("gcs", "presign")
     def generate_presigned_url(
         self, storage_path: str,
         expiration_seconds: int,
         http_method: str = "GET",
-        download_filename: Optional[str] = None
+        download_filename: Optional[str] = None,
+        content_type: Optional[str] = None
     ) -> Optional[str]:
         """產生 GCS 的預先簽署 URL."""
         if http_method.upper() not in ["GET", "PUT", "POST", "DELETE"]:
@@ -90,6 +107,7 @@ class GCSService(StorageInterface):
                 expiration=datetime.timedelta(seconds=expiration_seconds),
                 method=http_method.upper(),
                 response_disposition=disposition, # 用於下載時的檔名
+                content_type=content_type if http_method.upper() == "PUT" else None,
             )
             return url
         except GoogleAPICallError as e:
@@ -97,4 +115,112 @@ class GCSService(StorageInterface):
             return None
         except Exception as e:
             logger.error(f"An unexpected error occurred generating signed URL: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    @instrumented("gcs", "stat")
+    def get_file_info(self, storage_path: str) -> Optional[StorageObjectInfo]:
+        """取得 GCS 物件的 metadata；物件不存在時回傳 None."""
+        try:
+            blob = self.bucket.get_blob(storage_path)
+        except GoogleAPICallError as e:
+            logger.error(f"Failed to get metadata for {storage_path} from GCS: {e}")
+            raise IOError(f"GCS head failed: {e}")
+        if blob is None:
+            return None
+        return StorageObjectInfo(
+            size=blob.size,
+            content_type=blob.content_type,
+            etag=blob.etag,
+            last_modified=blob.updated,
+        )
+
+    @instrumented("gcs", "read")
+    def open_range(
+        self, storage_path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        etag: Optional[str] = None,
+    ) -> Iterator[bytes]:
+        """先取得物件的 metadata (大小與 generation)，之後每個區塊以一個 ranged GET 下載。"""
+        try:
+            blob = self.bucket.get_blob(storage_path)
+        except GoogleAPICallError as e:
+            logger.error(f"Failed to get metadata for {storage_path} from GCS: {e}")
+            raise IOError(f"GCS get failed: {e}")
+        if blob is None:
+            raise FileNotFoundError(f"GCS object {storage_path} not found")
+        if etag and blob.etag != etag:
+            raise StorageObjectChanged(f"GCS object {storage_path} no longer matches ETag {etag}")
+        last = blob.size - 1 if end is None else min(end, blob.size - 1)
+        return self._iter_blob_range(blob, start, last, chunk_size)
+
+    def _iter_blob_range(self, blob: Any, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+        position = start
+        while position <= end:
+            try:
+                # 以 generation 固定版本：讀取期間物件被覆寫時中斷，而不是混合兩個版本的內容；
+                # raw_download 讓 gzip 物件的位元組位置與儲存的大小一致
+                data = blob.download_as_bytes(
+                    start=position,
+                    end=min(position + chunk_size, end + 1) - 1,
+                    raw_download=True,
+                    if_generation_match=blob.generation,
+                )
+            except GoogleAPICallError as e:
+                logger.error(f"Failed to read {blob.name} from GCS at offset {position}: {e}")
+                raise IOError(f"GCS read failed: {e}")
+            if not data:
+                break
+            position += len(data)
+            yield data
+
+    # --- GCS 沒有 S3 的 multipart API，改用 resumable upload session 實作 ---
+    # session URI 本身就是上傳授權，/parts 對每個 part 編號都回傳同一個 URI。客戶端必須：
+    # - 依序上傳，前一段成功 (GCS 回應 308) 後才送出下一段，不能平行上傳；
+    # - 每段帶 Content-Range: bytes {start}-{end}/*，最後一段為 bytes {start}-{end}/{總大小}；
+    # - 除最後一段外，每段大小必須是 256 KiB 的倍數；
+    # - 最後一段完成 (GCS 回應 200/201) 後呼叫 /complete，parts 可以留空。
+    # 中斷時可對 URI 發出 PUT (Content-Range: bytes */*) 查詢已收到的位元組 (Range 標頭) 後繼續。
+
+    MULTIPART_PROTOCOL = "gcs-resumable"
+    MULTIPART_SEQUENTIAL = True
+    MULTIPART_PART_ALIGNMENT = 256 * 1024
+
+    @instrumented("gcs", "create_multipart")
+    def create_multipart_upload(self, storage_path: str, content_type: Optional[str] = None) -> str:
+        """建立 resumable upload session，回傳 session URI 作為上傳識別碼."""
+        try:
+            blob = self.bucket.blob(storage_path)
+            session_uri = blob.create_resumable_upload_session(
+                content_type=content_type,
+                origin=settings.GCS_UPLOAD_ORIGIN, # 瀏覽器直接上傳時 session 必須綁定前端的 origin (CORS)
+            )
+            logger.info(f"Created GCS resumable upload session for {self.bucket_name}/{storage_path}")
+            return session_uri
+        except GoogleAPICallError as e:
+            logger.error(f"Failed to create resumable upload session for {storage_path}: {e}")
+            raise IOError(f"GCS create resumable session failed: {e}")
+
+    @instrumented("gcs", "presign_part")
+    def generate_presigned_part_url(
+        self, storage_path: str, upload_id: str, part_number: int, expiration_seconds: int
+    ) -> Optional[str]:
+        """GCS resumable session 的所有區段都上傳到同一個 session URI."""
+        return upload_id
+
+    @instrumented("gcs", "complete_multipart")
+    def complete_multipart_upload(self, storage_path: str, upload_id: str, parts: List[dict]) -> None:
+        """最後一段上傳後 GCS 會自動完成物件，這裡只確認物件已存在."""
+        if self.get_file_info(storage_path) is None:
+            raise IOError(f"GCS resumable upload for {storage_path} has not been finalized.")
+
+    @instrumented("gcs", "abort_multipart")
+    def abort_multipart_upload(self, storage_path: str, upload_id: str) -> None:
+        """對 session URI 發出 DELETE 以取消 resumable upload (GCS 回應 499)."""
+        try:
+            response = requests.delete(upload_id, timeout=30)
+        except requests.RequestException as e:
+            logger.error(f"Failed to cancel GCS resumable upload for {storage_path}: {e}")
+            raise IOError(f"GCS cancel resumable session failed: {e}")
+        if response.status_code not in (200, 204, 404, 410, 499):
+            logger.error(f"Unexpected status {response.status_code} cancelling GCS upload for {storage_path}")
+            raise IOError(f"GCS cancel resumable session failed with status {response.status_code}")
+        logger.info(f"Cancelled GCS resumable upload session for {self.bucket_name}/{storage_path}")
@@ -0,0 +1,109 @@
+# backend/app/services/health.py
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine, read_engine
+from app.dependencies import get_async_storage_service, get_storage_executor, get_storage_service
+
+logger = logging.getLogger(__name__)
+
+
+async def check_database(db_engine=engine) -> None:
+    async with db_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def check_read_database() -> None:
+    await check_database(read_engine)
+
+
+async def check_storage() -> None:
+    try:
+        # 第一次呼叫時會建立 storage client (阻塞式)，在 storage executor 中執行
+        await asyncio.get_running_loop().run_in_executor(get_storage_executor(), get_storage_service)
+    except HTTPException as e:
+        raise IOError(e.detail)
+    await get_async_storage_service().probe()
+
+
+class CachedProbe:
+    """
+    快取探測結果 ttl 秒。並行的呼叫共用同一次探測 (以 lock 合併)，
+    load balancer 頻繁輪詢 /health?deep=1 時，資料庫與 bucket 每 ttl 秒最多只被探測一次。
+    """
+
+    def __init__(self, name: str, check: Callable[[], Awaitable[None]], ttl: float, timeout: float):
+        self.name = name
+        self._check = check
+        self.ttl = ttl
+        self.timeout = timeout
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < self.ttl
+
+    async def run(self) -> dict:
+        if self._fresh():
+            return self._result
+        async with self._lock:
+            if self._fresh(): # 等待 lock 期間其他請求已完成探測
+                return self._result
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._check(), timeout=self.timeout)
+                result = {"status": "ok"}
+            except asyncio.TimeoutError:
+                result = {"status": "error", "error": f"timed out after {self.timeout:g}s"}
+            except Exception as e:
+                result = {"status": "error", "error": str(e)}
+            result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            if result["status"] != "ok":
+                logger.warning(f"Health probe '{self.name}' failed: {result['error']}")
+            self._result = result
+            self._checked_at = time.monotonic()
+            return result
+
+
+HEALTH_PROBES = [
+    CachedProbe("database", check_database, settings.HEALTH_CHECK_CACHE_SECONDS, settings.HEALTH_CHECK_TIMEOUT_SECONDS),
+    CachedProbe("storage", check_storage, settings.HEALTH_CHECK_CACHE_SECONDS, settings.HEALTH_CHECK_TIMEOUT_SECONDS),
+]
+if read_engine is not engine:
+    HEALTH_PROBES.insert(1, CachedProbe(
+        "database_read", check_read_database, settings.HEALTH_CHECK_CACHE_SECONDS, settings.HEALTH_CHECK_TIMEOUT_SECONDS
+    ))
+
+
+async def run_deep_health_check() -> Dict[str, dict]:
+    """並行執行所有探測 (或取用快取的結果)，返回 {探測名稱: 結果}。"""
+    results = await asyncio.gather(*(probe.run() for probe in HEALTH_PROBES))
+    return {probe.name: result for probe, result in zip(HEALTH_PROBES, results)}
+
+
+async def warm_up() -> None:
+    """
+    啟動時預先建立資料庫連線與 storage client，部署後的第一批請求不必等待連線與 client 的初始化。
+    失敗只記錄警告，不阻止啟動 (狀態由 /health?deep=1 回報)。
+    """
+    started = time.perf_counter()
+    engines = [("database", engine)] + ([("database_read", read_engine)] if read_engine is not engine else [])
+    checks = []
+    for name, db_engine in engines:
+        pool_size = getattr(db_engine.pool, "size", lambda: 1)()
+        connections = max(1, min(settings.STARTUP_WARMUP_DB_CONNECTIONS, pool_size))
+        # 同時持有多個連線，連線池才會真的建立多條連線 (依序開關只會重複使用同一條)
+        checks.extend((name, check_database(db_engine)) for _ in range(connections))
+    checks.append(("storage", check_storage()))
+    results = await asyncio.gather(*(check for _, check in checks), return_exceptions=True)
+    for (name, _), result in zip(checks, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Warm-up of {name} failed: {result}")
+    logger.info(f"Warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms.")
@@ -0,0 +1,219 @@
+# backend/app/services/local_storage_service.py
+import asyncio
+import datetime
+import logging
+import mimetypes
+import mmap
+import os
+import uuid
+from typing import IO, Any, AsyncIterator, Iterable, Iterator, Optional
+from urllib.parse import quote
+
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from .storage_interface import DEFAULT_READ_CHUNK_SIZE, StorageInterface, StorageObjectChanged, StorageObjectInfo
+
+logger = logging.getLogger(__name__)
+
+# 簽署本機 storage URL 的 JWT audience，避免與 access token 互相冒用
+LOCAL_STORAGE_TOKEN_AUDIENCE = "local-storage"
+
+
+def _iter_mapped(f: IO[bytes], start: int, end: Optional[int], chunk_size: int) -> Iterator[bytes]:
+    """
+    以 mmap 逐塊讀取第 start 到 end 個位元組 (None 表示讀到結尾)，結束時解除映射並關閉檔案。
+    每塊直接從 page cache 複製到回應用的 bytes，不需要每塊一次 read() 系統呼叫；
+    MADV_SEQUENTIAL 讓 kernel 積極預讀、讀過的頁面優先回收。
+    """
+    try:
+        size = os.fstat(f.fileno()).st_size
+        last = size - 1 if end is None else min(end, size - 1)
+        if start > last: # 空檔案無法 mmap
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            position = start
+            while position <= last:
+                next_position = min(position + chunk_size, last + 1)
+                yield mapped[position:next_position]
+                position = next_position
+    finally:
+        f.close()
+
+
+def _stat_etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+class LocalStorageService(StorageInterface):
+    """
+    單節點 / edge 部署用的本機檔案系統 storage。
+
+    - 寫入：以固定大小的區塊串流寫入同目錄下的暫存檔，依 LOCAL_STORAGE_FSYNC 決定是否 fsync，
+      最後以 os.replace 原子地換上，讀取端永遠不會看到寫到一半的檔案。
+    - 下載/上傳 URL：以 JWT 簽署的 URL 指向 /api/v1/storage/local/{token}，
+      下載以 mmap 逐塊讀取並串流 (支援 HTTP Range 與條件式請求)。
+    """
+
+    def __init__(self):
+        self.root = os.path.abspath(settings.LOCAL_STORAGE_ROOT)
+        if settings.LOCAL_STORAGE_FSYNC not in ("always", "never"):
+            raise ValueError(f"Unsupported LOCAL_STORAGE_FSYNC policy: '{settings.LOCAL_STORAGE_FSYNC}'")
+        os.makedirs(self.root, exist_ok=True)
+        logger.info(f"Using local storage at {self.root}")
+
+    def resolve_path(self, storage_path: str) -> str:
+        """把 storage path 轉為 root 之下的絕對路徑，拒絕跳出 root 的路徑 (path traversal)。"""
+        full_path = os.path.abspath(os.path.join(self.root, storage_path))
+        if os.path.commonpath([self.root, full_path]) != self.root or full_path == self.root:
+            raise ValueError(f"Invalid storage path: '{storage_path}'")
+        return full_path
+
+    # --- 寫入 ---
+
+    def _open_temp(self, storage_path: str) -> tuple[str, str, IO[bytes]]:
+        full_path = self.resolve_path(storage_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        temp_path = f"{full_path}.{uuid.uuid4().hex}.tmp"
+        return full_path, temp_path, open(temp_path, "wb")
+
+    def _commit_temp(self, full_path: str, temp_path: str, temp_file: IO[bytes]) -> None:
+        temp_file.flush()
+        if settings.LOCAL_STORAGE_FSYNC == "always":
+            os.fsync(temp_file.fileno())
+        temp_file.close()
+        os.replace(temp_path, full_path)
+        if settings.LOCAL_STORAGE_FSYNC == "always":
+            # fsync 目錄，讓 rename 本身也能在斷電後保留
+            dir_fd = os.open(os.path.dirname(full_path), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _discard_temp(self, temp_path: str, temp_file: IO[bytes]) -> None:
+        temp_file.close()
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+    def write_chunks(self, storage_path: str, chunks: Iterable[bytes]) -> int:
+        """將區塊依序寫入 storage_path，返回寫入的位元組數。"""
+        full_path, temp_path, temp_file = self._open_temp(storage_path)
+        written = 0
+        try:
+            for chunk in chunks:
+                temp_file.write(chunk)
+                written += len(chunk)
+            self._commit_temp(full_path, temp_path, temp_file)
+        except BaseException:
+            self._discard_temp(temp_path, temp_file)
+            raise
+        return written
+
+    async def write_stream(self, storage_path: str, chunks: AsyncIterator[bytes]) -> int:
+        """
+        write_chunks 的 async 版本，用於直接串流寫入 HTTP 請求本體。
+        寫入 page cache 很快，但 fsync 可能要數十毫秒，因此提交的步驟在 thread 中執行。
+        """
+        full_path, temp_path, temp_file = self._open_temp(storage_path)
+        written = 0
+        try:
+            async for chunk in chunks:
+                temp_file.write(chunk)
+                written += len(chunk)
+            await asyncio.to_thread(self._commit_temp, full_path, temp_path, temp_file)
+        except BaseException:
+            self._discard_temp(temp_path, temp_file)
+            raise
+        return written
+
+    def upload_file(
+        self, file_content: IO[Any], destination_path: str, content_type: Optional[str] = None
+    ) -> str:
+        chunk_size = settings.UPLOAD_CHUNK_SIZE_BYTES
+        try:
+            self.write_chunks(destination_path, iter(lambda: file_content.read(chunk_size), b""))
+        except OSError as e:
+            logger.error(f"Failed to write local file {destination_path}: {e}")
+            raise IOError(f"Local storage upload failed: {e}")
+        logger.info(f"Successfully stored locally: {destination_path}")
+        return destination_path
+
+    def delete_file(self, storage_path: str) -> None:
+        try:
+            os.remove(self.resolve_path(storage_path))
+            logger.info(f"Successfully deleted local file: {storage_path}")
+        except FileNotFoundError:
+            logger.warning(f"Local file {storage_path} not found, nothing to delete.")
+        except OSError as e:
+            logger.error(f"Failed to delete local file {storage_path}: {e}")
+            raise IOError(f"Local storage delete failed: {e}")
+
+    def probe(self) -> None:
+        if not os.path.isdir(self.root) or not os.access(self.root, os.W_OK):
+            raise IOError(f"Local storage root {self.root} is not a writable directory")
+
+    def get_file_info(self, storage_path: str) -> Optional[StorageObjectInfo]:
+        try:
+            stat_result = os.stat(self.resolve_path(storage_path))
+        except FileNotFoundError:
+            return None
+        return StorageObjectInfo(
+            size=stat_result.st_size,
+            content_type=mimetypes.guess_type(storage_path)[0],
+            etag=_stat_etag(stat_result),
+            last_modified=datetime.datetime.fromtimestamp(stat_result.st_mtime, tz=datetime.timezone.utc),
+        )
+
+    def open_range(
+        self, storage_path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        etag: Optional[str] = None,
+    ) -> Iterator[bytes]:
+        # 檔案以 os.replace 原子地換上 (不會在原地被截斷)，已開啟的 file descriptor 與映射
+        # 在讀取期間一直指向同一個版本。在這裡開啟，檔案不存在時立即拋出 FileNotFoundError
+        f = open(self.resolve_path(storage_path), "rb")
+        if etag and _stat_etag(os.fstat(f.fileno())) != etag:
+            f.close()
+            raise StorageObjectChanged(f"Local file {storage_path} no longer matches ETag {etag}")
+        return _iter_mapped(f, start, end, chunk_size)
+
+    # --- 簽署 URL ---
+
+    def generate_presigned_url(
+        self, storage_path: str,
+        expiration_seconds: int,
+        http_method: str = "GET",
+        download_filename: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Optional[str]:
+        if http_method.upper() not in ("GET", "PUT"):
+            logger.error(f"Unsupported http_method '{http_method}' for local storage URL.")
+            return None
+        claims = {
+            "aud": LOCAL_STORAGE_TOKEN_AUDIENCE,
+            "path": storage_path,
+            "method": http_method.upper(),
+            "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expiration_seconds),
+        }
+        if download_filename:
+            claims["filename"] = download_filename
+        if content_type:
+            claims["content_type"] = content_type
+        token = jwt.encode(claims, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM)
+        return f"{settings.LOCAL_STORAGE_BASE_URL.rstrip('/')}/api/v1/storage/local/{quote(token)}"
+
+    def verify_signed_token(self, token: str, http_method: str) -> Optional[dict]:
+        """驗證簽署的 URL token；token 無效、過期或方法不符時回傳 None。"""
+        try:
+            claims = jwt.decode(
+                token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM], audience=LOCAL_STORAGE_TOKEN_AUDIENCE
+            )
+        except JWTError:
+            return None
+        if claims.get("method") != http_method.upper() or not claims.get("path"):
+            return None
+        return claims
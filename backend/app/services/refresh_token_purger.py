@@ -0,0 +1,69 @@
+# backend/app/services/refresh_token_purger.py
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+from app.crud import refresh_token as crud_refresh_token
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+refresh_tokens_purged = Counter("refresh_tokens_purged", "Expired or long-revoked refresh tokens deleted by the purger")
+refresh_token_purge_batches = Counter("refresh_token_purge_batches", "Delete batches executed by the refresh token purger")
+refresh_token_purge_batch_seconds = Histogram(
+    "refresh_token_purge_batch_seconds", "Duration of each refresh token purge batch"
+)
+
+
+async def purge_stale_refresh_tokens(
+    batch_size: int,
+    pause_seconds: float,
+    revoked_retention: timedelta,
+    session_factory=SessionLocal,
+) -> int:
+    """
+    分批刪除已過期與撤銷超過 revoked_retention 的 Refresh Tokens，返回刪除的總數。
+    每批使用新的 session 並立即 commit，批次之間暫停 pause_seconds，
+    避免長時間的 transaction 鎖住登入與 refresh 都會寫入的 refresh_tokens 資料表。
+    """
+    now = datetime.utcnow()
+    total = 0
+    while True:
+        started = time.perf_counter()
+        async with session_factory() as db:
+            deleted = await crud_refresh_token.delete_stale_refresh_tokens_batch(
+                db, expired_before=now, revoked_before=now - revoked_retention, limit=batch_size
+            )
+        elapsed = time.perf_counter() - started
+        refresh_token_purge_batches.inc()
+        refresh_token_purge_batch_seconds.observe(elapsed)
+        refresh_tokens_purged.inc(deleted)
+        total += deleted
+        logger.debug(f"Refresh token purge batch deleted {deleted} row(s) in {elapsed * 1000:.1f} ms.")
+        if deleted < batch_size:
+            return total
+        await asyncio.sleep(pause_seconds)
+
+
+async def run_refresh_token_purger() -> None:
+    """
+    背景任務：每 REFRESH_TOKEN_PURGE_INTERVAL_SECONDS 秒清除一次過期與撤銷已久的 Refresh Tokens。
+    """
+    while True:
+        try:
+            started = time.perf_counter()
+            purged = await purge_stale_refresh_tokens(
+                batch_size=settings.REFRESH_TOKEN_PURGE_BATCH_SIZE,
+                pause_seconds=settings.REFRESH_TOKEN_PURGE_BATCH_PAUSE_SECONDS,
+                revoked_retention=timedelta(days=settings.REFRESH_TOKEN_REVOKED_RETENTION_DAYS),
+            )
+            if purged:
+                logger.info(
+                    f"Purged {purged} stale refresh token(s) in {time.perf_counter() - started:.1f} s."
+                )
+        except Exception as e:
+            logger.error(f"Refresh token purge failed: {e}", exc_info=True)
+        await asyncio.sleep(settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS)
@@ -1,14 +1,63 @@
 # backend/app/services/s3_service.py
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
-from typing import IO, Optional, Any
+from typing import IO, Optional, Any, Iterator, List
 import logging
+import time
 from urllib.parse import quote
 from app.core.config import settings
-from .storage_interface import StorageInterface
+from .storage_interface import DEFAULT_READ_CHUNK_SIZE, StorageInterface, StorageObjectChanged, StorageObjectInfo
+from .storage_metrics import instrumented
 
 logger = logging.getLogger(__name__)
 
+
+def _iter_body(body: Any, chunk_size: int) -> Iterator[bytes]:
+    """逐塊讀取 get_object 的 StreamingBody，結束 (或提前 close) 時關閉連線。"""
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
+
+
+class PartThroughputReporter:
+    """
+    透過 botocore 的 event hooks 量測 multipart upload 中每個 UploadPart 請求的耗時，
+    並記錄每個 part 的大小與吞吐量 (MB/s)，用來調整 part 大小與並行數。
+    """
+
+    def register(self, s3_client: Any) -> None:
+        s3_client.meta.events.register("before-call.s3.UploadPart", self._before_upload_part)
+        s3_client.meta.events.register("after-call.s3.UploadPart", self._after_upload_part)
+
+    def _before_upload_part(self, params: dict, context: dict, **kwargs: Any) -> None:
+        # before-call 與 after-call 共用同一個 context dict，用它來傳遞開始時間
+        context["part_upload_started_at"] = time.perf_counter()
+        context["part_number"] = params.get("query_string", {}).get("partNumber")
+        try:
+            context["part_size"] = len(params["body"])
+        except (KeyError, TypeError):
+            context["part_size"] = None
+
+    def _after_upload_part(self, http_response: Any, context: dict, **kwargs: Any) -> None:
+        started_at = context.get("part_upload_started_at")
+        if started_at is None:
+            return
+        elapsed = time.perf_counter() - started_at
+        part_size = context.get("part_size")
+        key = context.get("input_params", {}).get("Key")
+        if part_size and elapsed > 0:
+            throughput = part_size / elapsed / (1024 * 1024)
+            logger.info(
+                f"S3 part {context.get('part_number')} of {key}: {part_size} bytes in {elapsed:.3f}s "
+                f"({throughput:.2f} MB/s, HTTP {http_response.status_code})"
+            )
+        else:
+            logger.info(f"S3 part {context.get('part_number')} of {key} finished in {elapsed:.3f}s")
+
+
 class S3Service(StorageInterface):
     def __init__(self):
         try:
@@ -25,7 +74,24 @@ class S3Service(StorageInterface):
             client_kwargs["aws_session_token"] = settings.AWS_SESSION_TOKEN
 
 
+            if settings.S3_MAX_POOL_CONNECTIONS < settings.S3_MAX_CONCURRENCY:
+                logger.warning(
+                    f"S3_MAX_POOL_CONNECTIONS ({settings.S3_MAX_POOL_CONNECTIONS}) is lower than "
+                    f"S3_MAX_CONCURRENCY ({settings.S3_MAX_CONCURRENCY}); part uploads will wait for connections."
+                )
+            client_kwargs["config"] = Config(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS)
+
             self.s3_client = boto3.client("s3", **client_kwargs)
+
+            # multipart upload 的門檻、part 大小與並行數，讓大檔案能用滿對 S3/MinIO 的頻寬
+            self.transfer_config = TransferConfig(
+                multipart_threshold=settings.S3_MULTIPART_THRESHOLD_BYTES,
+                multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE_BYTES,
+                max_concurrency=settings.S3_MAX_CONCURRENCY,
+                use_threads=settings.S3_MAX_CONCURRENCY > 1,
+            )
+            if settings.S3_REPORT_PART_THROUGHPUT:
+                PartThroughputReporter().register(self.s3_client)
             
             self.bucket_name = settings.S3_BUCKET_NAME
             if not self.bucket_name:
@@ -38,6 +104,7 @@ class S3Service(StorageInterface):
             logger.error(f"Error initializing S3Service: {e}")
             raise
 
+    @instrumented("s3", "upload")
     def upload_file(
         self, file_content: IO[Any], destination_path: str, content_type: Optional[str] = None
     ) -> str:
@@ -57,7 +124,8 @@ class S3Service(StorageInterface):
                 file_content,
                 self.bucket_name,
                 destination_path,
-                ExtraArgs=extra_args
+                ExtraArgs=extra_args,
+                Config=self.transfer_config
             )
             logger.info(f"Successfully uploaded to S3: {self.bucket_name}/{destination_path}")
             return destination_path
@@ -68,6 +136,7 @@ class S3Service(StorageInterface):
             logger.error(f"An unexpected error occurred during S3 upload: {e}")
             raise
 
+    @instrumented("s3", "delete")
     def delete_file(self, storage_path: str) -> None:
         if not self.s3_client or not self.bucket_name:
             logger.error("S3 client or bucket name not initialized properly.")
@@ -79,11 +148,13 @@ class S3Service(StorageInterface):
             logger.error(f"Failed to delete {storage_path} from S3: {e}")
             raise IOError(f"S3 delete failed: {e}")
 
+    @instrumented("s3", "presign")
     def generate_presigned_url(
         self, storage_path: str,
         expiration_seconds: int,
         http_method: str = "GET",
-        download_filename: Optional[str] = None
+        download_filename: Optional[str] = None,
+        content_type: Optional[str] = None
     ) -> Optional[str]:
         if not self.s3_client or not self.bucket_name:
             logger.error("S3 client or bucket name not initialized properly.")
@@ -113,6 +184,10 @@ class S3Service(StorageInterface):
                 disposition = f"attachment; filename*=UTF-8''{encoded_filename}"
 
             params["ResponseContentDisposition"] = disposition
+
+        if http_method.upper() == "PUT" and content_type:
+            # 簽入 Content-Type，客戶端 PUT 時必須帶相同的標頭
+            params["ContentType"] = content_type
         
         try:
             url = self.s3_client.generate_presigned_url(
@@ -122,14 +197,147 @@ class S3Service(StorageInterface):
                 HttpMethod=http_method.upper()
             )
             
-            if settings.MINIO_ENDPOINT_URL and settings.MINIO_SERVER_URL:
-                # 如果是 MinIO，則需要將 URL 的域名部分替換為 MinIO 的服務器 URL
-                url = url.replace(settings.MINIO_ENDPOINT_URL, settings.MINIO_SERVER_URL)
-            
-            return url
+            return self._to_public_url(url)
         except ClientError as e:
             logger.error(f"Failed to generate S3 presigned URL for {storage_path}: {e}")
             return None
         except Exception as e:
             logger.error(f"An unexpected error occurred generating presigned URL: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    @instrumented("s3", "probe")
+    def probe(self) -> None:
+        """以 HEAD Bucket 確認 bucket 存在且 credentials 有效。"""
+        try:
+            self.s3_client.head_bucket(Bucket=self.bucket_name)
+        except ClientError as e:
+            raise IOError(f"S3 bucket {self.bucket_name} is not accessible: {e}")
+
+    def _to_public_url(self, url: str) -> str:
+        if settings.MINIO_ENDPOINT_URL and settings.MINIO_SERVER_URL:
+            # 如果是 MinIO，則需要將 URL 的域名部分替換為 MinIO 的服務器 URL
+            url = url.replace(settings.MINIO_ENDPOINT_URL, settings.MINIO_SERVER_URL)
+        return url
+
+    @instrumented("s3", "stat")
+    def get_file_info(self, storage_path: str) -> Optional[StorageObjectInfo]:
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client or bucket name not initialized properly.")
+            raise ConnectionError("S3 client not initialized.")
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=storage_path)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            logger.error(f"Failed to HEAD {storage_path} on S3: {e}")
+            raise IOError(f"S3 head failed: {e}")
+        return StorageObjectInfo(
+            size=response["ContentLength"],
+            content_type=response.get("ContentType"),
+            etag=response.get("ETag"),
+            last_modified=response.get("LastModified"),
+        )
+
+    @instrumented("s3", "read")
+    def open_range(
+        self, storage_path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        etag: Optional[str] = None,
+    ) -> Iterator[bytes]:
+        """以帶 Range 的 GetObject 讀取，S3 只傳送需要的位元組 (量測的延遲到收到回應標頭為止)。"""
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client or bucket name not initialized properly.")
+            raise ConnectionError("S3 client not initialized.")
+        params = {"Bucket": self.bucket_name, "Key": storage_path}
+        if start > 0 or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end}"
+        if etag:
+            params["IfMatch"] = etag
+        try:
+            response = self.s3_client.get_object(**params)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(f"S3 object {storage_path} not found")
+            if code in ("412", "PreconditionFailed"):
+                raise StorageObjectChanged(f"S3 object {storage_path} no longer matches ETag {etag}")
+            logger.error(f"Failed to GET {storage_path} from S3: {e}")
+            raise IOError(f"S3 get failed: {e}")
+        return _iter_body(response["Body"], chunk_size)
+
+    @instrumented("s3", "create_multipart")
+    def create_multipart_upload(self, storage_path: str, content_type: Optional[str] = None) -> str:
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client or bucket name not initialized properly.")
+            raise ConnectionError("S3 client not initialized.")
+        params = {"Bucket": self.bucket_name, "Key": storage_path}
+        if not settings.MINIO_ENDPOINT_URL:
+            params["ServerSideEncryption"] = "AES256"
+        if content_type:
+            params["ContentType"] = content_type
+        try:
+            response = self.s3_client.create_multipart_upload(**params)
+        except ClientError as e:
+            logger.error(f"Failed to create multipart upload for {storage_path} on S3: {e}")
+            raise IOError(f"S3 create multipart upload failed: {e}")
+        logger.info(f"Created S3 multipart upload for {self.bucket_name}/{storage_path}")
+        return response["UploadId"]
+
+    @instrumented("s3", "presign_part")
+    def generate_presigned_part_url(
+        self, storage_path: str, upload_id: str, part_number: int, expiration_seconds: int
+    ) -> Optional[str]:
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client or bucket name not initialized properly.")
+            return None
+        try:
+            url = self.s3_client.generate_presigned_url(
+                ClientMethod="upload_part",
+                Params={
+                    "Bucket": self.bucket_name,
+                    "Key": storage_path,
+                    "UploadId": upload_id,
+                    "PartNumber": part_number,
+                },
+                ExpiresIn=expiration_seconds,
+                HttpMethod="PUT"
+            )
+            return self._to_public_url(url)
+        except ClientError as e:
+            logger.error(f"Failed to generate presigned URL for part {part_number} of {storage_path}: {e}")
+            return None
+
+    @instrumented("s3", "complete_multipart")
+    def complete_multipart_upload(self, storage_path: str, upload_id: str, parts: List[dict]) -> None:
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client or bucket name not initialized properly.")
+            raise ConnectionError("S3 client not initialized.")
+        multipart_parts = [
+            {"PartNumber": part["part_number"], "ETag": part["etag"]}
+            for part in sorted(parts, key=lambda part: part["part_number"])
+        ]
+        try:
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=storage_path,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": multipart_parts}
+            )
+            logger.info(f"Completed S3 multipart upload for {self.bucket_name}/{storage_path} ({len(multipart_parts)} parts)")
+        except ClientError as e:
+            logger.error(f"Failed to complete multipart upload for {storage_path} on S3: {e}")
+            raise IOError(f"S3 complete multipart upload failed: {e}")
+
+    @instrumented("s3", "abort_multipart")
+    def abort_multipart_upload(self, storage_path: str, upload_id: str) -> None:
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client or bucket name not initialized properly.")
+            raise ConnectionError("S3 client not initialized.")
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=storage_path, UploadId=upload_id)
+            logger.info(f"Aborted S3 multipart upload for {self.bucket_name}/{storage_path}")
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchUpload"):
+                logger.warning(f"S3 multipart upload for {storage_path} no longer exists, nothing to abort.")
+                return
+            logger.error(f"Failed to abort multipart upload for {storage_path} on S3: {e}")
+            raise IOError(f"S3 abort multipart upload failed: {e}")
@@ -1,6 +1,25 @@
 # backend/app/services/storage_interface.py
 from abc import ABC, abstractmethod
-from typing import IO, Optional, Any # IO for file-like objects, Any for file_content
+from dataclasses import dataclass
+from datetime import datetime
+from typing import IO, Optional, Any, Iterator, List # IO for file-like objects, Any for file_content
+
+HEALTH_PROBE_PATH = ".health-probe" # probe() 預設對這個 (通常不存在的) 物件發出 HEAD
+DEFAULT_READ_CHUNK_SIZE = 1024 * 1024 # open_range 每次返回的最大位元組數
+
+
+class StorageObjectChanged(IOError):
+    """open_range 指定的 etag 與物件目前的 ETag 不同 (物件在記錄 ETag 之後被覆寫)。"""
+
+
+@dataclass
+class StorageObjectInfo:
+    """storage 中某個物件的基本資訊 (HEAD 請求的結果)。"""
+    size: int
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
 
 class StorageInterface(ABC):
     @abstractmethod
@@ -19,8 +38,62 @@ class StorageInterface(ABC):
         storage_path: str,
         expiration_seconds: int,
         http_method: str = "GET",
-        download_filename: Optional[str] = None
+        download_filename: Optional[str] = None,
+        content_type: Optional[str] = None # 僅用於 PUT：簽入 URL 的 Content-Type
     ) -> Optional[str]:
         pass
 
+    @abstractmethod
+    def get_file_info(self, storage_path: str) -> Optional[StorageObjectInfo]:
+        """對物件發出 HEAD 請求；物件不存在時回傳 None。"""
+        pass
+
+    def probe(self) -> None:
+        """
+        確認 backend 可以連線且有存取權限 (deep health check 使用)，無法使用時拋出例外。
+        預設對 HEALTH_PROBE_PATH 發出 HEAD：物件不存在也代表 bucket 可以存取。
+        """
+        self.get_file_info(HEALTH_PROBE_PATH)
+
+    def open_range(
+        self, storage_path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        etag: Optional[str] = None,
+    ) -> Iterator[bytes]:
+        """
+        串流讀取物件第 start 到 end 個位元組 (含兩端；end 為 None 表示讀到結尾)，每塊最多 chunk_size 位元組。
+        物件在呼叫時就開啟：不存在時直接拋出 FileNotFoundError，其他錯誤拋出 IOError，
+        呼叫端可以在送出 response 標頭之前處理。返回的 iterator 不再需要時應呼叫 close() 釋放連線。
+        指定 etag (get_file_info 返回的值) 時，物件目前的 ETag 不同就拋出 StorageObjectChanged，
+        不會把新內容當成舊的 ETag / 大小送出。
+        """
+        raise NotImplementedError("Streaming reads are not supported by this storage provider.")
+
+    # --- Multipart (分段) 上傳：客戶端直接把各個 part 上傳到 bucket ---
+    # 不支援的 backend 維持預設實作，由 API 層轉換為 501 Not Implemented
+
+    # 客戶端上傳 part 的方式，隨 MultipartUploadCreateResponse 回傳：
+    # "s3-parts"       每個 part 有各自的 URL，可以平行上傳，完成時提交各 part 的 ETag
+    # "gcs-resumable"  所有 part 上傳到同一個 session URI，必須依序上傳並帶 Content-Range (見 GCSService)
+    MULTIPART_PROTOCOL = "s3-parts"
+    MULTIPART_SEQUENTIAL = False
+    MULTIPART_PART_ALIGNMENT = 1 # 除了最後一個 part，part 大小必須是此值的倍數
+
+    def create_multipart_upload(self, storage_path: str, content_type: Optional[str] = None) -> str:
+        """開始一個 multipart 上傳，回傳 backend 的上傳識別碼 (S3 UploadId / GCS resumable session URI)。"""
+        raise NotImplementedError("Multipart uploads are not supported by this storage provider.")
+
+    def generate_presigned_part_url(
+        self, storage_path: str, upload_id: str, part_number: int, expiration_seconds: int
+    ) -> Optional[str]:
+        """產生上傳單一 part 用的 URL。"""
+        raise NotImplementedError("Multipart uploads are not supported by this storage provider.")
+
+    def complete_multipart_upload(self, storage_path: str, upload_id: str, parts: List[dict]) -> None:
+        """完成 multipart 上傳；parts 為 {"part_number": int, "etag": str} 的列表。"""
+        raise NotImplementedError("Multipart uploads are not supported by this storage provider.")
+
+    def abort_multipart_upload(self, storage_path: str, upload_id: str) -> None:
+        """中止 multipart 上傳並釋放已上傳的 parts；上傳不存在時不視為錯誤。"""
+        raise NotImplementedError("Multipart uploads are not supported by this storage provider.")
+
     # Add other methods as needed, e.g., download_file_obj, list_files
\ No newline at end of file
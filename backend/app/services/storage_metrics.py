@@ -0,0 +1,40 @@
+# backend/app/services/storage_metrics.py
+import functools
+import time
+from typing import Any, Callable, TypeVar
+
+from app.core.metrics import Counter, Histogram
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+storage_operation_duration_seconds = Histogram(
+    "storage_operation_duration_seconds", "Storage backend call latency", labelnames=("backend", "operation")
+)
+storage_operation_errors = Counter(
+    "storage_operation_errors", "Storage backend calls that raised an error", labelnames=("backend", "operation")
+)
+
+
+def instrumented(backend: str, operation: str) -> Callable[[F], F]:
+    """
+    記錄 storage service 方法的延遲與錯誤次數 (在 storage executor 的 thread 中執行，metrics 有加鎖)。
+    NotImplementedError 表示 backend 不支援該功能，不算錯誤。
+    """
+    def decorator(func: F) -> F:
+        duration = storage_operation_duration_seconds.labels(backend=backend, operation=operation)
+        errors = storage_operation_errors.labels(backend=backend, operation=operation)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except NotImplementedError:
+                raise
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - started)
+        return wrapper  # type: ignore[return-value]
+    return decorator
@@ -0,0 +1,66 @@
+# backend/app/services/streaming.py
+from typing import IO, Any, Iterator, Optional
+
+from app.core.config import settings
+
+
+class CountingReader:
+    """
+    包裝 UploadFile 的 spool (SpooledTemporaryFile)，讓 storage backend 直接從 spool 讀取，
+    並在讀取的同時計算檔案大小，避免把整個檔案讀進記憶體。
+
+    S3 (upload_fileobj) 與 GCS (resumable upload) 都會以固定大小的區塊呼叫 read(size)，
+    因此每次上傳的記憶體用量只和區塊大小有關，與檔案大小無關。
+
+    若提供 hasher (例如 hashlib.sha256())，每個位元組只會在第一次被讀到時送進 hasher，
+    因此 backend 重新 seek 重讀 (例如重試) 也不會影響雜湊結果。
+    """
+
+    def __init__(
+        self,
+        raw: IO[bytes],
+        chunk_size: int = settings.UPLOAD_CHUNK_SIZE_BYTES,
+        hasher: Optional[Any] = None,
+    ):
+        self._raw = raw
+        self.chunk_size = chunk_size
+        self.hasher = hasher
+        self._position = raw.tell()
+        self.bytes_read = 0  # 已讀取的最遠位置 (即目前已知的檔案大小)
+
+    def read(self, size: int = -1) -> bytes:
+        start = self._position
+        data = self._raw.read(size)
+        self._position += len(data)
+        if self._position > self.bytes_read:
+            if self.hasher is not None:
+                # 只對超過目前最遠位置的新資料計算雜湊
+                self.hasher.update(memoryview(data)[max(0, self.bytes_read - start):])
+            self.bytes_read = self._position
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        self._position = self._raw.seek(offset, whence)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def seekable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        # s3transfer 上傳完成後會關閉傳入的 fileobj；底層檔案屬於呼叫端 (UploadFile / 暫存檔)，
+        # 由呼叫端負責關閉，這裡不關閉 raw
+        pass
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        """從目前位置開始，以 chunk_size 為單位逐塊讀取直到檔案結尾。"""
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
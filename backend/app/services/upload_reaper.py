@@ -0,0 +1,83 @@
+# backend/app/services/upload_reaper.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud import file as crud_file
+from app.crud import pending_upload as crud_pending_upload
+from app.crud import upload_session as crud_upload_session
+from app.db.session import SessionLocal
+from app.dependencies import get_async_storage_service
+from app.services.async_storage import AsyncStorage
+
+logger = logging.getLogger(__name__)
+
+
+async def reap_stale_uploads(db: AsyncSession, storage_service: AsyncStorage, older_than: timedelta) -> int:
+    """
+    中止逾時未完成的上傳並清除其 pending 元數據，避免未完成的 parts 一直佔用 storage：
+    1. multipart 上傳：呼叫 abort_multipart_upload 釋放已上傳的 parts。
+    2. 單次 presigned PUT：刪除可能已上傳但從未呼叫 /complete 的物件。
+    3. 可續傳上傳：刪除太久沒有收到資料的 session 與其暫存檔。
+    返回被清除的上傳數量。
+    """
+    cutoff = datetime.utcnow() - older_than
+    reaped = 0
+
+    for pending_upload in await crud_pending_upload.get_stale_pending_uploads(db, created_before=cutoff):
+        try:
+            await storage_service.abort_multipart_upload(
+                storage_path=pending_upload.storage_path, upload_id=pending_upload.upload_id
+            )
+        except NotImplementedError:
+            pass # backend 不支援 multipart，沒有需要釋放的 parts
+        except (IOError, ConnectionError) as e:
+            logger.error(f"Could not abort stale multipart upload {pending_upload.id}: {e}")
+            continue
+        await crud_pending_upload.delete_pending_upload(db, pending_upload, delete_file=True)
+        reaped += 1
+
+    for file_meta in await crud_file.get_stale_pending_files(db, uploaded_before=cutoff):
+        try:
+            await storage_service.delete_file(storage_path=file_meta.storage_path)
+        except (IOError, ConnectionError) as e:
+            logger.error(f"Could not delete object of stale pending file {file_meta.id}: {e}")
+            continue
+        await crud_file.delete_file_metadata(db, file_id=file_meta.id)
+        reaped += 1
+
+    for upload_session in await crud_upload_session.get_stale_upload_sessions(db, updated_before=cutoff):
+        await crud_upload_session.delete_upload_session(db, upload_session)
+        reaped += 1
+
+    return reaped
+
+
+async def _run_reaper_once() -> int:
+    storage_service = get_async_storage_service()
+    async with SessionLocal() as db:
+        return await reap_stale_uploads(
+            db, storage_service, older_than=timedelta(hours=settings.MULTIPART_UPLOAD_EXPIRE_HOURS)
+        )
+
+
+async def run_upload_reaper() -> None:
+    """
+    背景任務：每 UPLOAD_REAPER_INTERVAL_SECONDS 秒清除一次逾時的上傳。
+    資料庫使用 async session，storage 呼叫由 storage executor 執行，都不會阻塞 event loop。
+    """
+    while True:
+        try:
+            reaped = await _run_reaper_once()
+            if reaped:
+                logger.info(f"Upload reaper aborted {reaped} stale upload(s).")
+        except HTTPException as e:
+            # get_storage_service 在設定錯誤時會拋出 503，下一輪再試
+            logger.warning(f"Upload reaper skipped: {e.detail}")
+        except Exception as e:
+            logger.error(f"Upload reaper failed: {e}", exc_info=True)
+        await asyncio.sleep(settings.UPLOAD_REAPER_INTERVAL_SECONDS)
@@ -0,0 +1,138 @@
+# backend/benchmarks/calibrate_password_hash.py
+"""
+密碼雜湊成本參數的校準工具。
+
+在部署的硬體上量測不同成本參數下一次密碼驗證 (verify) 所需的時間，
+選出不超過 --target-ms 的最高成本，並可直接寫入 Settings 讀取的 .env：
+
+- bcrypt: 調整 BCRYPT_ROUNDS (每加 1，時間約加倍)
+- argon2: 固定 ARGON2_MEMORY_COST_KIB / ARGON2_PARALLELISM，調整 ARGON2_TIME_COST (需要 argon2-cffi)
+
+寫入後重新啟動服務即生效；成本不同的既有雜湊會在使用者下次登入時自動重新雜湊。
+請在伺服器沒有其他負載時執行，量測結果才有代表性。
+
+    cd backend && python -m benchmarks.calibrate_password_hash --target-ms 250 --write-env .env
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks import common  # noqa: F401  (設定其餘環境變數並匯入 app)
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.security import build_password_context
+
+SAMPLE_PASSWORD = "calibration-password"
+
+
+def measure_verify_ms(context: CryptContext, samples: int) -> float:
+    hashed = context.hash(SAMPLE_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.verify(SAMPLE_PASSWORD, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(
+    candidates: List[int], build: Callable[[int], CryptContext], target_ms: float, samples: int
+) -> Tuple[int, List[Tuple[int, float]]]:
+    """依序量測遞增的成本參數，返回不超過目標時間的最高成本 (都超過時返回最低成本) 與量測結果。"""
+    results = []
+    chosen = candidates[0]
+    for cost in candidates:
+        elapsed_ms = measure_verify_ms(build(cost), samples)
+        results.append((cost, elapsed_ms))
+        if elapsed_ms > target_ms:
+            break # 成本越高時間越長，不必再往上量測
+        chosen = cost
+    return chosen, results
+
+
+def write_env_file(path: str, values: Dict[str, str]) -> None:
+    """更新 .env 中的指定設定 (保留其他內容與註解)，不存在的設定附加在檔案最後。"""
+    lines = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+    remaining = dict(values)
+    updated = []
+    for line in lines:
+        key = line.split("=", 1)[0].strip()
+        if not line.lstrip().startswith("#") and key in remaining:
+            updated.append(f"{key}={remaining.pop(key)}")
+        else:
+            updated.append(line)
+    updated.extend(f"{key}={value}" for key, value in remaining.items())
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(updated) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=settings.PASSWORD_HASH_SCHEMES[0])
+    parser.add_argument("--target-ms", type=float, default=250.0, help="一次 verify 可接受的最長時間")
+    parser.add_argument("--samples", type=int, default=5, help="每個成本參數量測的次數 (取中位數)")
+    parser.add_argument("--bcrypt-min-rounds", type=int, default=10)
+    parser.add_argument("--bcrypt-max-rounds", type=int, default=16)
+    parser.add_argument("--argon2-max-time-cost", type=int, default=20)
+    parser.add_argument("--argon2-memory-cost-kib", type=int, default=settings.ARGON2_MEMORY_COST_KIB)
+    parser.add_argument("--argon2-parallelism", type=int, default=settings.ARGON2_PARALLELISM)
+    parser.add_argument("--write-env", metavar="PATH", help="把結果寫入指定的 .env 檔 (預設只輸出結果)")
+    args = parser.parse_args()
+
+    if args.scheme == "bcrypt":
+        setting_name = "BCRYPT_ROUNDS"
+        candidates = list(range(args.bcrypt_min_rounds, args.bcrypt_max_rounds + 1))
+        build = lambda cost: build_password_context(["bcrypt"], bcrypt_rounds=cost)  # noqa: E731
+    else:
+        from passlib.hash import argon2
+
+        if not argon2.has_backend():
+            print("argon2 calibration requires argon2-cffi (pip install argon2-cffi).")
+            sys.exit(2)
+        setting_name = "ARGON2_TIME_COST"
+        candidates = list(range(1, args.argon2_max_time_cost + 1))
+        build = lambda cost: build_password_context(  # noqa: E731
+            ["argon2"],
+            argon2_time_cost=cost,
+            argon2_memory_cost_kib=args.argon2_memory_cost_kib,
+            argon2_parallelism=args.argon2_parallelism,
+        )
+
+    chosen, results = calibrate(candidates, build, args.target_ms, args.samples)
+
+    print(f"{args.scheme} verify latency (median of {args.samples}), target {args.target_ms:.0f} ms")
+    print(f"{setting_name:>18} {'verify (ms)':>12}")
+    for cost, elapsed_ms in results:
+        marker = "  <- chosen" if cost == chosen else ""
+        print(f"{cost:>18} {elapsed_ms:>12.1f}{marker}")
+    if results[0][1] > args.target_ms:
+        print(f"Warning: even the lowest {setting_name} ({chosen}) exceeds the target.")
+
+    # 新的演算法放在第一個；原本設定的其他演算法保留在後面，既有的雜湊仍可驗證並在登入時轉換
+    schemes = [args.scheme] + [scheme for scheme in settings.PASSWORD_HASH_SCHEMES if scheme != args.scheme]
+    values = {"PASSWORD_HASH_SCHEMES": json.dumps(schemes), setting_name: str(chosen)}
+    if args.scheme == "argon2":
+        values["ARGON2_MEMORY_COST_KIB"] = str(args.argon2_memory_cost_kib)
+        values["ARGON2_PARALLELISM"] = str(args.argon2_parallelism)
+
+    print()
+    for key, value in values.items():
+        print(f"{key}={value}")
+    if args.write_env:
+        write_env_file(args.write_env, values)
+        print(f"Written to {args.write_env}; restart the API for the new settings to take effect.")
+
+
+if __name__ == "__main__":
+    main()
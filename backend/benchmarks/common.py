@@ -0,0 +1,107 @@
+# backend/benchmarks/common.py
+"""
+Benchmark 共用的工具：設定最小的環境變數、建立 SQLite 資料庫，以及不連線雲端的 storage fake。
+所有 benchmark 都應該在 backend/ 目錄下以 `python -m benchmarks.<name>` 執行。
+"""
+import os
+from typing import IO, Any, Iterator, Optional
+
+# 在匯入 app 之前提供 Settings 需要的必填值 (已設定的環境變數優先)
+os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+os.environ.setdefault("PROJECT_NAME", "benchmark")
+os.environ.setdefault("VERSION", "benchmark")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+import app.main  # noqa: E402,F401  (與 uvicorn 相同的匯入順序，避免 security/crud 的循環匯入)
+from app.db.base_class import Base  # noqa: E402
+from app import models  # noqa: E402,F401  (populate Base.metadata)
+from app.services.storage_interface import DEFAULT_READ_CHUNK_SIZE, StorageInterface, StorageObjectInfo  # noqa: E402
+
+
+async def create_sqlite_sessionmaker(url: str = "sqlite+aiosqlite://") -> async_sessionmaker:
+    """建立已套用所有資料表的 SQLite 資料庫 (預設為 in-memory)，返回其 async sessionmaker。"""
+    engine_kwargs = {}
+    if url in ("sqlite+aiosqlite://", "sqlite+aiosqlite:///:memory:"):
+        engine_kwargs["poolclass"] = StaticPool  # in-memory 資料庫只存在於單一連線中
+    engine = create_async_engine(url, **engine_kwargs)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+class DiscardingStorage(StorageInterface):
+    """
+    模擬 S3/GCS client 的 storage fake：以固定大小的區塊讀取上傳內容後直接丟棄，
+    只記錄寫入的位元組數。
+    """
+
+    def __init__(self, read_size: int = 8 * 1024 * 1024):
+        self.read_size = read_size
+        self.uploaded: dict[str, int] = {}
+
+    def upload_file(
+        self, file_content: IO[Any], destination_path: str, content_type: Optional[str] = None
+    ) -> str:
+        total = 0
+        while True:
+            chunk = file_content.read(self.read_size)
+            if not chunk:
+                break
+            total += len(chunk)
+        self.uploaded[destination_path] = total
+        return destination_path
+
+    def delete_file(self, storage_path: str) -> None:
+        self.uploaded.pop(storage_path, None)
+
+    def generate_presigned_url(
+        self,
+        storage_path: str,
+        expiration_seconds: int,
+        http_method: str = "GET",
+        download_filename: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Optional[str]:
+        return f"memory://{storage_path}?method={http_method}&expires={expiration_seconds}"
+
+    def get_file_info(self, storage_path: str) -> Optional[StorageObjectInfo]:
+        if storage_path not in self.uploaded:
+            return None
+        return StorageObjectInfo(size=self.uploaded[storage_path])
+
+
+class InMemoryStorage(DiscardingStorage):
+    """保存上傳內容的 storage fake，給需要再讀回物件內容的 benchmark 使用。"""
+
+    def __init__(self, read_size: int = 8 * 1024 * 1024):
+        super().__init__(read_size)
+        self.objects: dict[str, bytes] = {}
+
+    def upload_file(
+        self, file_content: IO[Any], destination_path: str, content_type: Optional[str] = None
+    ) -> str:
+        chunks = []
+        while True:
+            chunk = file_content.read(self.read_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self.objects[destination_path] = b"".join(chunks)
+        self.uploaded[destination_path] = len(self.objects[destination_path])
+        return destination_path
+
+    def delete_file(self, storage_path: str) -> None:
+        self.objects.pop(storage_path, None)
+        super().delete_file(storage_path)
+
+    def open_range(
+        self, storage_path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        etag: Optional[str] = None,
+    ) -> Iterator[bytes]:
+        if storage_path not in self.objects:
+            raise FileNotFoundError(storage_path)
+        data = memoryview(self.objects[storage_path])[start:None if end is None else end + 1]
+        return (bytes(data[offset:offset + chunk_size]) for offset in range(0, len(data), chunk_size))
@@ -0,0 +1,98 @@
+# backend/benchmarks/explain_listing.py
+"""
+檔案列表查詢的 EXPLAIN 回歸檢查。
+
+先以 alembic 把資料庫升級到最新版本 (確認索引確實由 migration 建立，而不只存在於 model)，
+再對 crud_file 的各種列表查詢執行 EXPLAIN。只要任何一個查詢計畫退回 file_metadata 的全表掃描，
+或需要額外排序而不是沿著索引順序讀取，就以非 0 的 exit code 結束，可以直接放進 CI。
+
+預設使用暫存的 SQLite 資料庫；設定 DATABASE_URL 可以對 PostgreSQL 執行 (會對該資料庫執行 migration)。
+
+    cd backend && python -m benchmarks.explain_listing
+"""
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+
+_TEMP_DIR = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TEMP_DIR.name}/explain.db")
+
+from benchmarks import common  # noqa: E402,F401  (設定其餘環境變數並匯入 app)
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.crud.file import build_all_files_query, build_files_by_owner_query  # noqa: E402
+from app.db.session import engine  # noqa: E402
+
+CURSOR = (datetime(2026, 1, 1), 1000)
+
+LISTING_QUERIES = {
+    "files by owner": build_files_by_owner_query(owner_id=1, limit=101),
+    "files by owner (cursor)": build_files_by_owner_query(owner_id=1, limit=101, after=CURSOR),
+    "all files": build_all_files_query(limit=101),
+    "all files (cursor)": build_all_files_query(limit=101, after=CURSOR),
+    "all files by owner": build_all_files_query(owner_id=1, limit=101),
+    "all files by owner (cursor)": build_all_files_query(owner_id=1, limit=101, after=CURSOR),
+}
+
+# 各資料庫的 EXPLAIN 語法，以及代表「全表掃描或額外排序」的計畫片段
+EXPLAIN_PREFIX = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+FULL_SCAN_PATTERNS = {
+    "sqlite": [re.compile(r"\bSCAN file_metadata$"), re.compile(r"USE TEMP B-TREE FOR ORDER BY")],
+    "postgresql": [re.compile(r"Seq Scan on file_metadata"), re.compile(r"^\s*(->\s*)?Sort\b")],
+}
+
+
+def migrate() -> None:
+    alembic_config = Config(os.path.join(os.path.dirname(__file__), "..", "alembic.ini"))
+    alembic_config.set_main_option("script_location", os.path.join(os.path.dirname(__file__), "..", "alembic"))
+    command.upgrade(alembic_config, "head")
+
+
+async def explain_all(dialect_name: str) -> int:
+    failures = 0
+    async with engine.connect() as conn:
+        if dialect_name == "postgresql":
+            # 空的測試資料表上 PostgreSQL 一定會選擇全表掃描；關掉 seqscan 後
+            # 若計畫仍是 Seq Scan，代表沒有可用的索引
+            await conn.execute(text("SET enable_seqscan = off"))
+        for name, query in LISTING_QUERIES.items():
+            sql = str(query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            result = await conn.execute(text(EXPLAIN_PREFIX[dialect_name] + sql))
+            plan = [str(row[-1]) for row in result.all()]
+            bad_lines = [
+                line for line in plan
+                if any(pattern.search(line) for pattern in FULL_SCAN_PATTERNS[dialect_name])
+            ]
+            print(f"{'FAIL' if bad_lines else 'ok':>4}  {name}")
+            for line in plan:
+                print(f"        {line}")
+            failures += bool(bad_lines)
+    await engine.dispose()
+    return failures
+
+
+def main() -> None:
+    dialect_name = engine.dialect.name
+    if dialect_name not in EXPLAIN_PREFIX:
+        print(f"EXPLAIN check is not implemented for '{dialect_name}'.")
+        sys.exit(2)
+
+    migrate()
+    failures = asyncio.run(explain_all(dialect_name))
+    if failures:
+        print(f"{failures} listing quer{'y' if failures == 1 else 'ies'} fell back to a full scan or sort.")
+        sys.exit(1)
+    print("All listing queries use an index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# backend/benchmarks/health_latency.py
+"""
+上傳進行中時 /health 的延遲 benchmark。
+
+以一個模擬慢速 S3 的 storage fake (每次上傳阻塞 --storage-latency-ms 毫秒) 持續上傳檔案，
+同時每隔 --probe-interval-ms 毫秒呼叫一次 /health，統計其延遲分佈：
+
+- idle:    沒有上傳時的基準延遲
+- inline:  舊版做法，storage 呼叫直接在 event loop 上執行，慢的上傳會卡住所有請求
+- offload: AsyncStorage 把 storage 呼叫交給有上限的 executor，/health 不受影響
+
+    cd backend && python -m benchmarks.health_latency --uploads 8 --duration 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Callable, List, TypeVar
+
+from benchmarks.common import DiscardingStorage, create_sqlite_sessionmaker
+
+import httpx
+
+from app.core.config import settings
+from app.core.security import get_current_active_user
+from app.db.session import get_db
+from app.dependencies import get_async_storage_service
+from app.main import app
+from app.models.user import User, UserRole
+from app.services.async_storage import AsyncStorage
+
+T = TypeVar("T")
+
+
+class SlowStorage(DiscardingStorage):
+    """每次上傳都以阻塞的方式等待固定時間，模擬經由網路呼叫的 boto3 / GCS client。"""
+
+    def __init__(self, latency_seconds: float):
+        super().__init__()
+        self.latency_seconds = latency_seconds
+
+    def upload_file(self, file_content, destination_path, content_type=None):
+        time.sleep(self.latency_seconds)
+        return super().upload_file(file_content, destination_path, content_type)
+
+
+class InlineStorage(AsyncStorage):
+    """舊版行為：直接在 event loop 上執行同步的 storage 呼叫。"""
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return func(*args, **kwargs)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def upload_worker(client: httpx.AsyncClient, file_size: int, stop: asyncio.Event, counter: list) -> None:
+    while not stop.is_set():
+        # 隨機內容，避免內容去重讓後續上傳跳過 storage
+        response = await client.post(
+            "/api/v1/files/upload",
+            files={"uploaded_file": ("bench.bin", os.urandom(file_size), "application/octet-stream")},
+        )
+        response.raise_for_status()
+        counter[0] += 1
+
+
+async def run_scenario(
+    storage_service: AsyncStorage, uploads: int, duration: float, probe_interval: float, file_size: int
+) -> dict:
+    app.dependency_overrides[get_async_storage_service] = lambda: storage_service
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        completed = [0]
+        workers = [asyncio.create_task(upload_worker(client, file_size, stop, completed)) for _ in range(uploads)]
+
+        # 以預定的發送時間計算延遲：event loop 被卡住時 probe 本身也無法準時送出，
+        # 若只計算送出後的時間會漏掉這段等待 (coordinated omission)
+        latencies = []
+        started = time.perf_counter()
+        scheduled = started
+        while scheduled < started + duration:
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            response = await client.get("/health")
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+            scheduled += probe_interval
+
+        stop.set()
+        await asyncio.gather(*workers)
+
+    return {
+        "samples": len(latencies),
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+        "uploads": completed[0],
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=8, help="同時進行的上傳數")
+    parser.add_argument("--duration", type=float, default=5.0, help="每個情境的秒數")
+    parser.add_argument("--storage-latency-ms", type=float, default=200.0, help="每次上傳在 storage 阻塞的時間")
+    parser.add_argument("--probe-interval-ms", type=float, default=10.0)
+    parser.add_argument("--file-size-kb", type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        session_factory = await create_sqlite_sessionmaker(f"sqlite+aiosqlite:///{tmp_dir}/benchmark.db")
+        async with session_factory() as db:
+            user = User(email="bench@example.com", username="bench", hashed_password="x", role=UserRole.USER)
+            db.add(user)
+            await db.commit()
+            current_user = SimpleNamespace(id=user.id, username=user.username, role=user.role)
+
+        async def override_get_db():
+            async with session_factory() as db:
+                yield db
+
+        # 跳過 JWT 與 bcrypt，只量測 storage 呼叫對 event loop 的影響
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_current_active_user] = lambda: current_user
+
+        storage = SlowStorage(latency_seconds=args.storage_latency_ms / 1000)
+        executor = ThreadPoolExecutor(max_workers=settings.STORAGE_EXECUTOR_MAX_WORKERS, thread_name_prefix="storage")
+        scenarios = [
+            ("idle", AsyncStorage(storage, executor), 0),
+            ("inline", InlineStorage(storage, executor), args.uploads),
+            ("offload", AsyncStorage(storage, executor), args.uploads),
+        ]
+
+        print(f"{'scenario':>10} {'samples':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10} {'uploads':>8}")
+        try:
+            for name, storage_service, uploads in scenarios:
+                result = await run_scenario(
+                    storage_service, uploads, args.duration, args.probe_interval_ms / 1000, args.file_size_kb * 1024
+                )
+                print(
+                    f"{name:>10} {result['samples']:>8} {result['p50']:>10.1f} {result['p99']:>10.1f} "
+                    f"{result['max']:>10.1f} {result['uploads']:>8}"
+                )
+        finally:
+            executor.shutdown(wait=True)
+            app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
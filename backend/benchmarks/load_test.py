@@ -0,0 +1,287 @@
+# backend/benchmarks/load_test.py
+"""
+API 的負載測試。
+
+在同一個 process 中啟動 app.main:app (經由 httpx 的 ASGITransport，不經過網路)，
+資料庫使用暫存目錄中的 SQLite，storage 使用 in-memory fake (InMemoryStorage)。
+--concurrency 個虛擬使用者各自登入後，依 --mix 的權重隨機執行操作，持續 --duration 秒：
+
+- login:  POST /auth/login/access-token (每次一次 bcrypt verify)
+- list:   GET  /files/
+- upload: POST /files/upload (--upload-bytes 大小的隨機內容)
+- share:  POST /files/{id}/generate-share-link
+- download: GET /files/{id}/content (經由 API 串流下載；預設的 mix 不包含，以 --mix 加入)
+- delete: DELETE /files/{id}
+
+每個操作回報吞吐量與 p50/p95/p99 延遲，結果寫成 JSON (含 git commit 與主要設定)，
+可以用 --compare 與其他 commit 的結果比較：
+
+    cd backend && python -m benchmarks.load_test --concurrency 16 --duration 20 --output before.json
+    cd backend && python -m benchmarks.load_test --concurrency 16 --duration 20 --compare before.json
+
+--seed 固定時，每個虛擬使用者的操作順序相同 (實際完成的數量仍取決於執行速度)。
+登入受 bcrypt 成本影響很大，可以用 BCRYPT_ROUNDS 環境變數調整。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# 量測 API 本身的吞吐量；所有虛擬使用者來自同一個 IP，登入限流會拒絕大部分的登入
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("UPLOAD_REAPER_ENABLED", "false")
+
+from benchmarks.common import InMemoryStorage, create_sqlite_sessionmaker  # noqa: E402
+from benchmarks.health_latency import percentile  # noqa: E402
+
+import httpx  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.security import get_password_hash  # noqa: E402
+from app.db.session import get_db, get_read_db  # noqa: E402
+from app.dependencies import get_async_storage_service, get_storage_executor  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.services.async_storage import AsyncStorage  # noqa: E402
+
+PASSWORD = "benchmark-password"
+API = "/api/v1"
+OPERATIONS = ("login", "list", "upload", "share", "download", "delete")
+DEFAULT_MIX = "login=1,list=4,upload=2,share=2,delete=1"
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}' (expected one of {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("At least one operation needs a positive weight")
+    return mix
+
+
+class VirtualUser:
+    """一個虛擬使用者：持有自己的 access token 與已上傳的檔案 id。"""
+
+    def __init__(self, client: httpx.AsyncClient, username: str, rng: random.Random, upload_bytes: int):
+        self.client = client
+        self.username = username
+        self.rng = rng
+        self.upload_bytes = upload_bytes
+        self.headers: Dict[str, str] = {}
+        self.file_ids: List[int] = []
+
+    async def login(self) -> httpx.Response:
+        response = await self.client.post(
+            f"{API}/auth/login/access-token", data={"username": self.username, "password": PASSWORD}
+        )
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return response
+
+    async def list(self) -> httpx.Response:
+        return await self.client.get(f"{API}/files/", params={"limit": 50}, headers=self.headers)
+
+    async def upload(self) -> httpx.Response:
+        # 每次都是不同的內容，避免內容去重讓上傳變成只寫入元數據
+        content = self.rng.randbytes(self.upload_bytes)
+        response = await self.client.post(
+            f"{API}/files/upload",
+            files={"uploaded_file": (f"bench-{self.rng.getrandbits(32):08x}.bin", content, "application/octet-stream")},
+            headers=self.headers,
+        )
+        if response.status_code == 201:
+            self.file_ids.append(response.json()["id"])
+        return response
+
+    async def share(self) -> httpx.Response:
+        file_id = self.rng.choice(self.file_ids)
+        return await self.client.post(f"{API}/files/{file_id}/generate-share-link", headers=self.headers)
+
+    async def download(self) -> httpx.Response:
+        file_id = self.rng.choice(self.file_ids)
+        return await self.client.get(f"{API}/files/{file_id}/content", headers=self.headers)
+
+    async def delete(self) -> httpx.Response:
+        file_id = self.file_ids.pop(self.rng.randrange(len(self.file_ids)))
+        return await self.client.delete(f"{API}/files/{file_id}", headers=self.headers)
+
+    def next_operation(self, mix: Dict[str, float]) -> str:
+        operation = self.rng.choices(list(mix), weights=list(mix.values()))[0]
+        if operation in ("share", "download", "delete") and not self.file_ids:
+            return "upload" # 還沒有檔案可以分享、下載或刪除時先上傳
+        return operation
+
+
+async def run_user(
+    user: VirtualUser, mix: Dict[str, float], measure_from: float, stop_at: float,
+    latencies: Dict[str, List[float]], statuses: Dict[str, Counter],
+) -> None:
+    await user.login()
+    while True:
+        operation = user.next_operation(mix)
+        started = time.perf_counter()
+        if started >= stop_at:
+            return
+        response = await getattr(user, operation)()
+        finished = time.perf_counter()
+        if started >= measure_from: # warm-up 期間的請求不列入統計
+            latencies[operation].append((finished - started) * 1000)
+            statuses[operation][response.status_code] += 1
+
+
+def summarize(samples: List[float], statuses: Counter, duration: float) -> dict:
+    errors = sum(count for code, count in statuses.items() if code >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": len(samples) / duration,
+        "p50_ms": statistics.median(samples) if samples else None,
+        "p95_ms": percentile(samples, 95) if samples else None,
+        "p99_ms": percentile(samples, 99) if samples else None,
+        "max_ms": max(samples) if samples else None,
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict) -> None:
+    print(f"{'operation':>10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for name, row in list(results["operations"].items()) + [("total", results["total"])]:
+        if not row["requests"]:
+            print(f"{name:>10} {0:>9}")
+            continue
+        print(
+            f"{name:>10} {row['requests']:>9} {row['errors']:>7} {row['throughput_rps']:>9.1f} "
+            f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}"
+        )
+
+
+def print_comparison(baseline: dict, results: dict) -> None:
+    """以百分比列出與 baseline 的差異 (req/s 越高越好，延遲越低越好)。"""
+    print(f"\nCompared with {baseline.get('git_commit') or 'baseline'} ({baseline.get('started_at')}):")
+    print(f"{'operation':>10} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    rows = dict(results["operations"], total=results["total"])
+    baseline_rows = dict(baseline["operations"], total=baseline["total"])
+    for name, row in rows.items():
+        before = baseline_rows.get(name)
+        if not before or not before["requests"] or not row["requests"]:
+            continue
+        deltas = [
+            (row[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        ]
+        print(f"{name:>10} " + " ".join(f"{delta:>+8.1f}%" for delta in deltas))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16, help="同時進行的虛擬使用者數")
+    parser.add_argument("--duration", type=float, default=20.0, help="量測的秒數 (不含 warm-up)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="開始統計前的秒數")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"操作權重 (預設 {DEFAULT_MIX})")
+    parser.add_argument("--upload-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", metavar="PATH", help="把結果寫入 JSON 檔")
+    parser.add_argument("--compare", metavar="PATH", help="與之前寫出的 JSON 結果比較")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    storage = InMemoryStorage()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        session_factory = await create_sqlite_sessionmaker(f"sqlite+aiosqlite:///{tmp_dir}/benchmark.db")
+        hashed_password = get_password_hash(PASSWORD) # 所有虛擬使用者共用同一個雜湊，縮短準備時間
+        usernames = [f"bench{i}" for i in range(args.concurrency)]
+        async with session_factory() as db:
+            db.add_all(
+                User(email=f"{name}@example.com", username=name, hashed_password=hashed_password, role=UserRole.USER)
+                for name in usernames
+            )
+            await db.commit()
+
+        async def override_get_db():
+            async with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+        app.dependency_overrides[get_async_storage_service] = lambda: AsyncStorage(storage, get_storage_executor())
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        statuses: Dict[str, Counter] = defaultdict(Counter)
+        started_at = datetime.now(timezone.utc)
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                users = [
+                    VirtualUser(client, name, random.Random(f"{args.seed}:{name}"), args.upload_bytes)
+                    for name in usernames
+                ]
+                measure_from = time.perf_counter() + args.warmup
+                stop_at = measure_from + args.duration
+                await asyncio.gather(*(
+                    run_user(user, args.mix, measure_from, stop_at, latencies, statuses) for user in users
+                ))
+        finally:
+            app.dependency_overrides.clear()
+
+    all_samples = [sample for samples in latencies.values() for sample in samples]
+    results = {
+        "benchmark": "load_test",
+        "started_at": started_at.isoformat(),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mix": args.mix,
+            "upload_bytes": args.upload_bytes,
+            "seed": args.seed,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            "password_hash_schemes": settings.PASSWORD_HASH_SCHEMES,
+        },
+        "operations": {
+            name: summarize(latencies[name], statuses[name], args.duration) for name in OPERATIONS if name in args.mix
+        },
+        "total": summarize(all_samples, sum(statuses.values(), Counter()), args.duration),
+    }
+
+    print_results(results)
+    if baseline:
+        print_comparison(baseline, results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+# backend/benchmarks/login_burst.py
+"""
+登入尖峰時 /health 的延遲 benchmark。
+
+以 --logins 個 client 持續呼叫 /login/access-token (每次都要做一次 bcrypt verify)，
+同時每隔 --probe-interval-ms 毫秒呼叫一次 /health，統計其延遲分佈：
+
+- idle:    沒有登入時的基準延遲
+- inline:  舊版做法，bcrypt 直接在 event loop 上執行，登入期間所有請求都被卡住
+- offload: PasswordHasher 把 bcrypt 交給有上限的 thread pool，超出佇列上限的登入回應 503
+
+    cd backend && python -m benchmarks.login_burst --logins 32 --duration 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Callable, TypeVar
+
+# 只量測 bcrypt 對 event loop 的影響；登入限流會在驗證密碼之前就拒絕大部分請求
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from benchmarks.common import create_sqlite_sessionmaker  # noqa: E402
+from benchmarks.health_latency import percentile  # noqa: E402
+
+import httpx  # noqa: E402
+
+import app.crud.user as crud_user_module  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.security import PasswordHasher, get_password_hash, get_password_hasher  # noqa: E402
+from app.db.session import get_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+
+T = TypeVar("T")
+
+USERNAME = "bench"
+PASSWORD = "benchmark-password"
+
+
+class InlinePasswordHasher(PasswordHasher):
+    """舊版行為：直接在 event loop 上執行 bcrypt。"""
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        return func(*args)
+
+
+async def login_worker(client: httpx.AsyncClient, stop: asyncio.Event, statuses: Counter) -> None:
+    while not stop.is_set():
+        response = await client.post(
+            "/api/v1/auth/login/access-token", data={"username": USERNAME, "password": PASSWORD}
+        )
+        statuses[response.status_code] += 1
+        if response.status_code == 503:
+            # 與遵守 Retry-After 的客戶端相同，稍後再試
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+
+async def run_scenario(hasher: PasswordHasher, logins: int, duration: float, probe_interval: float) -> dict:
+    # crud_user 直接呼叫 get_password_hasher()，不經過 FastAPI 的相依性注入
+    crud_user_module.get_password_hasher = lambda: hasher
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        statuses: Counter = Counter()
+        workers = [asyncio.create_task(login_worker(client, stop, statuses)) for _ in range(logins)]
+
+        # 以預定的發送時間計算延遲，避免 coordinated omission (見 health_latency)
+        latencies = []
+        started = time.perf_counter()
+        scheduled = started
+        while scheduled < started + duration:
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            response = await client.get("/health")
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+            scheduled += probe_interval
+
+        stop.set()
+        await asyncio.gather(*workers)
+
+    return {
+        "samples": len(latencies),
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+        "ok": statuses[200],
+        "rejected": statuses[503],
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32, help="同時進行登入的 client 數")
+    parser.add_argument("--duration", type=float, default=5.0, help="每個情境的秒數")
+    parser.add_argument("--probe-interval-ms", type=float, default=10.0)
+    parser.add_argument("--max-workers", type=int, default=get_password_hasher().max_workers)
+    parser.add_argument("--max-pending", type=int, default=settings.PASSWORD_HASH_MAX_PENDING)
+    args = parser.parse_args()
+
+    original_get_password_hasher = crud_user_module.get_password_hasher
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        session_factory = await create_sqlite_sessionmaker(f"sqlite+aiosqlite:///{tmp_dir}/benchmark.db")
+        async with session_factory() as db:
+            db.add(User(
+                email="bench@example.com", username=USERNAME,
+                hashed_password=get_password_hash(PASSWORD), role=UserRole.USER,
+            ))
+            await db.commit()
+
+        async def override_get_db():
+            async with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_get_db
+
+        scenarios = [
+            ("idle", PasswordHasher(args.max_workers, args.max_pending), 0),
+            ("inline", InlinePasswordHasher(args.max_workers, args.max_pending), args.logins),
+            ("offload", PasswordHasher(args.max_workers, args.max_pending), args.logins),
+        ]
+
+        print(
+            f"{'scenario':>10} {'samples':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10} "
+            f"{'logins':>8} {'503':>6}"
+        )
+        try:
+            for name, hasher, logins in scenarios:
+                result = await run_scenario(hasher, logins, args.duration, args.probe_interval_ms / 1000)
+                hasher.shutdown()
+                print(
+                    f"{name:>10} {result['samples']:>8} {result['p50']:>10.1f} {result['p99']:>10.1f} "
+                    f"{result['max']:>10.1f} {result['ok']:>8} {result['rejected']:>6}"
+                )
+        finally:
+            crud_user_module.get_password_hasher = original_get_password_hasher
+            app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+# backend/benchmarks/startup_import.py
+"""
+Worker 啟動成本 benchmark：匯入時間與記憶體 (RSS)。
+
+每個情境在新的 Python process 中執行 --repeat 次 (沒有共用的 import 快取)，
+量測匯入所需的時間與匯入後的 max RSS，取中位數：
+
+- app:        只匯入 app.main (storage provider 在第一次使用時才載入)
+- app+s3:     app.main + S3 provider (STORAGE_PROVIDER=s3 的 worker 第一次使用 storage 之後)
+- app+gcs:    app.main + GCS provider
+- app+local:  app.main + 本機 storage provider
+- eager:      app.main + 所有 provider (舊版在匯入 app.dependencies 時就載入 boto3 與 google-cloud-storage)
+
+--importtime 另外以 `python -X importtime` 列出指定情境中累計耗時最多的頂層套件。
+
+    cd backend && python -m benchmarks.startup_import --repeat 5 --importtime eager
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# 與 benchmarks.common 相同的必填設定；這裡不匯入 common (會在本 process 匯入 app)
+CHILD_ENV = {
+    "DATABASE_URL": "sqlite:///./benchmark.db",
+    "PROJECT_NAME": "benchmark",
+    "VERSION": "benchmark",
+    "JWT_SECRET_KEY": "benchmark-secret",
+}
+
+SCENARIOS: Dict[str, List[str]] = {
+    "app": [],
+    "app+s3": ["s3"],
+    "app+gcs": ["gcs"],
+    "app+local": ["local"],
+    "eager": ["s3", "gcs", "local"],
+}
+
+CHILD_CODE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app.main
+from app.dependencies import load_storage_provider
+for provider in sys.argv[1:]:
+    load_storage_provider(provider)
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    for key, value in CHILD_ENV.items():
+        env.setdefault(key, value)
+    return env
+
+
+def run_child(providers: List[str], importtime: bool = False) -> Tuple[dict, str]:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD_CODE] + providers
+    completed = subprocess.run(command, capture_output=True, text=True, env=child_env(), check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def top_packages(importtime_output: str, limit: int) -> List[Tuple[str, float]]:
+    """把 -X importtime 的輸出依頂層套件加總 self 時間，返回耗時最多的 (套件, 毫秒)。"""
+    totals: Dict[str, float] = defaultdict(float)
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:   self [us] | cumulative | imported package" (套件名稱前的縮排表示巢狀匯入)
+        self_us, _cumulative_us, name = line[len("import time:"):].split("|")
+        totals[name.strip().split(".")[0]] += int(self_us) / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="每個情境執行的次數 (取中位數)")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--importtime", metavar="SCENARIO", choices=list(SCENARIOS), help="列出該情境的匯入時間明細")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"{'scenario':>10} {'import (ms)':>12} {'max RSS (MiB)':>14}")
+    for name in args.scenarios:
+        samples = [run_child(SCENARIOS[name])[0] for _ in range(args.repeat)]
+        seconds = statistics.median(sample["seconds"] for sample in samples)
+        rss_kib = statistics.median(sample["max_rss_kib"] for sample in samples)
+        print(f"{name:>10} {seconds * 1000:>12.0f} {rss_kib / 1024:>14.1f}")
+
+    if args.importtime:
+        _, stderr = run_child(SCENARIOS[args.importtime], importtime=True)
+        print(f"\nTop-level packages by self import time ({args.importtime}):")
+        for package, milliseconds in top_packages(stderr, args.top):
+            print(f"{package:>30} {milliseconds:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
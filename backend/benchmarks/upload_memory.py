@@ -0,0 +1,100 @@
+# backend/benchmarks/upload_memory.py
+"""
+上傳端點的記憶體 benchmark。
+
+對不同大小的檔案呼叫 upload_file_endpoint，用 tracemalloc 量測每次上傳期間的 Python 記憶體峰值，
+並與舊版「read() 整個檔案再包一層 BytesIO」的做法比較。串流版本的峰值應該維持固定，
+不隨檔案大小成長。
+
+    cd backend && python -m benchmarks.upload_memory --sizes-mb 16 64 256
+"""
+import argparse
+import asyncio
+import gc
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import tracemalloc
+from io import BytesIO
+from types import SimpleNamespace
+
+from benchmarks.common import DiscardingStorage, create_sqlite_sessionmaker
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.api.v1.endpoints.files import upload_file_endpoint
+from app.models.user import User, UserRole
+from app.services.async_storage import AsyncStorage
+
+MB = 1024 * 1024
+
+
+def make_upload(size_bytes: int) -> UploadFile:
+    """建立一個內容已寫入磁碟 spool 的 UploadFile (與 FastAPI 解析 multipart 後的狀態相同)。"""
+    spool = tempfile.SpooledTemporaryFile(max_size=1 * MB)
+    block = b"x" * MB
+    remaining = size_bytes
+    while remaining > 0:
+        spool.write(block[: min(MB, remaining)])
+        remaining -= MB
+    spool.seek(0)
+    return UploadFile(
+        file=spool,
+        filename="benchmark.bin",
+        headers=Headers({"content-type": "application/octet-stream"}),
+    )
+
+
+async def buffered_upload(uploaded_file: UploadFile, storage: DiscardingStorage) -> int:
+    """舊版的做法：整個檔案讀進記憶體後再包成 BytesIO。"""
+    await uploaded_file.seek(0)
+    file_bytes = await uploaded_file.read()
+    storage.upload_file(BytesIO(file_bytes), "buffered/benchmark.bin", uploaded_file.content_type)
+    return len(file_bytes)
+
+
+async def measure(size_bytes: int, db, user, streaming: bool, executor: ThreadPoolExecutor) -> int:
+    storage = DiscardingStorage()
+    uploaded_file = make_upload(size_bytes)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        if streaming:
+            result = await upload_file_endpoint(
+                uploaded_file=uploaded_file, db=db, current_user=user,
+                storage_service=AsyncStorage(storage, executor),
+            )
+            assert result.size == size_bytes, (result.size, size_bytes)
+        else:
+            assert await buffered_upload(uploaded_file, storage) == size_bytes
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        await uploaded_file.close()
+    return peak
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--skip-buffered", action="store_true", help="只量測串流版本")
+    args = parser.parse_args()
+
+    db = (await create_sqlite_sessionmaker())()
+    executor = ThreadPoolExecutor(max_workers=1)
+    user = User(email="bench@example.com", username="bench", hashed_password="x", role=UserRole.USER)
+    db.add(user)
+    await db.commit()
+    current_user = SimpleNamespace(id=user.id, username=user.username, role=user.role)
+
+    print(f"{'size (MB)':>10} {'streaming peak (MB)':>20} {'buffered peak (MB)':>20}")
+    for size_mb in args.sizes_mb:
+        streaming_peak = await measure(size_mb * MB, db, current_user, streaming=True, executor=executor)
+        buffered = "-"
+        if not args.skip_buffered:
+            buffered = f"{await measure(size_mb * MB, db, current_user, streaming=False, executor=executor) / MB:.1f}"
+        print(f"{size_mb:>10} {streaming_peak / MB:>20.1f} {buffered:>20}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -18,5 +18,8 @@ if [ $? -ne 0 ]; then
 fi
 
 # Start the FastAPI application
+# 多 worker 的正式環境啟動器：worker 數依 CPU/記憶體自動決定 (SERVER_WORKERS 可覆寫)，
+# 多個 worker 需要 USER_CACHE_INVALIDATION_BROKER=postgres 與 RATE_LIMIT_BACKEND=database (否則只啟動 1 個 worker)，
+# SIGHUP 逐一替換 worker，SIGTERM 等待進行中的請求後結束
 echo "Starting FastAPI server..."
-exec poetry run uvicorn app.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+exec poetry run python -m app.server --host 0.0.0.0 --port 8000
\ No newline at end of file
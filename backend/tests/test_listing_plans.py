@@ -0,0 +1,36 @@
+# backend/tests/test_listing_plans.py
+"""
+檔案列表查詢的 EXPLAIN 回歸測試 (與 benchmarks/explain_listing.py 相同的檢查)。
+
+以 alembic 把暫存的 SQLite 資料庫升級到最新版本，確認各種列表查詢都沿著 migration 建立的索引讀取，
+計畫中沒有 file_metadata 的全表掃描或額外排序。
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from benchmarks.explain_listing import EXPLAIN_PREFIX, FULL_SCAN_PATTERNS, LISTING_QUERIES, migrate
+from app.core.config import settings
+
+
+@pytest.fixture(scope="module")
+def migrated_engine(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('listing-plans') / 'plans.db'}"
+    # alembic/env.py 從 settings 讀取連線位址；只在 migration 期間指向暫存資料庫
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "DATABASE_URL", url)
+        migrate()
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name", list(LISTING_QUERIES))
+def test_listing_query_uses_an_index(migrated_engine, name):
+    query = LISTING_QUERIES[name]
+    sql = str(query.compile(dialect=migrated_engine.dialect, compile_kwargs={"literal_binds": True}))
+    with migrated_engine.connect() as conn:
+        plan = [str(row[-1]) for row in conn.execute(text(EXPLAIN_PREFIX["sqlite"] + sql))]
+
+    bad_lines = [line for line in plan if any(pattern.search(line) for pattern in FULL_SCAN_PATTERNS["sqlite"])]
+    assert plan, f"empty query plan for {name}"
+    assert not bad_lines, f"{name} fell back to a full scan or sort:\n" + "\n".join(plan)